@@ -74,6 +74,8 @@ CREATE TABLE venda (
     hora_venda TIME,
     valor DECIMAL(10,2),
     endereco VARCHAR(100),
+    -- destino normalizado (sem espaços nas extremidades, minúsculo), indexado para Soma_fretes
+    destino_chave VARCHAR(100) AS (LOWER(TRIM(endereco))) STORED,
     id_cliente INT,
     id_transporte INT,
     FOREIGN KEY (id_cliente) REFERENCES cliente(id),
@@ -91,6 +93,34 @@ CREATE TABLE venda_produto(
     FOREIGN KEY (id_venda) REFERENCES venda(id),
     FOREIGN KEY (id_produto) REFERENCES produto(id)
 );
+-- Total vendido acumulado por vendedor, mantido por delta pelos triggers de venda_produto
+CREATE TABLE vendedor_totais (
+    id_vendedor INT PRIMARY KEY,
+    total_vendido DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (id_vendedor) REFERENCES vendedor(id) ON DELETE CASCADE
+);
+
+-- Receita diária por vendedor, mantida por delta pelos triggers de venda_produto
+CREATE TABLE receita_diaria_vendedor (
+    data_venda DATE NOT NULL,
+    id_vendedor INT NOT NULL,
+    qtd_itens BIGINT NOT NULL DEFAULT 0,
+    total DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (data_venda, id_vendedor),
+    KEY idx_receita_vendedor_data (id_vendedor, data_venda),
+    FOREIGN KEY (id_vendedor) REFERENCES vendedor(id) ON DELETE CASCADE
+);
+
+-- Gasto acumulado por cliente, mantido por delta pelos triggers de venda
+CREATE TABLE cliente_totais (
+    id_cliente INT PRIMARY KEY,
+    qtd_compras INT NOT NULL DEFAULT 0,
+    total_gasto DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (id_cliente) REFERENCES cliente(id) ON DELETE CASCADE
+);
+
 CREATE TABLE log_cashback (
     id INT AUTO_INCREMENT PRIMARY KEY,
     mensagem VARCHAR(255),
@@ -105,6 +135,75 @@ CREATE TABLE voucher (
     FOREIGN KEY (id_cliente) REFERENCES cliente(id)
 );
 
+-- 1.0) RESUMOS MATERIALIZADOS (ver views e procedure AtualizarResumos)
+
+-- Totais por produto, base de v_produto_vendas_totais
+CREATE TABLE mv_produto_vendas_totais (
+    produto_id INT PRIMARY KEY,
+    total_qtd_vendida BIGINT NOT NULL DEFAULT 0,
+    total_ganho DECIMAL(14,2) NOT NULL DEFAULT 0.00
+);
+
+-- Totais por produto e mês, base de v_vendas_mensais_produto
+CREATE TABLE mv_vendas_mensais_produto (
+    produto_id INT NOT NULL,
+    ano INT NOT NULL DEFAULT 0,
+    mes INT NOT NULL DEFAULT 0,
+    qtd_vendida_no_mes BIGINT NOT NULL DEFAULT 0,
+    ganho_no_mes DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    PRIMARY KEY (produto_id, ano, mes)
+);
+
+-- Marca d'água de cada resumo: último venda_produto.id já aplicado
+CREATE TABLE resumo_refresh (
+    resumo VARCHAR(64) PRIMARY KEY,
+    ultimo_id INT NOT NULL DEFAULT 0,
+    linhas_aplicadas BIGINT NOT NULL DEFAULT 0,
+    modo VARCHAR(20),
+    -- marcado pelos triggers quando uma venda/item já resumido é editado ou apagado;
+    -- a próxima AtualizarResumos incremental vira completa
+    precisa_completo BOOLEAN NOT NULL DEFAULT FALSE,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT INTO resumo_refresh (resumo) VALUES ('mv_produto_vendas_totais'), ('mv_vendas_mensais_produto');
+
+-- Versões de migracoes/ já contidas neste script (ver migrador.py / manutencao.py migrar)
+CREATE TABLE schema_migracoes (
+    versao INT PRIMARY KEY,
+    nome VARCHAR(100) NOT NULL,
+    aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    duracao_s DECIMAL(10,3)
+);
+
+-- Contador de versão por tabela: invalida o cache de produtos da aplicação (cache_produtos.py)
+CREATE TABLE tabela_versao (
+    tabela VARCHAR(64) PRIMARY KEY,
+    versao BIGINT NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT INTO tabela_versao (tabela, versao) VALUES ('produto', 0);
+
+-- 1.1) ÍNDICES
+
+-- Histórico de vendas (consultar_vendas): top-N por data/hora sem varrer a tabela
+CREATE INDEX idx_venda_data_hora ON venda (data_venda, hora_venda, id);
+-- Histórico de vendas filtrado por cliente
+CREATE INDEX idx_venda_cliente_data ON venda (id_cliente, data_venda, hora_venda, id);
+-- Fretes por destino (Soma_fretes / relatório de fretes)
+CREATE INDEX idx_venda_destino ON venda (destino_chave);
+CREATE INDEX idx_transporte_venda ON transporte (id_venda);
+-- Reajuste (UPDATE vendedor ... WHERE tipo = ?)
+CREATE INDEX idx_vendedor_tipo ON vendedor (tipo);
+-- Consultas de estoque baixo / reposição
+CREATE INDEX idx_produto_estoque ON produto (quantidade_estoque);
+-- Agregações de venda_produto por produto (views, resumos, estatísticas) lidas só do índice
+CREATE INDEX idx_vp_produto_cobertura ON venda_produto (id_produto, id_venda, qtd, valor);
+
+INSERT INTO schema_migracoes (versao, nome, duracao_s) VALUES (1, 'indices_desempenho', 0), (2, 'versao_catalogo', 0),
+    (3, 'resumos_desatualizados', 0);
+
 -- 2) FUNÇÕES
 
 DELIMITER $$
@@ -134,8 +233,8 @@ BEGIN
     SELECT IFNULL(SUM(t.valor),0.00) INTO total
     FROM transporte t
     JOIN venda v ON v.id = t.id_venda
-    -- normaliza e compara em lowercase e sem espaços nas extremidades
-    WHERE LOWER(TRIM(v.endereco)) = LOWER(TRIM(p_destino));
+    -- destino_chave já guarda LOWER(TRIM(endereco)) e é indexado
+    WHERE v.destino_chave = LOWER(TRIM(p_destino));
     RETURN total;
 END$$
 DELIMITER ;
@@ -143,17 +242,16 @@ DELIMITER ;
 DELIMITER $$
 
 -- Arrecadado(data, id_vendedor)
+-- Lê a receita pré-somada do dia em receita_diaria_vendedor (uma busca pela PK)
 CREATE FUNCTION Arrecadado(p_data DATE, p_id_vendedor INT)
 RETURNS DECIMAL(10,2)
 NOT DETERMINISTIC
 READS SQL DATA
 BEGIN
     DECLARE total DECIMAL(10,2);
-    SELECT IFNULL(SUM(vp.valor),0) INTO total
-    FROM venda_produto vp
-    JOIN produto p ON vp.id_produto = p.id
-    JOIN venda v ON v.id = vp.id_venda
-    WHERE v.data_venda = p_data AND p.id_vendedor = p_id_vendedor;
+    SELECT IFNULL(SUM(r.total),0) INTO total
+    FROM receita_diaria_vendedor r
+    WHERE r.data_venda = p_data AND r.id_vendedor = p_id_vendedor;
     RETURN total;
 END$$
 
@@ -164,54 +262,192 @@ DELIMITER ;
 DELIMITER $$
 
 -- 3.1 Trigger: vendedor_especial
+-- Soma o valor da nova linha ao total do vendedor (vendedor_totais) em vez de
+-- recalcular SUM() sobre todo o histórico dele a cada inserção.
 CREATE TRIGGER trg_vendedor_especial
 AFTER INSERT ON venda_produto
 FOR EACH ROW
 BEGIN
-    DECLARE total_vendas DECIMAL(10,2);
+    DECLARE v_total DECIMAL(14,2);
     DECLARE bonus_total DECIMAL(10,2);
     DECLARE vendedor_id INT;
 
     SELECT id_vendedor INTO vendedor_id FROM produto WHERE id = NEW.id_produto;
 
-    SELECT SUM(vp.valor)
-    INTO total_vendas
-    FROM venda_produto vp
-    JOIN produto p ON vp.id_produto = p.id
-    WHERE p.id_vendedor = vendedor_id;
+    IF vendedor_id IS NOT NULL THEN
+        INSERT INTO vendedor_totais (id_vendedor, total_vendido)
+        VALUES (vendedor_id, NEW.valor)
+        ON DUPLICATE KEY UPDATE total_vendido = total_vendido + NEW.valor;
+
+        INSERT INTO receita_diaria_vendedor (data_venda, id_vendedor, qtd_itens, total)
+        SELECT v.data_venda, vendedor_id, NEW.qtd, NEW.valor
+        FROM venda v
+        WHERE v.id = NEW.id_venda AND v.data_venda IS NOT NULL
+        ON DUPLICATE KEY UPDATE
+            qtd_itens = qtd_itens + NEW.qtd,
+            total = total + NEW.valor;
+
+        SELECT total_vendido INTO v_total
+        FROM vendedor_totais
+        WHERE id_vendedor = vendedor_id;
+
+        IF v_total > 1000 THEN
+            SET bonus_total = v_total * 0.05;
+            INSERT INTO funcionario_especial (id_vendedor, bonus)
+            VALUES (vendedor_id, bonus_total)
+            ON DUPLICATE KEY UPDATE bonus = bonus_total;
+
+            INSERT INTO log_bonus (mensagem)
+            VALUES (CONCAT('Bônus total necessário para custear: R$ ', ROUND(bonus_total,2)));
+        END IF;
+    END IF;
+END$$
 
-    IF total_vendas > 1000 THEN
-        SET bonus_total = total_vendas * 0.05;
-        INSERT INTO funcionario_especial (id_vendedor, bonus)
-        VALUES (vendedor_id, bonus_total)
-        ON DUPLICATE KEY UPDATE bonus = bonus_total;
+-- 3.1.1 Mantém vendedor_totais em edições e exclusões de venda_produto
+CREATE TRIGGER trg_vendedor_totais_upd
+AFTER UPDATE ON venda_produto
+FOR EACH ROW
+BEGIN
+    IF NEW.valor <> OLD.valor OR NEW.id_produto <> OLD.id_produto THEN
+        UPDATE vendedor_totais vt
+        JOIN produto p ON p.id_vendedor = vt.id_vendedor
+        SET vt.total_vendido = vt.total_vendido - OLD.valor
+        WHERE p.id = OLD.id_produto;
+
+        INSERT INTO vendedor_totais (id_vendedor, total_vendido)
+        SELECT p.id_vendedor, NEW.valor FROM produto p
+        WHERE p.id = NEW.id_produto AND p.id_vendedor IS NOT NULL
+        ON DUPLICATE KEY UPDATE total_vendido = total_vendido + NEW.valor;
+    END IF;
 
-        INSERT INTO log_bonus (mensagem)
-        VALUES (CONCAT('Bônus total necessário para custear: R$ ', ROUND(bonus_total,2)));
+    IF NEW.valor <> OLD.valor OR NEW.qtd <> OLD.qtd OR NEW.id_produto <> OLD.id_produto
+       OR NOT (NEW.id_venda <=> OLD.id_venda) THEN
+        UPDATE receita_diaria_vendedor r
+        JOIN produto p ON p.id = OLD.id_produto
+        JOIN venda v ON v.id = OLD.id_venda
+        SET r.qtd_itens = r.qtd_itens - OLD.qtd,
+            r.total = r.total - OLD.valor
+        WHERE r.data_venda = v.data_venda AND r.id_vendedor = p.id_vendedor;
+
+        INSERT INTO receita_diaria_vendedor (data_venda, id_vendedor, qtd_itens, total)
+        SELECT v.data_venda, p.id_vendedor, NEW.qtd, NEW.valor
+        FROM produto p
+        JOIN venda v ON v.id = NEW.id_venda
+        WHERE p.id = NEW.id_produto AND p.id_vendedor IS NOT NULL AND v.data_venda IS NOT NULL
+        ON DUPLICATE KEY UPDATE
+            qtd_itens = qtd_itens + NEW.qtd,
+            total = total + NEW.valor;
     END IF;
 END$$
 
+CREATE TRIGGER trg_vendedor_totais_del
+AFTER DELETE ON venda_produto
+FOR EACH ROW
+BEGIN
+    UPDATE vendedor_totais vt
+    JOIN produto p ON p.id_vendedor = vt.id_vendedor
+    SET vt.total_vendido = vt.total_vendido - OLD.valor
+    WHERE p.id = OLD.id_produto;
+
+    UPDATE receita_diaria_vendedor r
+    JOIN produto p ON p.id = OLD.id_produto
+    JOIN venda v ON v.id = OLD.id_venda
+    SET r.qtd_itens = r.qtd_itens - OLD.qtd,
+        r.total = r.total - OLD.valor
+    WHERE r.data_venda = v.data_venda AND r.id_vendedor = p.id_vendedor;
+END$$
+
 -- 3.2 Trigger: cliente_especial
+-- Soma a nova venda ao gasto acumulado do cliente (cliente_totais) em vez de
+-- recalcular SUM() sobre todas as vendas dele a cada inserção.
 CREATE TRIGGER trg_cliente_especial
 AFTER INSERT ON venda
 FOR EACH ROW
 BEGIN
-    DECLARE total_cliente DECIMAL(10,2);
+    DECLARE total_cliente DECIMAL(14,2);
     DECLARE cashback_total DECIMAL(10,2);
 
-    SELECT SUM(valor)
-    INTO total_cliente
-    FROM venda
-    WHERE id_cliente = NEW.id_cliente;
+    IF NEW.id_cliente IS NOT NULL THEN
+        INSERT INTO cliente_totais (id_cliente, qtd_compras, total_gasto)
+        VALUES (NEW.id_cliente, 1, IFNULL(NEW.valor, 0.00))
+        ON DUPLICATE KEY UPDATE
+            qtd_compras = qtd_compras + 1,
+            total_gasto = total_gasto + IFNULL(NEW.valor, 0.00);
+
+        SELECT total_gasto INTO total_cliente
+        FROM cliente_totais
+        WHERE id_cliente = NEW.id_cliente;
+
+        IF total_cliente > 500 THEN
+            SET cashback_total = total_cliente * 0.02;
+            INSERT INTO cliente_especial (id_cliente, cashback)
+            VALUES (NEW.id_cliente, cashback_total)
+            ON DUPLICATE KEY UPDATE cashback = cashback_total;
+
+            INSERT INTO log_cashback (mensagem)
+            VALUES (CONCAT('Cashback total necessário: R$ ', ROUND(cashback_total,2)));
+        END IF;
+    END IF;
+END$$
 
-    IF total_cliente > 500 THEN
-        SET cashback_total = total_cliente * 0.02;
-        INSERT INTO cliente_especial (id_cliente, cashback)
-        VALUES (NEW.id_cliente, cashback_total)
-        ON DUPLICATE KEY UPDATE cashback = cashback_total;
+-- 3.2.1 Mantém cliente_totais em edições e exclusões de venda
+CREATE TRIGGER trg_cliente_totais_upd
+AFTER UPDATE ON venda
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.id_cliente <=> OLD.id_cliente) OR NOT (NEW.valor <=> OLD.valor) THEN
+        UPDATE cliente_totais
+        SET qtd_compras = qtd_compras - 1,
+            total_gasto = total_gasto - IFNULL(OLD.valor, 0.00)
+        WHERE id_cliente = OLD.id_cliente;
+
+        IF NEW.id_cliente IS NOT NULL THEN
+            INSERT INTO cliente_totais (id_cliente, qtd_compras, total_gasto)
+            VALUES (NEW.id_cliente, 1, IFNULL(NEW.valor, 0.00))
+            ON DUPLICATE KEY UPDATE
+                qtd_compras = qtd_compras + 1,
+                total_gasto = total_gasto + IFNULL(NEW.valor, 0.00);
+        END IF;
+    END IF;
+END$$
 
-        INSERT INTO log_cashback (mensagem)
-        VALUES (CONCAT('Cashback total necessário: R$ ', ROUND(cashback_total,2)));
+CREATE TRIGGER trg_cliente_totais_del
+AFTER DELETE ON venda
+FOR EACH ROW
+BEGIN
+    UPDATE cliente_totais
+    SET qtd_compras = qtd_compras - 1,
+        total_gasto = total_gasto - IFNULL(OLD.valor, 0.00)
+    WHERE id_cliente = OLD.id_cliente;
+END$$
+
+-- 3.2.2 Move a receita diária quando a data de uma venda é alterada
+CREATE TRIGGER trg_receita_diaria_venda_upd
+AFTER UPDATE ON venda
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.data_venda <=> OLD.data_venda) THEN
+        UPDATE receita_diaria_vendedor r
+        JOIN (
+            SELECT p.id_vendedor, SUM(vp.qtd) AS qtd, SUM(vp.valor) AS total
+            FROM venda_produto vp
+            JOIN produto p ON p.id = vp.id_produto
+            WHERE vp.id_venda = NEW.id
+            GROUP BY p.id_vendedor
+        ) x ON x.id_vendedor = r.id_vendedor
+        SET r.qtd_itens = r.qtd_itens - x.qtd,
+            r.total = r.total - x.total
+        WHERE r.data_venda = OLD.data_venda;
+
+        INSERT INTO receita_diaria_vendedor (data_venda, id_vendedor, qtd_itens, total)
+        SELECT NEW.data_venda, p.id_vendedor, SUM(vp.qtd), SUM(vp.valor)
+        FROM venda_produto vp
+        JOIN produto p ON p.id = vp.id_produto
+        WHERE vp.id_venda = NEW.id AND p.id_vendedor IS NOT NULL AND NEW.data_venda IS NOT NULL
+        GROUP BY p.id_vendedor
+        ON DUPLICATE KEY UPDATE
+            qtd_itens = qtd_itens + VALUES(qtd_itens),
+            total = total + VALUES(total);
     END IF;
 END$$
 
@@ -225,9 +461,68 @@ BEGIN
     END IF;
 END$$
 
+-- 3.4 Triggers: versão do catálogo de produtos
+-- Só incrementam quando muda algo que o cache guarda (nome, valor, vendedor);
+-- a baixa de estoque de cada venda não mexe na versão.
+CREATE TRIGGER trg_produto_versao_ins
+AFTER INSERT ON produto
+FOR EACH ROW
+BEGIN
+    UPDATE tabela_versao SET versao = versao + 1 WHERE tabela = 'produto';
+END$$
+
+CREATE TRIGGER trg_produto_versao_upd
+AFTER UPDATE ON produto
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.nome <=> NEW.nome AND OLD.valor <=> NEW.valor AND OLD.id_vendedor <=> NEW.id_vendedor) THEN
+        UPDATE tabela_versao SET versao = versao + 1 WHERE tabela = 'produto';
+    END IF;
+END$$
+
+CREATE TRIGGER trg_produto_versao_del
+AFTER DELETE ON produto
+FOR EACH ROW
+BEGIN
+    UPDATE tabela_versao SET versao = versao + 1 WHERE tabela = 'produto';
+END$$
+
+-- 3.5 Triggers: resumos materializados desatualizados
+-- A atualização incremental dos mv_* só enxerga itens novos (id acima da marca d'água).
+-- Editar ou apagar um item já resumido, ou mudar a data de uma venda, marca os resumos
+-- para reconstrução completa na próxima AtualizarResumos.
+CREATE TRIGGER trg_vp_resumos_upd
+AFTER UPDATE ON venda_produto
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.id <=> NEW.id AND OLD.id_venda <=> NEW.id_venda AND OLD.id_produto <=> NEW.id_produto
+            AND OLD.qtd <=> NEW.qtd AND OLD.valor <=> NEW.valor) THEN
+        UPDATE resumo_refresh SET precisa_completo = TRUE WHERE OLD.id <= ultimo_id AND NOT precisa_completo;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_vp_resumos_del
+AFTER DELETE ON venda_produto
+FOR EACH ROW
+BEGIN
+    UPDATE resumo_refresh SET precisa_completo = TRUE WHERE OLD.id <= ultimo_id AND NOT precisa_completo;
+END$$
+
+CREATE TRIGGER trg_venda_resumos_upd
+AFTER UPDATE ON venda
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.id <=> NEW.id AND OLD.data_venda <=> NEW.data_venda) THEN
+        UPDATE resumo_refresh SET precisa_completo = TRUE WHERE NOT precisa_completo;
+    END IF;
+END$$
+
 DELIMITER ;
 
 -- 5) VIEWS (3 views conforme solicitado)
+-- As views leem resumos já agregados (mv_* e cliente_totais) em vez de
+-- reagregar venda/venda_produto a cada consulta. Os mv_* são atualizados pela
+-- procedure AtualizarResumos; cliente_totais é mantido pelos triggers de venda.
 
 -- 1) Total por produto (inclui vendedor)
 CREATE OR REPLACE VIEW ecommerce.v_produto_vendas_totais AS
@@ -236,39 +531,35 @@ SELECT
   p.nome                 AS produto_nome,
   p.id_vendedor          AS vendedor_id,
   v.nome                 AS vendedor_nome,
-  COALESCE(SUM(vp.qtd),0)    AS total_qtd_vendida,
-  COALESCE(SUM(vp.valor),0.00) AS total_ganho
+  COALESCE(m.total_qtd_vendida,0) AS total_qtd_vendida,
+  COALESCE(m.total_ganho,0.00)    AS total_ganho
 FROM produto p
-LEFT JOIN venda_produto vp ON vp.id_produto = p.id
-LEFT JOIN vendedor v      ON v.id = p.id_vendedor
-GROUP BY p.id, p.nome, p.id_vendedor, v.nome;
+LEFT JOIN mv_produto_vendas_totais m ON m.produto_id = p.id
+LEFT JOIN vendedor v      ON v.id = p.id_vendedor;
 
 -- 2) Cliente: resumo compras e se é especial
 CREATE OR REPLACE VIEW ecommerce.v_cliente_compras_e_status AS
 SELECT
   c.id                    AS cliente_id,
   c.nome                  AS cliente_nome,
-  COUNT(v.id)             AS qtd_compras,
-  COALESCE(SUM(v.valor),0.00) AS total_gasto,
+  COALESCE(ct.qtd_compras,0)      AS qtd_compras,
+  COALESCE(ct.total_gasto,0.00)   AS total_gasto,
   CASE WHEN ce.id_cliente IS NULL THEN 0 ELSE 1 END AS is_cliente_especial
 FROM cliente c
-LEFT JOIN venda v ON v.id_cliente = c.id
-LEFT JOIN cliente_especial ce ON ce.id_cliente = c.id
-GROUP BY c.id, c.nome, is_cliente_especial;
+LEFT JOIN cliente_totais ct ON ct.id_cliente = c.id
+LEFT JOIN cliente_especial ce ON ce.id_cliente = c.id;
 
 -- 3) Vendas mensais por produto (útil para descobrir mês maior/menor)
 CREATE OR REPLACE VIEW ecommerce.v_vendas_mensais_produto AS
 SELECT
   p.id                          AS produto_id,
   p.nome                        AS produto_nome,
-  YEAR(v.data_venda)            AS ano,
-  MONTH(v.data_venda)           AS mes,
-  COALESCE(SUM(vp.qtd),0)       AS qtd_vendida_no_mes,
-  COALESCE(SUM(vp.valor),0.00)  AS ganho_no_mes
-FROM venda_produto vp
-JOIN venda v       ON v.id = vp.id_venda
-JOIN produto p     ON p.id = vp.id_produto
-GROUP BY p.id, p.nome, YEAR(v.data_venda), MONTH(v.data_venda);
+  m.ano                         AS ano,
+  m.mes                         AS mes,
+  m.qtd_vendida_no_mes          AS qtd_vendida_no_mes,
+  m.ganho_no_mes                AS ganho_no_mes
+FROM mv_vendas_mensais_produto m
+JOIN produto p     ON p.id = m.produto_id;
 
 -- 4) PROCEDURES
 
@@ -283,21 +574,36 @@ BEGIN
 END$$
 
 -- Sorteio de cliente
+-- Sorteia um id entre MIN(id) e MAX(id) e confere se existe (busca pela PK),
+-- repetindo algumas vezes se cair num buraco da sequência. O custo não depende
+-- do número de clientes (ORDER BY RAND() varria e ordenava a tabela toda).
 DELIMITER $$
 CREATE PROCEDURE Sorteio()
 proc_label: BEGIN
     DECLARE v_id_cliente INT;
+    DECLARE v_min INT;
+    DECLARE v_max INT;
+    DECLARE v_alvo INT;
+    DECLARE v_tentativas INT DEFAULT 0;
 
-    SELECT id INTO v_id_cliente 
-    FROM cliente 
-    ORDER BY RAND() 
-    LIMIT 1;
+    SELECT MIN(id), MAX(id) INTO v_min, v_max FROM cliente;
 
-    IF v_id_cliente IS NULL THEN
+    IF v_min IS NULL THEN
         SELECT 'Sem clientes para sortear.' AS mensagem;
         LEAVE proc_label;
     END IF;
 
+    WHILE v_id_cliente IS NULL AND v_tentativas < 10 DO
+        SET v_alvo = v_min + FLOOR(RAND() * (v_max - v_min + 1));
+        SELECT id INTO v_id_cliente FROM cliente WHERE id = v_alvo;
+        SET v_tentativas = v_tentativas + 1;
+    END WHILE;
+
+    -- muitos buracos seguidos: pega o próximo id existente a partir do último sorteado
+    IF v_id_cliente IS NULL THEN
+        SELECT id INTO v_id_cliente FROM cliente WHERE id >= v_alvo ORDER BY id LIMIT 1;
+    END IF;
+
     IF EXISTS (SELECT 1 FROM cliente_especial WHERE id_cliente = v_id_cliente) THEN
         INSERT INTO voucher (id_cliente, valor) VALUES (v_id_cliente, 200.00);
         SELECT v_id_cliente AS cliente_sorteado, 200.00 AS valor_voucher;
@@ -325,23 +631,29 @@ BEGIN
     DECLARE v_valor_total DECIMAL(10,2);
     DECLARE v_valor_transporte DECIMAL(10,2);
 
-    -- Verifica se o produto existe e pega valor + estoque
-    SELECT quantidade_estoque, valor
-    INTO v_estoque, v_valor_produto
-    FROM produto
-    WHERE id = p_id_produto
-    FOR UPDATE;
-
-    IF v_estoque IS NULL THEN
+    IF p_qtd IS NULL OR p_qtd <= 0 THEN
         SIGNAL SQLSTATE '45000'
-        SET MESSAGE_TEXT = 'Produto não existe.';
+        SET MESSAGE_TEXT = 'Quantidade inválida.';
     END IF;
 
-    IF v_estoque < p_qtd THEN
+    -- Reserva atômica: só baixa se houver estoque (sem SELECT ... FOR UPDATE antes,
+    -- a linha do produto fica travada só a partir daqui)
+    UPDATE produto
+    SET quantidade_estoque = quantidade_estoque - p_qtd
+    WHERE id = p_id_produto AND quantidade_estoque >= p_qtd;
+
+    IF ROW_COUNT() = 0 THEN
+        SELECT quantidade_estoque INTO v_estoque FROM produto WHERE id = p_id_produto;
+        IF v_estoque IS NULL THEN
+            SIGNAL SQLSTATE '45000'
+            SET MESSAGE_TEXT = 'Produto não existe.';
+        END IF;
         SIGNAL SQLSTATE '45000'
         SET MESSAGE_TEXT = 'Estoque insuficiente.';
     END IF;
 
+    SELECT valor INTO v_valor_produto FROM produto WHERE id = p_id_produto;
+
     -- Calcula valores
     SET v_valor_total = v_valor_produto * p_qtd;
     SET v_valor_transporte = v_valor_total * 0.05; -- frete = 5%
@@ -356,11 +668,6 @@ BEGIN
     INSERT INTO venda_produto (id_venda, id_produto, qtd, valor, obs)
     VALUES (v_id_venda, p_id_produto, p_qtd, v_valor_produto, CONCAT('Venda de ', p_qtd, ' unidade(s).'));
 
-    -- Atualiza estoque
-    UPDATE produto
-    SET quantidade_estoque = quantidade_estoque - p_qtd
-    WHERE id = p_id_produto;
-
     -- Registra transporte
     INSERT INTO transporte (id_venda, valor)
     VALUES (v_id_venda, v_valor_transporte);
@@ -369,6 +676,218 @@ END$$
 DELIMITER ;
 
 
+-- Reconciliação de vendedor_totais: recalcula do zero, mostra a divergência e reconstrói
+DELIMITER $$
+
+CREATE PROCEDURE ReconciliarTotaisVendedores()
+BEGIN
+    DROP TEMPORARY TABLE IF EXISTS tmp_totais_vendedor;
+    CREATE TEMPORARY TABLE tmp_totais_vendedor (
+        id_vendedor INT PRIMARY KEY,
+        total_vendido DECIMAL(14,2) NOT NULL
+    ) AS
+    SELECT p.id_vendedor AS id_vendedor, SUM(vp.valor) AS total_vendido
+    FROM venda_produto vp
+    JOIN produto p ON p.id = vp.id_produto
+    WHERE p.id_vendedor IS NOT NULL
+    GROUP BY p.id_vendedor;
+
+    -- vendedores que constam em vendedor_totais mas não têm mais vendas
+    INSERT IGNORE INTO tmp_totais_vendedor (id_vendedor, total_vendido)
+    SELECT id_vendedor, 0.00 FROM vendedor_totais;
+
+    -- 1) Divergências encontradas (vazio = totais corretos)
+    SELECT
+        t.id_vendedor,
+        COALESCE(vt.total_vendido, 0.00)           AS total_registrado,
+        t.total_vendido                            AS total_recalculado,
+        t.total_vendido - COALESCE(vt.total_vendido, 0.00) AS divergencia
+    FROM tmp_totais_vendedor t
+    LEFT JOIN vendedor_totais vt ON vt.id_vendedor = t.id_vendedor
+    WHERE COALESCE(vt.total_vendido, 0.00) <> t.total_vendido;
+
+    -- 2) Reconstrói os totais a partir do recálculo
+    DELETE FROM vendedor_totais;
+    INSERT INTO vendedor_totais (id_vendedor, total_vendido)
+    SELECT id_vendedor, total_vendido FROM tmp_totais_vendedor WHERE total_vendido <> 0;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_totais_vendedor;
+END$$
+
+DELIMITER ;
+
+-- Backfill/verificação de cliente_totais: recalcula do zero, mostra a divergência,
+-- reconstrói o ledger e promove a cliente_especial quem passou do limite
+DELIMITER $$
+
+CREATE PROCEDURE ReconciliarTotaisClientes()
+BEGIN
+    DROP TEMPORARY TABLE IF EXISTS tmp_totais_cliente;
+    CREATE TEMPORARY TABLE tmp_totais_cliente (
+        id_cliente INT PRIMARY KEY,
+        qtd_compras INT NOT NULL,
+        total_gasto DECIMAL(14,2) NOT NULL
+    ) AS
+    SELECT id_cliente, COUNT(*) AS qtd_compras, IFNULL(SUM(valor), 0.00) AS total_gasto
+    FROM venda
+    WHERE id_cliente IS NOT NULL
+    GROUP BY id_cliente;
+
+    -- clientes que constam em cliente_totais mas não têm mais vendas
+    INSERT IGNORE INTO tmp_totais_cliente (id_cliente, qtd_compras, total_gasto)
+    SELECT id_cliente, 0, 0.00 FROM cliente_totais;
+
+    -- 1) Divergências encontradas (vazio = ledger correto)
+    SELECT
+        t.id_cliente,
+        COALESCE(ct.qtd_compras, 0)             AS compras_registradas,
+        t.qtd_compras                           AS compras_recalculadas,
+        COALESCE(ct.total_gasto, 0.00)          AS total_registrado,
+        t.total_gasto                           AS total_recalculado,
+        t.total_gasto - COALESCE(ct.total_gasto, 0.00) AS divergencia
+    FROM tmp_totais_cliente t
+    LEFT JOIN cliente_totais ct ON ct.id_cliente = t.id_cliente
+    WHERE COALESCE(ct.total_gasto, 0.00) <> t.total_gasto
+       OR COALESCE(ct.qtd_compras, 0) <> t.qtd_compras;
+
+    -- 2) Reconstrói o ledger a partir do recálculo
+    DELETE FROM cliente_totais;
+    INSERT INTO cliente_totais (id_cliente, qtd_compras, total_gasto)
+    SELECT id_cliente, qtd_compras, total_gasto FROM tmp_totais_cliente WHERE qtd_compras > 0;
+
+    -- 3) Promove quem passou do limite e ainda não é cliente especial
+    INSERT IGNORE INTO cliente_especial (id_cliente, cashback)
+    SELECT id_cliente, total_gasto * 0.02
+    FROM cliente_totais
+    WHERE total_gasto > 500;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_totais_cliente;
+END$$
+
+DELIMITER ;
+
+-- Atualização dos resumos materializados (mv_*).
+-- p_completo = FALSE: aplica só as linhas de venda_produto com id acima da marca
+--                     d'água (vendas novas). Edições/exclusões não são vistas.
+--                     Uma venda ainda não commitada com id abaixo da marca só
+--                     entra na próxima atualização completa.
+-- p_completo = TRUE:  reconstrói os resumos do zero a partir das tabelas de fato.
+DELIMITER $$
+
+CREATE PROCEDURE AtualizarResumos(IN p_completo BOOLEAN)
+BEGIN
+    DECLARE v_de INT DEFAULT NULL;
+    DECLARE v_ate INT;
+    DECLARE v_linhas BIGINT DEFAULT 0;
+    DECLARE v_precisa_completo BOOLEAN DEFAULT FALSE;
+    DECLARE v_completo BOOLEAN DEFAULT p_completo;
+
+    SELECT IFNULL(MAX(id), 0) INTO v_ate FROM venda_produto;
+
+    IF NOT v_completo THEN
+        -- FOR UPDATE: duas atualizações incrementais simultâneas não aplicam a mesma faixa duas vezes
+        SELECT ultimo_id, precisa_completo INTO v_de, v_precisa_completo
+        FROM resumo_refresh WHERE resumo = 'mv_produto_vendas_totais' FOR UPDATE;
+        IF v_de IS NULL THEN
+            -- sem marca d'água não há como saber o que já foi somado: somar tudo de novo duplicaria os totais
+            SIGNAL SQLSTATE '45000'
+                SET MESSAGE_TEXT = 'resumo_refresh sem marca d''agua: rode AtualizarResumos(TRUE)';
+        END IF;
+        -- itens já resumidos foram editados/apagados: o incremental não enxerga isso
+        SET v_completo = v_precisa_completo;
+    END IF;
+
+    IF v_completo THEN
+        SET v_de = 0;
+        DELETE FROM mv_produto_vendas_totais;
+        DELETE FROM mv_vendas_mensais_produto;
+    END IF;
+
+    IF v_ate > v_de THEN
+        INSERT INTO mv_produto_vendas_totais (produto_id, total_qtd_vendida, total_ganho)
+        SELECT vp.id_produto, SUM(vp.qtd), SUM(vp.valor)
+        FROM venda_produto vp
+        WHERE vp.id > v_de AND vp.id <= v_ate AND vp.id_produto IS NOT NULL
+        GROUP BY vp.id_produto
+        ON DUPLICATE KEY UPDATE
+            total_qtd_vendida = total_qtd_vendida + VALUES(total_qtd_vendida),
+            total_ganho = total_ganho + VALUES(total_ganho);
+
+        INSERT INTO mv_vendas_mensais_produto (produto_id, ano, mes, qtd_vendida_no_mes, ganho_no_mes)
+        SELECT vp.id_produto, IFNULL(YEAR(v.data_venda), 0), IFNULL(MONTH(v.data_venda), 0), SUM(vp.qtd), SUM(vp.valor)
+        FROM venda_produto vp
+        JOIN venda v ON v.id = vp.id_venda
+        WHERE vp.id > v_de AND vp.id <= v_ate AND vp.id_produto IS NOT NULL
+        GROUP BY vp.id_produto, IFNULL(YEAR(v.data_venda), 0), IFNULL(MONTH(v.data_venda), 0)
+        ON DUPLICATE KEY UPDATE
+            qtd_vendida_no_mes = qtd_vendida_no_mes + VALUES(qtd_vendida_no_mes),
+            ganho_no_mes = ganho_no_mes + VALUES(ganho_no_mes);
+
+        SELECT COUNT(*) INTO v_linhas FROM venda_produto WHERE id > v_de AND id <= v_ate;
+    END IF;
+
+    -- a linha da marca d'água é criada se faltar (ex.: após TRUNCATE), nunca ignorada em silêncio
+    INSERT INTO resumo_refresh (resumo, ultimo_id, linhas_aplicadas, modo, precisa_completo)
+    VALUES ('mv_produto_vendas_totais', GREATEST(v_de, v_ate), v_linhas, IF(v_completo, 'completo', 'incremental'), FALSE),
+           ('mv_vendas_mensais_produto', GREATEST(v_de, v_ate), v_linhas, IF(v_completo, 'completo', 'incremental'), FALSE)
+    ON DUPLICATE KEY UPDATE
+        ultimo_id = VALUES(ultimo_id),
+        linhas_aplicadas = VALUES(linhas_aplicadas),
+        modo = VALUES(modo),
+        precisa_completo = FALSE;
+
+    SELECT IF(v_completo, 'completo', 'incremental') AS modo,
+           v_de AS de_id, v_ate AS ate_id, v_linhas AS linhas_aplicadas,
+           v_completo AND NOT p_completo AS promovida_a_completa;
+END$$
+
+DELIMITER ;
+
+-- Backfill/verificação de receita_diaria_vendedor: recalcula do zero, mostra a divergência e reconstrói
+DELIMITER $$
+
+CREATE PROCEDURE ReconciliarReceitaDiaria()
+BEGIN
+    DROP TEMPORARY TABLE IF EXISTS tmp_receita_diaria;
+    CREATE TEMPORARY TABLE tmp_receita_diaria (
+        data_venda DATE NOT NULL,
+        id_vendedor INT NOT NULL,
+        qtd_itens BIGINT NOT NULL,
+        total DECIMAL(14,2) NOT NULL,
+        PRIMARY KEY (data_venda, id_vendedor)
+    ) AS
+    SELECT v.data_venda, p.id_vendedor, SUM(vp.qtd) AS qtd_itens, SUM(vp.valor) AS total
+    FROM venda_produto vp
+    JOIN venda v ON v.id = vp.id_venda
+    JOIN produto p ON p.id = vp.id_produto
+    WHERE v.data_venda IS NOT NULL AND p.id_vendedor IS NOT NULL
+    GROUP BY v.data_venda, p.id_vendedor;
+
+    -- dias/vendedores que constam na rollup mas não têm mais vendas
+    INSERT IGNORE INTO tmp_receita_diaria (data_venda, id_vendedor, qtd_itens, total)
+    SELECT data_venda, id_vendedor, 0, 0.00 FROM receita_diaria_vendedor;
+
+    -- 1) Divergências encontradas (vazio = rollup correta)
+    SELECT
+        t.data_venda,
+        t.id_vendedor,
+        COALESCE(r.total, 0.00) AS total_registrado,
+        t.total                 AS total_recalculado,
+        t.total - COALESCE(r.total, 0.00) AS divergencia
+    FROM tmp_receita_diaria t
+    LEFT JOIN receita_diaria_vendedor r ON r.data_venda = t.data_venda AND r.id_vendedor = t.id_vendedor
+    WHERE COALESCE(r.total, 0.00) <> t.total OR COALESCE(r.qtd_itens, 0) <> t.qtd_itens;
+
+    -- 2) Reconstrói a rollup a partir do recálculo
+    DELETE FROM receita_diaria_vendedor;
+    INSERT INTO receita_diaria_vendedor (data_venda, id_vendedor, qtd_itens, total)
+    SELECT data_venda, id_vendedor, qtd_itens, total FROM tmp_receita_diaria WHERE qtd_itens <> 0 OR total <> 0;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_receita_diaria;
+END$$
+
+DELIMITER ;
+
 DROP PROCEDURE IF EXISTS EstatisticasCompletas
 DELIMITER $$
 
@@ -493,6 +1012,79 @@ END$$
 
 DELIMITER ;
 
+-- Estatísticas em uma única passada: agrega venda_produto por produto/mês uma vez
+-- e tira dali, com funções de janela, os N produtos mais e menos vendidos e o
+-- melhor/pior mês de cada um. Parâmetros NULL = sem filtro.
+-- Considera apenas produtos com vendas no período.
+DROP PROCEDURE IF EXISTS EstatisticasRanqueadas;
+DELIMITER $$
+
+CREATE PROCEDURE EstatisticasRanqueadas(
+    IN p_top_n INT,
+    IN p_data_inicio DATE,
+    IN p_data_fim DATE,
+    IN p_id_vendedor INT
+)
+BEGIN
+    WITH mensal AS (
+        SELECT
+            vp.id_produto,
+            YEAR(v.data_venda)  AS ano,
+            MONTH(v.data_venda) AS mes,
+            SUM(vp.qtd)   AS qtd_vendida_no_mes,
+            SUM(vp.valor) AS ganho_no_mes
+        FROM venda v
+        JOIN venda_produto vp ON vp.id_venda = v.id
+        JOIN produto p ON p.id = vp.id_produto
+        WHERE v.data_venda >= IFNULL(p_data_inicio, '1000-01-01')
+          AND v.data_venda <= IFNULL(p_data_fim, '9999-12-31')
+          AND (p_id_vendedor IS NULL OR p.id_vendedor = p_id_vendedor)
+        GROUP BY vp.id_produto, YEAR(v.data_venda), MONTH(v.data_venda)
+    ),
+    meses AS (
+        SELECT
+            m.*,
+            SUM(m.qtd_vendida_no_mes) OVER (PARTITION BY m.id_produto) AS total_qtd,
+            SUM(m.ganho_no_mes)       OVER (PARTITION BY m.id_produto) AS total_ganho,
+            ROW_NUMBER() OVER (PARTITION BY m.id_produto
+                               ORDER BY m.qtd_vendida_no_mes DESC, m.ganho_no_mes DESC) AS rk_melhor_mes,
+            ROW_NUMBER() OVER (PARTITION BY m.id_produto
+                               ORDER BY m.qtd_vendida_no_mes ASC, m.ganho_no_mes ASC) AS rk_pior_mes
+        FROM mensal m
+    ),
+    produtos AS (
+        SELECT
+            id_produto, total_qtd, total_ganho,
+            ROW_NUMBER() OVER (ORDER BY total_qtd DESC, total_ganho DESC) AS rk_mais,
+            ROW_NUMBER() OVER (ORDER BY total_qtd ASC, total_ganho ASC)   AS rk_menos
+        FROM meses
+        WHERE rk_melhor_mes = 1
+    )
+    SELECT
+        pr.rk_mais,
+        pr.rk_menos,
+        p.id            AS produto_id,
+        p.nome          AS produto_nome,
+        vd.id           AS vendedor_id,
+        vd.nome         AS vendedor_nome,
+        pr.total_qtd    AS total_qtd_vendida,
+        pr.total_ganho  AS valor_ganho_total,
+        m.ano,
+        m.mes,
+        m.qtd_vendida_no_mes,
+        m.ganho_no_mes,
+        m.rk_melhor_mes = 1 AS melhor_mes,
+        m.rk_pior_mes = 1   AS pior_mes
+    FROM produtos pr
+    JOIN meses m ON m.id_produto = pr.id_produto AND (m.rk_melhor_mes = 1 OR m.rk_pior_mes = 1)
+    JOIN produto p ON p.id = pr.id_produto
+    LEFT JOIN vendedor vd ON vd.id = p.id_vendedor
+    WHERE pr.rk_mais <= p_top_n OR pr.rk_menos <= p_top_n
+    ORDER BY pr.rk_mais;
+END$$
+
+DELIMITER ;
+
 -- USUÁRIOS, ROLES E PERMISSÕES
 
 -- Cria roles
@@ -518,6 +1110,7 @@ GRANT EXECUTE ON ecommerce.* TO 'role_gerente';
 GRANT SELECT ON ecommerce.v_produto_vendas_totais TO 'role_gerente';
 GRANT SELECT ON ecommerce.v_cliente_compras_e_status TO 'role_gerente';
 GRANT SELECT ON ecommerce.v_vendas_mensais_produto TO 'role_gerente';
+GRANT SELECT ON ecommerce.tabela_versao TO 'role_gerente';
 
 -- Funcionário: acesso limitado (leitura e inserção)
 GRANT INSERT, SELECT ON ecommerce.venda TO 'role_funcionario';
@@ -526,6 +1119,8 @@ GRANT SELECT, UPDATE ON ecommerce.produto TO 'role_funcionario';
 GRANT SELECT ON ecommerce.cliente TO 'role_funcionario';
 GRANT EXECUTE ON ecommerce.* TO 'role_funcionario';
 GRANT UPDATE (quantidade_estoque) ON ecommerce.produto TO 'role_funcionario';
+GRANT INSERT, SELECT ON ecommerce.transporte TO 'role_funcionario';
+GRANT SELECT ON ecommerce.tabela_versao TO 'role_funcionario';
 
 -- Views úteis para funcionário
 GRANT SELECT ON ecommerce.v_produto_vendas_totais TO 'role_funcionario';
@@ -666,3 +1261,6 @@ INSERT INTO cliente (nome, idade, sexo, data_nascimento) VALUES
 ('Wesley Pacheco', 25, 'm', '1998-02-14'),
 ('Yasmin Lopes', 26, 'f', '1997-10-30'),
 ('Zara Moura', 31, 'f', '1992-01-05');
+
+-- 7) CARGA INICIAL DOS RESUMOS MATERIALIZADOS
+CALL AtualizarResumos(TRUE);
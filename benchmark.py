@@ -0,0 +1,363 @@
+"""Benchmarks das operações do e-commerce.
+
+ATENÇÃO: rode contra um banco de TESTE. Os cenários gravam vendas e
+alteram o estoque dos produtos usados.
+
+Exemplos:
+    python benchmark.py carrinho --linhas 1,5,10,50 --pedidos 200
+    python benchmark.py estatisticas --repeticoes 10
+    python benchmark.py suite --escala 0.1 --repeticoes 200 --saida base.json
+    python benchmark.py contencao --clientes 1,2,4,8,16,32 --segundos 10
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+import mysql.connector
+
+import codigopythonecommerce as app
+import gerador_dados
+
+
+def login(usuario, senha):
+    """Define as credenciais globais do módulo principal (mesmo efeito do login())."""
+    app.CURRENT_USER = usuario
+    app.CURRENT_PASSWORD = app.senha_linha_de_comando(senha)
+
+
+def ids_da_tabela(conn, tabela, limite=None):
+    """Retorna os ids de uma tabela (opcionalmente só os primeiros `limite`)."""
+    sql = f"SELECT id FROM {tabela} ORDER BY id"
+    if limite:
+        sql += f" LIMIT {int(limite)}"
+    return [row[0] for row in app.execute_read(conn, sql)]
+
+
+def percentil(ordenadas, p):
+    """Percentil p (0-100) de uma lista já ordenada, por interpolação linear."""
+    if not ordenadas:
+        return 0.0
+    k = (len(ordenadas) - 1) * p / 100
+    f = int(k)
+    c = min(f + 1, len(ordenadas) - 1)
+    return ordenadas[f] + (ordenadas[c] - ordenadas[f]) * (k - f)
+
+
+def resumir_latencias(amostras, segundos_total=None):
+    """Resume latências (em segundos) em p50/p95/p99/máx (ms) e throughput (ops/s)."""
+    ordenadas = sorted(amostras)
+    total = segundos_total if segundos_total is not None else sum(amostras)
+    return {
+        'n': len(amostras),
+        'p50_ms': round(percentil(ordenadas, 50) * 1000, 3),
+        'p95_ms': round(percentil(ordenadas, 95) * 1000, 3),
+        'p99_ms': round(percentil(ordenadas, 99) * 1000, 3),
+        'max_ms': round(ordenadas[-1] * 1000, 3) if ordenadas else 0.0,
+        'ops_por_s': round(len(amostras) / total, 2) if total else 0.0,
+    }
+
+
+def medir(func, repeticoes, aquecimento=1):
+    """Executa func() `aquecimento` vezes sem medir e depois `repeticoes` vezes medindo."""
+    for _ in range(aquecimento):
+        func()
+    amostras = []
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        func()
+        amostras.append(time.perf_counter() - t0)
+    return resumir_latencias(amostras, time.perf_counter() - inicio)
+
+
+def chamar_procedure(conn, nome, args=()):
+    """Chama uma procedure e consome todos os result sets."""
+    cursor = conn.cursor()
+    try:
+        cursor.callproc(nome, args)
+        for result_set in cursor.stored_results():
+            result_set.fetchall()
+    finally:
+        cursor.close()
+
+
+def bench_estatisticas(conn, repeticoes, top_n=1):
+    """Compara a procedure antiga (EstatisticasCompletas) com o motor em passada única."""
+    resultados = {
+        'EstatisticasCompletas': medir(lambda: chamar_procedure(conn, 'EstatisticasCompletas'), repeticoes),
+        'EstatisticasRanqueadas': medir(lambda: app.calcular_estatisticas(conn, top_n), repeticoes),
+    }
+    for nome, r in resultados.items():
+        print(f"> {nome:<24} p50 {r['p50_ms']:>10.2f} ms   p95 {r['p95_ms']:>10.2f} ms")
+    return resultados
+
+
+def bench_carrinho(conn, linhas_por_pedido, pedidos, semente=42):
+    """Mede pedidos/s de finalizar_carrinho() para cada tamanho de carrinho."""
+    rnd = random.Random(semente)
+    clientes = ids_da_tabela(conn, 'cliente')
+    transportadoras = ids_da_tabela(conn, 'transportadora') or [None]
+    maior = max(linhas_por_pedido)
+    produtos = ids_da_tabela(conn, 'produto', maior)
+    if not clientes or len(produtos) < maior:
+        raise SystemExit(f"[ERRO] São necessários clientes e ao menos {maior} produtos cadastrados.")
+
+    # garante estoque suficiente para todos os pedidos do cenário
+    marcadores = ', '.join(['%s'] * len(produtos))
+    app.execute_query(
+        conn,
+        f"UPDATE produto SET quantidade_estoque = quantidade_estoque + %s WHERE id IN ({marcadores})",
+        [pedidos * len(linhas_por_pedido)] + produtos
+    )
+
+    resultados = []
+    for n in linhas_por_pedido:
+        inicio = time.perf_counter()
+        for _ in range(pedidos):
+            itens = [(id_produto, 1) for id_produto in rnd.sample(produtos, n)]
+            app.finalizar_carrinho(conn, rnd.choice(clientes), 'Benchmark', rnd.choice(transportadoras), itens)
+        segundos = time.perf_counter() - inicio
+        resultados.append({
+            'linhas_por_pedido': n,
+            'pedidos': pedidos,
+            'segundos': round(segundos, 4),
+            'pedidos_por_s': round(pedidos / segundos, 2),
+            'linhas_por_s': round(pedidos * n / segundos, 2),
+        })
+        print(f"> {n:>4} linha(s)/pedido: {pedidos / segundos:10.2f} pedidos/s")
+    return resultados
+
+
+def amostra_coluna(conn, sql, limite=1000):
+    """Valores reais para parametrizar as chamadas (datas, destinos, ...)."""
+    return [row[0] if len(row) == 1 else row for row in app.execute_read(conn, f"{sql} LIMIT {int(limite)}") or []]
+
+
+def medir_sobrecarga_triggers(conn, repeticoes, rnd, clientes, produtos):
+    """Insere venda + venda_produto com e sem triggers e devolve as duas distribuições.
+
+    A versão "sem triggers" grava em cópias temporárias (CREATE TEMPORARY TABLE ... LIKE
+    não leva triggers nem FKs); cada amostra é desfeita com rollback, então o banco
+    não muda. A diferença entre as medianas é o custo dos triggers de venda.
+    """
+    cursor = conn.cursor()
+    cursor.execute("CREATE TEMPORARY TABLE bench_venda LIKE venda")
+    cursor.execute("CREATE TEMPORARY TABLE bench_venda_produto LIKE venda_produto")
+
+    def inserir(tabela_venda, tabela_itens):
+        conn.start_transaction()
+        try:
+            cursor.execute(
+                f"INSERT INTO {tabela_venda} (data_venda, hora_venda, valor, endereco, id_cliente) "
+                "VALUES (CURDATE(), CURTIME(), %s, %s, %s)",
+                (100, 'Benchmark', rnd.choice(clientes))
+            )
+            id_venda = cursor.lastrowid
+            cursor.execute(
+                f"INSERT INTO {tabela_itens} (id_venda, id_produto, qtd, valor, obs) VALUES (%s, %s, %s, %s, %s)",
+                (id_venda, rnd.choice(produtos), 1, 100, 'Benchmark')
+            )
+        finally:
+            conn.rollback()
+
+    try:
+        com = medir(lambda: inserir('venda', 'venda_produto'), repeticoes)
+        sem = medir(lambda: inserir('bench_venda', 'bench_venda_produto'), repeticoes)
+    finally:
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS bench_venda, bench_venda_produto")
+        cursor.close()
+    return {
+        'com_triggers': com,
+        'sem_triggers': sem,
+        'sobrecarga_p50_ms': round(com['p50_ms'] - sem['p50_ms'], 3),
+    }
+
+
+def bench_suite(conn, repeticoes, escala=None, semente=42):
+    """Mede as operações quentes do sistema e devolve p50/p95/p99 e ops/s de cada uma.
+
+    Com `escala`, popula antes o banco com gerador_dados na escala pedida.
+    Grava vendas e vouchers (realizar_venda, Sorteio): use um banco de TESTE.
+    """
+    if escala:
+        gerador_dados.gerar_dados_escala(conn, escala=escala, semente=semente)
+
+    rnd = random.Random(semente)
+    clientes = ids_da_tabela(conn, 'cliente')
+    produtos = ids_da_tabela(conn, 'produto')
+    transportadoras = ids_da_tabela(conn, 'transportadora') or [None]
+    vendas = ids_da_tabela(conn, 'venda')
+    if not clientes or len(produtos) < 3 or not vendas:
+        raise SystemExit("[ERRO] O banco precisa de clientes, vendas e ao menos 3 produtos (use --escala).")
+
+    destinos = amostra_coluna(conn, "SELECT DISTINCT destino_chave FROM venda") or ['benchmark']
+    receitas = amostra_coluna(conn, "SELECT data_venda, id_vendedor FROM receita_diaria_vendedor") or [(None, None)]
+
+    # estoque para todas as vendas do cenário realizar_venda (3 unidades por pedido)
+    app.execute_query(conn, "UPDATE produto SET quantidade_estoque = quantidade_estoque + %s",
+                      (3 * (repeticoes + 1),))
+
+    def venda():
+        itens = [(id_produto, 1) for id_produto in rnd.sample(produtos, 3)]
+        app.finalizar_carrinho(conn, rnd.choice(clientes), 'Benchmark', rnd.choice(transportadoras), itens)
+
+    def funcao(sql, params):
+        return lambda: app.execute_read(conn, sql, params())
+
+    cenarios = {
+        'realizar_venda (3 itens)': venda,
+        'consultar_vendas (1a página)': lambda: app.buscar_vendas(conn),
+        'consultar_vendas (por cliente)': lambda: app.buscar_vendas(conn, id_cliente=rnd.choice(clientes)),
+        'visualizar_tabela (venda, início)': lambda: app.buscar_pagina(conn, 'venda', 'id'),
+        'visualizar_tabela (venda, salto)': lambda: app.buscar_pagina(conn, 'venda', 'id',
+                                                                     a_partir_de=rnd.choice(vendas)),
+        'visualizar_tabela (view)': lambda: app.buscar_pagina(conn, 'v_produto_vendas_totais', None,
+                                                             offset=rnd.randrange(max(len(produtos) - 20, 1))),
+        'EstatisticasCompletas': lambda: chamar_procedure(conn, 'EstatisticasCompletas'),
+        'Sorteio': lambda: chamar_procedure(conn, 'Sorteio'),
+        'Arrecadado': funcao("SELECT Arrecadado(%s, %s)", lambda: rnd.choice(receitas)),
+        'Soma_fretes': funcao("SELECT Soma_fretes(%s)", lambda: (rnd.choice(destinos),)),
+    }
+
+    resultados = {}
+    for nome, func in cenarios.items():
+        # EstatisticasCompletas varre todas as vendas: poucas repetições bastam
+        n = max(repeticoes // 20, 3) if nome == 'EstatisticasCompletas' else repeticoes
+        resultados[nome] = medir(func, n)
+        r = resultados[nome]
+        print(f"> {nome:<36} p50 {r['p50_ms']:>9.2f} ms   p99 {r['p99_ms']:>9.2f} ms   {r['ops_por_s']:>9.2f} ops/s")
+
+    resultados['triggers venda/venda_produto'] = medir_sobrecarga_triggers(conn, repeticoes, rnd, clientes, produtos)
+    print(f"> {'sobrecarga dos triggers (p50)':<36} {resultados['triggers venda/venda_produto']['sobrecarga_p50_ms']:>9.2f} ms")
+
+    contagens = {t: app.execute_read(conn, f"SELECT COUNT(*) FROM {t}")[0][0]
+                 for t in ('cliente', 'produto', 'venda', 'venda_produto')}
+    return {'linhas': contagens, 'escala': escala, 'repeticoes': repeticoes, 'operacoes': resultados}
+
+
+def bench_contencao(niveis, segundos, semente=42):
+    """Vendas/s de UM produto disputado conforme cresce o número de clientes simultâneos.
+
+    Cada cliente é uma thread com a própria conexão do pool vendendo 1 unidade do
+    mesmo produto em laço por `segundos`. Reporta vendas/s, latência, vendas
+    recusadas por falta de estoque, erros e as retentativas de deadlock/lock wait.
+    """
+    conn = app.get_db_connection()
+    try:
+        clientes = ids_da_tabela(conn, 'cliente', 1000)
+        produtos = ids_da_tabela(conn, 'produto', 1)
+        if not clientes or not produtos:
+            raise SystemExit("[ERRO] São necessários clientes e ao menos 1 produto cadastrados.")
+        id_produto = produtos[0]
+        # estoque folgado: o que se mede é a disputa pela linha, não a falta de estoque
+        app.execute_query(conn, "UPDATE produto SET quantidade_estoque = quantidade_estoque + %s WHERE id = %s",
+                          (10_000_000, id_produto))
+    finally:
+        conn.close()
+
+    resultados = []
+    for n in niveis:
+        parar = threading.Event()
+        latencias = [[] for _ in range(n)]
+        falhas = [{'sem_estoque': 0, 'erros': 0} for _ in range(n)]
+        retentativas_antes = dict(app.RETENTATIVAS)
+
+        def cliente(i):
+            rnd = random.Random(semente + i)
+            conn = app.get_db_connection()
+            try:
+                while not parar.is_set():
+                    t0 = time.perf_counter()
+                    try:
+                        app.finalizar_carrinho(conn, rnd.choice(clientes), 'Benchmark', None, [(id_produto, 1)])
+                        latencias[i].append(time.perf_counter() - t0)
+                    except ValueError:
+                        falhas[i]['sem_estoque'] += 1
+                    except mysql.connector.Error:
+                        falhas[i]['erros'] += 1
+            finally:
+                conn.close()
+
+        threads = [threading.Thread(target=cliente, args=(i,)) for i in range(n)]
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(segundos)
+        parar.set()
+        for t in threads:
+            t.join()
+        total = time.perf_counter() - inicio
+
+        r = resumir_latencias([x for lista in latencias for x in lista], total)
+        r.update({
+            'clientes': n,
+            'sem_estoque': sum(f['sem_estoque'] for f in falhas),
+            'erros': sum(f['erros'] for f in falhas),
+            'retentativas': {str(k): app.RETENTATIVAS[k] - retentativas_antes[k] for k in app.RETENTATIVAS},
+        })
+        resultados.append(r)
+        print(f"> {n:>4} cliente(s): {r['ops_por_s']:10.2f} vendas/s   p99 {r['p99_ms']:>9.2f} ms   "
+              f"retentativas {sum(r['retentativas'].values())}")
+    return {'id_produto': id_produto, 'segundos_por_nivel': segundos, 'niveis': resultados}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do e-commerce")
+    parser.add_argument('--usuario', default=os.environ.get('ECOMMERCE_USER', 'admin'))
+    parser.add_argument('--senha', default=os.environ.get('ECOMMERCE_PASSWORD'),
+                        help="padrão: $ECOMMERCE_PASSWORD; sem ela, a senha é pedida no terminal")
+    parser.add_argument('--saida', help="arquivo JSON para gravar os resultados")
+    sub = parser.add_subparsers(dest='cenario', required=True)
+
+    p_carrinho = sub.add_parser('carrinho', help="pedidos/s conforme cresce o número de linhas por pedido")
+    p_carrinho.add_argument('--linhas', default='1,2,5,10,20')
+    p_carrinho.add_argument('--pedidos', type=int, default=200)
+
+    p_estat = sub.add_parser('estatisticas', help="EstatisticasCompletas x EstatisticasRanqueadas")
+    p_estat.add_argument('--repeticoes', type=int, default=10)
+    p_estat.add_argument('--top', type=int, default=1)
+
+    p_suite = sub.add_parser('suite', help="p50/p95/p99 e ops/s das operações quentes (vendas, consultas, procedures, triggers)")
+    p_suite.add_argument('--escala', type=float, help="popula o banco antes com gerador_dados nessa escala")
+    p_suite.add_argument('--repeticoes', type=int, default=200)
+    p_suite.add_argument('--semente', type=int, default=42)
+
+    p_contencao = sub.add_parser('contencao', help="vendas/s de um produto disputado por N clientes simultâneos")
+    p_contencao.add_argument('--clientes', default='1,2,4,8,16,32')
+    p_contencao.add_argument('--segundos', type=float, default=10)
+
+    args = parser.parse_args()
+    login(args.usuario, args.senha)
+    if args.cenario == 'contencao':
+        # uma conexão por cliente simultâneo
+        app.DB_POOL_SIZE = max(int(n) for n in args.clientes.split(',')) + 1
+
+    conn = app.get_db_connection()
+    if not conn:
+        raise SystemExit(1)
+    try:
+        if args.cenario == 'carrinho':
+            linhas = [int(n) for n in args.linhas.split(',')]
+            resultados = {'carrinho': bench_carrinho(conn, linhas, args.pedidos)}
+        elif args.cenario == 'estatisticas':
+            resultados = {'estatisticas': bench_estatisticas(conn, args.repeticoes, args.top)}
+        elif args.cenario == 'suite':
+            resultados = {'suite': bench_suite(conn, args.repeticoes, args.escala, args.semente)}
+        elif args.cenario == 'contencao':
+            resultados = {'contencao': bench_contencao([int(n) for n in args.clientes.split(',')], args.segundos)}
+    finally:
+        conn.close()
+        app.fechar_pools()
+
+    texto = json.dumps(resultados, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+    print(texto)
+
+
+if __name__ == '__main__':
+    main()
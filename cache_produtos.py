@@ -0,0 +1,125 @@
+"""Cache em memória do catálogo de produtos (nome, preço e vendedor), LRU com TTL.
+
+O estoque NÃO é guardado aqui: ele continua sendo decidido no banco, no UPDATE
+condicional feito no commit da venda. A invalidação usa o contador
+tabela_versao('produto') (migração 0002), incrementado por trigger sempre que
+nome, valor ou vendedor de algum produto mudam, em qualquer sessão. O contador é
+conferido no máximo a cada `intervalo_versao` segundos, então uma edição feita
+em outro terminal aparece aqui em até esse intervalo. Sem a tabela de versão,
+vale só o TTL.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import mysql.connector
+
+ER_NO_SUCH_TABLE = 1146
+
+
+class CacheProdutos:
+    def __init__(self, capacidade=5000, ttl=30.0, intervalo_versao=1.0):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.intervalo_versao = intervalo_versao
+        self._entradas = OrderedDict()   # id -> (expira_em, {'id', 'nome', 'valor', 'id_vendedor'})
+        self._lock = threading.Lock()
+        self._versao = None
+        self._versao_conferida_em = float('-inf')   # a primeira leitura sempre confere a versão
+        self._sem_tabela_versao = False
+        self.estatisticas = {'acertos': 0, 'faltas': 0, 'expirados': 0, 'invalidacoes': 0}
+
+    def _conferir_versao(self, conn):
+        """Esvazia o cache se o contador de versão do catálogo mudou desde a última conferência."""
+        agora = time.monotonic()
+        if self._sem_tabela_versao or agora - self._versao_conferida_em < self.intervalo_versao:
+            return
+        self._versao_conferida_em = agora
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT versao FROM tabela_versao WHERE tabela = 'produto'")
+            row = cursor.fetchone()
+        except mysql.connector.Error as err:
+            if err.errno != ER_NO_SUCH_TABLE:
+                raise
+            self._sem_tabela_versao = True
+            print(f"[AVISO] Tabela tabela_versao ausente (rode 'python manutencao.py migrar'): edições de produtos "
+                  f"feitas em outros terminais só aparecem no cache após o TTL de {self.ttl:g}s.")
+            return
+        finally:
+            cursor.close()
+        versao = row[0] if row else None
+        with self._lock:
+            if self._versao is not None and versao != self._versao:
+                self._entradas.clear()
+                self.estatisticas['invalidacoes'] += 1
+            self._versao = versao
+
+    def obter_varios(self, conn, ids):
+        """Retorna {id: dados} dos produtos existentes entre `ids`; busca as faltas em uma única consulta."""
+        if self.capacidade <= 0:
+            return self._buscar(conn, ids)
+        self._conferir_versao(conn)
+
+        agora = time.monotonic()
+        encontrados = {}
+        faltando = []
+        with self._lock:
+            for id_produto in ids:
+                entrada = self._entradas.get(id_produto)
+                if entrada is not None and entrada[0] > agora:
+                    self._entradas.move_to_end(id_produto)
+                    encontrados[id_produto] = entrada[1]
+                    self.estatisticas['acertos'] += 1
+                else:
+                    if entrada is not None:
+                        del self._entradas[id_produto]
+                        self.estatisticas['expirados'] += 1
+                    faltando.append(id_produto)
+                    self.estatisticas['faltas'] += 1
+
+        if faltando:
+            buscados = self._buscar(conn, faltando)
+            expira_em = time.monotonic() + self.ttl
+            with self._lock:
+                for id_produto, dados in buscados.items():
+                    self._entradas[id_produto] = (expira_em, dados)
+                    self._entradas.move_to_end(id_produto)
+                while len(self._entradas) > self.capacidade:
+                    self._entradas.popitem(last=False)
+            encontrados.update(buscados)
+        return encontrados
+
+    def obter(self, conn, id_produto):
+        return self.obter_varios(conn, [id_produto]).get(id_produto)
+
+    @staticmethod
+    def _buscar(conn, ids):
+        ids = list(ids)
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(
+                f"SELECT id, nome, valor, id_vendedor FROM produto WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                ids
+            )
+            return {row['id']: row for row in cursor.fetchall()}
+        finally:
+            cursor.close()
+
+    def invalidar(self, id_produto=None):
+        """Descarta um produto (ou tudo) sem esperar a próxima conferência de versão."""
+        with self._lock:
+            if id_produto is None:
+                self._entradas.clear()
+            else:
+                self._entradas.pop(id_produto, None)
+            self.estatisticas['invalidacoes'] += 1
+
+    def resumo(self):
+        with self._lock:
+            dados = dict(self.estatisticas)
+            dados['itens'] = len(self._entradas)
+            dados['versao'] = self._versao
+        consultas = dados['acertos'] + dados['faltas']
+        dados['taxa_acerto'] = round(dados['acertos'] / consultas, 4) if consultas else 0.0
+        return dados
@@ -0,0 +1,181 @@
+"""Catálogo da estrutura do banco (tabelas, colunas, tipos, PKs, FKs, auto-incremento).
+
+Carregado uma vez por sessão com três consultas ao INFORMATION_SCHEMA e usado por
+todas as telas genéricas no lugar de SHOW TABLES/DESCRIBE a cada uso. Também guarda
+os comandos INSERT/UPDATE/DELETE parametrizados já montados para cada tabela. O
+catálogo só é recarregado quando alguém chama invalidar() (após DDL explícito).
+"""
+import threading
+
+
+def _texto(valor):
+    # algumas versões do conector devolvem colunas do INFORMATION_SCHEMA como bytes
+    return valor.decode() if isinstance(valor, (bytes, bytearray)) else valor
+
+
+class Tabela:
+    """Metadados de uma tabela ou view e seus comandos parametrizados."""
+
+    def __init__(self, nome, tipo):
+        self.nome = nome
+        self.view = tipo == 'VIEW'
+        self.colunas = []        # [{'nome', 'tipo', 'nulo', 'padrao', 'auto_incremento', 'gerada'}]
+        self.chave = []          # colunas da chave primária, em ordem
+        self.fks = []            # [{'coluna', 'tabela_ref', 'coluna_ref'}]
+        self._comandos = {}
+
+    @property
+    def nomes_colunas(self):
+        return [c['nome'] for c in self.colunas]
+
+    @property
+    def chave_simples(self):
+        """A coluna da PK quando ela é de uma coluna só; None para views e PK composta."""
+        return self.chave[0] if len(self.chave) == 1 else None
+
+    @property
+    def coluna_id(self):
+        """Coluna usada para localizar um registro nas telas genéricas (PK, ou a primeira coluna)."""
+        return self.chave_simples or (self.colunas[0]['nome'] if self.colunas else None)
+
+    def coluna(self, nome):
+        return next((c for c in self.colunas if c['nome'] == nome), None)
+
+    @property
+    def colunas_editaveis(self):
+        """Colunas que aceitam valor do usuário (sem auto-incremento e sem colunas geradas)."""
+        return [c for c in self.colunas if not c['auto_incremento'] and not c['gerada']]
+
+    def sql_insert(self, colunas=None):
+        colunas = tuple(colunas or (c['nome'] for c in self.colunas_editaveis))
+        chave = ('insert', colunas)
+        if chave not in self._comandos:
+            self._comandos[chave] = (f"INSERT INTO {self.nome} ({', '.join(colunas)}) "
+                                     f"VALUES ({', '.join(['%s'] * len(colunas))})")
+        return self._comandos[chave]
+
+    def sql_update(self, colunas):
+        colunas = tuple(colunas)
+        chave = ('update', colunas)
+        if chave not in self._comandos:
+            self._comandos[chave] = (f"UPDATE {self.nome} SET {', '.join(f'{c} = %s' for c in colunas)} "
+                                     f"WHERE {self.coluna_id} = %s")
+        return self._comandos[chave]
+
+    @property
+    def sql_delete(self):
+        if 'delete' not in self._comandos:
+            self._comandos['delete'] = f"DELETE FROM {self.nome} WHERE {self.coluna_id} = %s"
+        return self._comandos['delete']
+
+    @property
+    def sql_select_id(self):
+        if 'select' not in self._comandos:
+            self._comandos['select'] = f"SELECT * FROM {self.nome} WHERE {self.coluna_id} = %s"
+        return self._comandos['select']
+
+
+class CatalogoEsquema:
+    def __init__(self):
+        self._tabelas = None
+        self._lock = threading.Lock()
+        self.carregamentos = 0
+
+    @property
+    def carregado(self):
+        return self._tabelas is not None
+
+    def carregar(self, conn):
+        """Lê tabelas, colunas e chaves do banco atual (só o que o usuário logado enxerga)."""
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                SELECT TABLE_NAME, TABLE_TYPE FROM INFORMATION_SCHEMA.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME
+            """)
+            tabelas = {_texto(nome): Tabela(_texto(nome), _texto(tipo)) for nome, tipo in cursor.fetchall()}
+
+            cursor.execute("""
+                SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT, EXTRA, GENERATION_EXPRESSION
+                FROM INFORMATION_SCHEMA.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, ORDINAL_POSITION
+            """)
+            for row in cursor.fetchall():
+                tabela, coluna, tipo, nulo, padrao, extra, expressao = (_texto(v) for v in row)
+                if tabela not in tabelas:
+                    continue
+                extra = (extra or '').lower()
+                tabelas[tabela].colunas.append({
+                    'nome': coluna,
+                    'tipo': tipo,
+                    'nulo': nulo == 'YES',
+                    'padrao': padrao,
+                    'auto_incremento': 'auto_increment' in extra,
+                    # no MySQL 8 um DEFAULT CURRENT_TIMESTAMP comum aparece como EXTRA='DEFAULT_GENERATED':
+                    # coluna gerada é só a que tem expressão (VIRTUAL/STORED GENERATED)
+                    'gerada': bool(expressao) or 'virtual generated' in extra or 'stored generated' in extra,
+                })
+
+            cursor.execute("""
+                SELECT TABLE_NAME, COLUMN_NAME, CONSTRAINT_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+                FROM INFORMATION_SCHEMA.KEY_COLUMN_USAGE
+                WHERE TABLE_SCHEMA = DATABASE()
+                  AND (CONSTRAINT_NAME = 'PRIMARY' OR REFERENCED_TABLE_NAME IS NOT NULL)
+                ORDER BY TABLE_NAME, CONSTRAINT_NAME, ORDINAL_POSITION
+            """)
+            for row in cursor.fetchall():
+                tabela, coluna, restricao, tabela_ref, coluna_ref = (_texto(v) for v in row)
+                if tabela not in tabelas:
+                    continue
+                if restricao == 'PRIMARY':
+                    tabelas[tabela].chave.append(coluna)
+                else:
+                    tabelas[tabela].fks.append({'coluna': coluna, 'tabela_ref': tabela_ref, 'coluna_ref': coluna_ref})
+        finally:
+            cursor.close()
+
+        with self._lock:
+            self._tabelas = tabelas
+            self.carregamentos += 1
+
+    def garantir(self, conn):
+        """Carrega o catálogo na primeira vez que for usado na sessão."""
+        if self._tabelas is None:
+            self.carregar(conn)
+        return self
+
+    def invalidar(self):
+        """Descarta o catálogo (chamar após CREATE/ALTER/DROP); o próximo uso recarrega."""
+        with self._lock:
+            self._tabelas = None
+
+    def nomes(self, incluir_views=True):
+        return [t.nome for t in self._tabelas.values() if incluir_views or not t.view]
+
+    def tabela(self, nome):
+        return self._tabelas.get(nome)
+
+    def dependentes(self, nome):
+        """Tabelas com FK apontando para `nome` (filhas), sem repetição."""
+        return sorted({t.nome for t in self._tabelas.values()
+                       if t.nome != nome and any(fk['tabela_ref'] == nome for fk in t.fks)})
+
+    def ordem_dependencias(self, nomes=None):
+        """Ordena tabelas de modo que as referenciadas (pais) venham antes das que as referenciam (filhas).
+
+        Para carregar, use essa ordem; para apagar, a inversa. Um eventual ciclo de FKs é
+        quebrado pela ordem alfabética.
+        """
+        nomes = sorted(nomes if nomes is not None else self.nomes(incluir_views=False))
+        restantes = set(nomes)
+        ordem = []
+        while restantes:
+            prontas = [n for n in sorted(restantes)
+                       if not any(fk['tabela_ref'] in restantes and fk['tabela_ref'] != n
+                                  for fk in self._tabelas[n].fks)]
+            if not prontas:
+                prontas = [min(restantes)]
+            for n in prontas:
+                ordem.append(n)
+                restantes.discard(n)
+        return ordem
@@ -1,81 +1,228 @@
 import mysql.connector
 from datetime import date, datetime
+from decimal import Decimal
 import random
 import os
+import getpass
 import time
 from tabulate import tabulate
 import warnings
+from contextlib import contextmanager
+from conexao import PoolConexoes
+from cache_produtos import CacheProdutos
+from catalogo import CatalogoEsquema
+import snapshots
+import instrumentacao
+try:
+    import numpy as np
+except ImportError:  # NumPy só é necessário para a demografia em lote
+    np = None
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
 # --- 1. Configuração do Banco de Dados e Conexão ---
 DB_HOST = 'localhost'
 DB_DATABASE = 'ecommerce'
+DB_UNIX_SOCKET = '/opt/lampp/var/mysql/mysql.sock'
+DB_POOL_SIZE = int(os.environ.get('ECOMMERCE_POOL_SIZE', '5'))
+DB_POOL_TIMEOUT = float(os.environ.get('ECOMMERCE_POOL_TIMEOUT', '10'))
+
+# Cache de nome/preço/vendedor dos produtos (o estoque sempre vem do banco)
+CACHE_PRODUTOS = CacheProdutos(
+    capacidade=int(os.environ.get('ECOMMERCE_CACHE_PRODUTOS', '5000')),
+    ttl=float(os.environ.get('ECOMMERCE_CACHE_PRODUTOS_TTL', '30')),
+    intervalo_versao=float(os.environ.get('ECOMMERCE_CACHE_PRODUTOS_VERSAO', '1')),
+)
+
+# Estrutura do banco (tabelas, colunas, chaves) carregada uma vez por sessão
+CATALOGO = CatalogoEsquema()
 
 # Variáveis GLOBAIS MUTÁVEIS para as credenciais atuais
 CURRENT_USER = ''
 CURRENT_PASSWORD = ''
 
+def senha_linha_de_comando(senha=None):
+    """Senha dos scripts de linha de comando: --senha/ECOMMERCE_PASSWORD ou, sem elas, pergunta no terminal."""
+    return senha or getpass.getpass(f"Senha do MySQL para '{CURRENT_USER}': ")
+
+# Pools de conexão por usuário logado (chave: (CURRENT_USER, use_db))
+POOLS = {}
+
+def get_pool(use_db=True):
+    """Retorna (criando se preciso) o pool de conexões do CURRENT_USER."""
+    chave = (CURRENT_USER, use_db)
+    pool = POOLS.get(chave)
+    if pool is None:
+        config = {
+            'host': DB_HOST,
+            'user': CURRENT_USER,
+            'password': CURRENT_PASSWORD,
+            'unix_socket': DB_UNIX_SOCKET,
+            # Leituras não abrem transação nem precisam de commit; escritas usam
+            # start_transaction() explícito (ver execute_query e transacao).
+            'autocommit': True
+        }
+        if use_db:
+            config['database'] = DB_DATABASE
+        pool = PoolConexoes(config, tamanho=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT)
+        POOLS[chave] = pool
+    return pool
+
 def get_db_connection(use_db=True):
-    """Cria e retorna uma conexão com o banco de dados (via XAMPP)."""
+    """Empresta uma conexão validada do pool do usuário atual (close() a devolve ao pool)."""
     if not CURRENT_USER or not CURRENT_PASSWORD:
         return None
-        
-    config = {
-        'host': 'localhost',
-        'user': CURRENT_USER,
-        'password': CURRENT_PASSWORD,
-        'unix_socket': '/opt/lampp/var/mysql/mysql.sock'
-    }
-    
-    if use_db:
-        config['database'] = DB_DATABASE
-    
+
     try:
-        conn = mysql.connector.connect(**config)
-        return conn
+        return get_pool(use_db).emprestar()
     except mysql.connector.Error as err:
         print(f"[ERRO] Erro ao conectar ao MySQL: {err}")
         print("Verifique o usuário, senha e se o servidor está em execução.")
         return None
 
+def fechar_pools():
+    """Fecha os pools de todos os usuários (usado no logout)."""
+    for pool in POOLS.values():
+        pool.fechar()
+    POOLS.clear()
+    # cada usuário enxerga tabelas diferentes: o catálogo é recarregado no próximo login
+    CATALOGO.invalidar()
 
-def execute_query(conn, query, params=None, fetch=False):
-    """Executa consultas SQL e trata exceções."""
+def com_conexao(acao, *args):
+    """Empresta uma conexão do pool para uma única ação de menu e a devolve ao final."""
+    conn = get_db_connection()
+    if not conn:
+        print("[ERRO] Não foi possível obter uma conexão do pool.")
+        return None
     try:
+        return acao(conn, *args)
+    finally:
+        conn.close()
 
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute(query, params)
+def exibir_metricas_pool():
+    """Mostra checkouts, tempo de espera e ocupação de cada pool de conexões."""
+    if not POOLS:
+        print("[INFO] Nenhum pool de conexões ativo.")
+        return
+    linhas = []
+    for (usuario, use_db), pool in POOLS.items():
+        m = pool.resumo()
+        linhas.append([
+            usuario, 'sim' if use_db else 'não', m['tamanho'], m['em_uso'], m['livres'],
+            m['emprestimos'], m['conexoes_criadas'], m['reconexoes'], m['timeouts'],
+            f"{m['espera_media_ms']:.3f}", f"{m['espera_max_s'] * 1000:.3f}"
+        ])
+    print(tabulate(linhas, headers=[
+        'usuário', 'db', 'tamanho', 'em uso', 'livres', 'checkouts', 'criadas',
+        'reconexões', 'timeouts', 'espera média (ms)', 'espera máx (ms)'
+    ], tablefmt="grid"))
+    c = CACHE_PRODUTOS.resumo()
+    print(f"Cache de produtos: {c['itens']} itens, {c['taxa_acerto']:.1%} de acerto "
+          f"({c['acertos']} acertos, {c['faltas']} faltas, {c['invalidacoes']} invalidações).")
+
+def exibir_metricas_sql(limite=15):
+    """Mostra os comandos SQL mais caros da sessão e exporta as métricas se houver arquivo configurado."""
+    if not instrumentacao.ATIVO:
+        print("[INFO] Instrumentação desligada. Defina ECOMMERCE_METRICAS=1 para medir os comandos SQL.")
+        return
+    linhas = [[r['execucoes'], r['erros'], r['linhas'], r['total_ms'], r['media_ms'], r['p95_ms'], r['max_ms'],
+               r['comando'][:80]] for r in instrumentacao.resumo(limite)]
+    if not linhas:
+        print("[INFO] Nenhum comando medido ainda.")
+        return
+    print(tabulate(linhas, headers=[
+        'execuções', 'erros', 'linhas', 'total (ms)', 'média (ms)', 'p95 (ms)', 'máx (ms)', 'comando'
+    ], tablefmt="grid"))
+    print(f"Consultas acima de {instrumentacao.LIMITE_LENTO_MS:g} ms vão para {instrumentacao.ARQUIVO_LENTAS}.")
+    caminho = instrumentacao.exportar_arquivo()
+    if caminho:
+        print(f"[OK] Métricas exportadas para {caminho}.")
 
-        results = []
 
-        try:
-            if fetch:
-                while True:
-                    part = cursor.fetchall()
-                    if part:
-                        results.extend(part)
-
-                    if hasattr(cursor, "next_result"):
-                        if not cursor.next_result():
-                            break
-                    else:
-                        break
-        except mysql.connector.InterfaceError:
-            pass
-        except mysql.connector.ProgrammingError:
-            pass
+def execute_query(conn, query, params=None, fetch=False, dictionary=True):
+    """Executa comandos de ESCRITA em uma transação explícita e trata exceções.
 
-        conn.commit()
-        cursor.close()
+    Se o chamador já abriu uma transação (ver transacao()), o comando participa
+    dela e o commit fica a cargo do chamador.
+    """
+    cursor = None
+    transacao_propria = False
+    try:
+        if not conn.in_transaction:
+            conn.start_transaction()
+            transacao_propria = True
+
+        cursor = conn.cursor(dictionary=dictionary)
+        cursor.execute(query, params)
+        results = cursor.fetchall() if fetch and cursor.with_rows else []
+
+        if transacao_propria:
+            conn.commit()
         return results if fetch else True
 
     except mysql.connector.Error as err:
+        print(f"[ERRO SQL] {err}")
         try:
-            if conn.is_connected():
+            if transacao_propria and conn.is_connected():
                 conn.rollback()
         except:
             pass
         return None
+    finally:
+        if cursor:
+            cursor.close()
+
+
+def execute_read(conn, query, params=None, dictionary=False):
+    """Executa consultas de LEITURA: sem transação e sem commit (a sessão é autocommit).
+
+    Retorna as linhas como tuplas, ou como dicionários se dictionary=True.
+    """
+    cursor = None
+    try:
+        cursor = conn.cursor(dictionary=dictionary)
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    except mysql.connector.Error as err:
+        print(f"[ERRO SQL] {err}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+
+
+@contextmanager
+def transacao(conn, isolation_level=None):
+    """Agrupa vários comandos de escrita em uma única transação (um único commit)."""
+    conn.start_transaction(isolation_level=isolation_level)
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+# Deadlock (1213) e espera de trava esgotada (1205): a transação pode ser refeita do zero
+ERROS_RETENTAVEIS = (1213, 1205)
+TENTATIVAS_TRANSACAO = 5
+BACKOFF_BASE_S = 0.005
+BACKOFF_MAX_S = 0.2
+RETENTATIVAS = {1213: 0, 1205: 0}
+
+def com_retentativa(acao, tentativas=TENTATIVAS_TRANSACAO):
+    """Executa acao() (uma transação completa) repetindo em deadlock/lock wait timeout.
+
+    Espera com backoff exponencial limitado e jitter entre as tentativas; na última
+    falha o erro é repassado ao chamador. RETENTATIVAS conta as repetições por código.
+    """
+    for tentativa in range(1, tentativas + 1):
+        try:
+            return acao()
+        except mysql.connector.Error as err:
+            if err.errno not in ERROS_RETENTAVEIS or tentativa == tentativas:
+                raise
+            RETENTATIVAS[err.errno] += 1
+            time.sleep(random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** tentativa)))
 
 
 def clear_screen():
@@ -204,22 +351,25 @@ def preencher_dados_nativos(conn):
     print("\n[SUCESSO] Dados nativos inseridos com sucesso!")
 
 def criar_e_destruir_db():
-    """ADMIN: Limpa o banco (TRUNCATE) e opcionalmente insere dados nativos."""
+    """ADMIN: Limpa o banco (TRUNCATE), insere dados nativos ou salva/restaura snapshots."""
     if not check_permission(['Administrador']):
         return
 
     print("\n--- GERENCIAMENTO DE DADOS NATIVOS (ADMIN) ---")
     print("1. LIMPAR E PREENCHER (Dados de teste: clientes, produtos, etc.)")
     print("2. LIMPAR APENAS (Deixar todas as tabelas ZERADAS)")
-    print("3. Voltar/Cancelar")
+    print("3. LIMPAR E GERAR DADOS EM ESCALA (Histórico de vendas sintético)")
+    print("4. SALVAR SNAPSHOT (Guarda o estado atual com um nome)")
+    print("5. RESTAURAR SNAPSHOT (Volta todas as tabelas a um estado salvo)")
+    print("6. Voltar/Cancelar")
     
     escolha_setup = input("Escolha uma opção: ").strip()
     
-    if escolha_setup == '3':
+    if escolha_setup == '6':
         print("Ação cancelada pelo usuário.")
         return
 
-    if escolha_setup not in ['1', '2']:
+    if escolha_setup not in ['1', '2', '3', '4', '5']:
         print("[ERRO] Opção inválida.")
         return
 
@@ -228,32 +378,26 @@ def criar_e_destruir_db():
         print("[ERRO] Falha na conexão. Certifique-se de que o DB 'ecommerce' existe e está acessível.")
         return
 
-    cursor = None
     try:
+        if escolha_setup == '4':
+            salvar_snapshot_banco(conn)
+            return
+        if escolha_setup == '5':
+            restaurar_snapshot_banco(conn)
+            return
+
         confirm = input(f"Confirma a limpeza das tabelas (TRUNCATE)? Esta ação é irreversível! (s/n): ").strip().lower()
         if confirm != 's':
             print("Ação cancelada pelo usuário.")
             return
 
-        cursor = conn.cursor()
-
         print("\n> Limpando tabelas...")
-        comandos_limpeza = [
-            "SET FOREIGN_KEY_CHECKS = 0",
-            "TRUNCATE TABLE venda_produto",
-            "TRUNCATE TABLE venda",
-            "TRUNCATE TABLE cliente_especial",
-            "TRUNCATE TABLE cliente",
-            "TRUNCATE TABLE produto",
-            "TRUNCATE TABLE vendedor",
-            "TRUNCATE TABLE transportadora",
-            "SET FOREIGN_KEY_CHECKS = 1"
-        ]
-
-        for cmd in comandos_limpeza:
-            cursor.execute(cmd)
-
-        conn.commit()
+        # todas as tabelas do banco (inclusive transporte, voucher, logs e totais mantidos por triggers)
+        snapshots.limpar_tabelas(conn, snapshots.tabelas_do_banco(catalogo(conn)))
+        CACHE_PRODUTOS.invalidar()
+        # o TRUNCATE apagou a marca d'água (resumo_refresh) e reiniciou os ids de venda_produto:
+        # a reconstrução com as tabelas vazias regrava as duas linhas em 0 e zera os mv_*
+        atualizar_resumos(conn, completo=True)
         print("> Tabelas limpas com sucesso.")
         
         # Opção 1: Limpar e Preencher
@@ -265,17 +409,83 @@ def criar_e_destruir_db():
         elif escolha_setup == '2':
             print("\n[SUCESSO] O banco de dados foi limpo e está ZERADO.")
 
+        # Opção 3: Limpar e gerar dados sintéticos em escala
+        elif escolha_setup == '3':
+            from gerador_dados import gerar_dados_escala
+            try:
+                escala = float(input("Fator de escala (1.0 = 100 mil clientes / 500 mil vendas) [0.01]: ").strip() or 0.01)
+                semente = int(input("Semente aleatória [42]: ").strip() or 42)
+            except ValueError:
+                print("[ERRO] Valor inválido. As tabelas ficaram ZERADAS.")
+            else:
+                gerar_dados_escala(conn, escala, semente)
+
+        if escolha_setup in ('1', '3'):
+            resumo = atualizar_resumos(conn)
+            print(f"> Resumos das views atualizados ({resumo.get('linhas_aplicadas', 0)} linha(s) de venda_produto).")
 
     except Exception as e:
         print(f"[ERRO GERAL] Erro durante a tentativa de preenchimento/limpeza: {e}")
     finally:
-        if cursor:
-            cursor.close()
         if conn and conn.is_connected():
             conn.close()
             
     input("Pressione Enter para continuar...")
 
+def salvar_snapshot_banco(conn):
+    """ADMIN: Grava o estado atual de todas as tabelas como um snapshot nomeado."""
+    nome = input("Nome do snapshot (ex.: demo_inicial): ").strip()
+    if not nome:
+        print("[ERRO] Informe um nome.")
+        return
+    existentes = {s['nome'] for s in snapshots.listar_snapshots()}
+    sobrescrever = False
+    if nome in existentes:
+        if input(f"O snapshot '{nome}' já existe. Sobrescrever? (s/n): ").strip().lower() != 's':
+            print("Ação cancelada pelo usuário.")
+            return
+        sobrescrever = True
+    try:
+        manifesto = snapshots.salvar_snapshot(conn, catalogo(conn), nome, sobrescrever=sobrescrever)
+    except ValueError as err:
+        print(f"[ERRO] {err}")
+        return
+    except mysql.connector.Error as err:
+        print(f"[ERRO SQL] {err}")
+        return
+    linhas = sum(t['linhas'] for t in manifesto['tabelas'])
+    tamanho = sum(t['bytes'] for t in manifesto['tabelas'])
+    print(f"[SUCESSO] Snapshot '{nome}' salvo: {linhas:,} linhas, {tamanho / 1024 / 1024:.1f} MB em {manifesto['segundos']:.2f}s.")
+
+def restaurar_snapshot_banco(conn):
+    """ADMIN: Substitui o conteúdo de todas as tabelas pelo de um snapshot salvo."""
+    disponiveis = snapshots.listar_snapshots()
+    if not disponiveis:
+        print("[INFO] Nenhum snapshot salvo. Use a opção 4 primeiro.")
+        return
+    print(tabulate([[s['nome'], s['criado_em'], s['tabelas'], f"{s['linhas']:,}", f"{s['bytes'] / 1024 / 1024:.1f} MB"]
+                    for s in disponiveis], headers=['Nome', 'Criado em', 'Tabelas', 'Linhas', 'Tamanho'], tablefmt="fancy_grid"))
+    nome = input("Snapshot a restaurar: ").strip()
+    if nome not in {s['nome'] for s in disponiveis}:
+        print("[ERRO] Snapshot não encontrado.")
+        return
+    if input(f"Todas as tabelas serão substituídas pelo snapshot '{nome}'. Confirma? (s/n): ").strip().lower() != 's':
+        print("Ação cancelada pelo usuário.")
+        return
+    try:
+        relatorio = snapshots.restaurar_snapshot(conn, catalogo(conn), nome)
+    except ValueError as err:
+        print(f"[ERRO] {err}")
+        return
+    except mysql.connector.Error as err:
+        print(f"[ERRO SQL] {err}")
+        return
+    finally:
+        CACHE_PRODUTOS.invalidar()
+    linhas = sum(t['linhas'] for t in relatorio['tabelas'].values())
+    print(f"[SUCESSO] Snapshot '{nome}' restaurado: {linhas:,} linhas em {relatorio['total_s']:.2f}s "
+          f"(índices: {relatorio['indices_s']:.2f}s).")
+
 def cadastrar_produto(conn):
     """ADMIN/FUNCIONARIO: Cadastra um novo produto."""
     if not check_permission(['Administrador', 'Funcionario']): return 
@@ -331,8 +541,92 @@ def cadastrar_cliente(conn):
         print("[ERRO] Falha ao cadastrar cliente.")
 
 
+FRETE_PERCENTUAL = 0.05  # mesmo frete de 5% aplicado pela procedure Venda
+
+
+def finalizar_carrinho(conn, id_cliente, endereco, id_transportadora, itens):
+    """Registra uma venda com N itens em UMA transação e retorna (id_venda, total).
+
+    itens: lista de (id_produto, qtd). Os preços vêm de CACHE_PRODUTOS; o estoque
+    não é cacheado e é reservado com um único UPDATE
+    condicional (quantidade_estoque >= qtd) feito por último, logo antes do commit,
+    para que a linha de um produto disputado fique travada o mínimo possível; se
+    alguma linha não for afetada, a transação inteira é desfeita. Deadlocks e
+    esperas de trava esgotadas são repetidos com backoff (ver com_retentativa).
+    Levanta ValueError se algum produto não existir ou não tiver estoque.
+    """
+    quantidades = {}
+    for id_produto, qtd in itens:
+        if qtd <= 0:
+            raise ValueError(f"Quantidade inválida para o produto {id_produto}.")
+        quantidades[id_produto] = quantidades.get(id_produto, 0) + qtd
+    if not quantidades:
+        raise ValueError("Carrinho vazio.")
+
+    return com_retentativa(lambda: _gravar_carrinho(conn, id_cliente, endereco, id_transportadora, quantidades))
+
+
+def _gravar_carrinho(conn, id_cliente, endereco, id_transportadora, quantidades):
+    # ordem crescente de id: todas as vendas travam os produtos na mesma ordem
+    ids = sorted(quantidades)
+    marcadores = ', '.join(['%s'] * len(ids))
+
+    produtos = CACHE_PRODUTOS.obter_varios(conn, ids)
+    for id_produto in ids:
+        if id_produto not in produtos:
+            raise ValueError(f"Produto ID {id_produto} não encontrado.")
+    precos = {id_produto: dados['valor'] for id_produto, dados in produtos.items()}
+
+    cursor = conn.cursor()
+    try:
+        with transacao(conn):
+
+            linhas = [(id_produto, quantidades[id_produto], precos[id_produto] * quantidades[id_produto])
+                      for id_produto in ids]
+            total = sum(valor for _, _, valor in linhas)
+
+            cursor.execute(
+                """
+                INSERT INTO venda (data_venda, hora_venda, valor, endereco, id_cliente)
+                VALUES (CURDATE(), CURTIME(), %s, %s, %s)
+                """,
+                (total, endereco, id_cliente)
+            )
+            id_venda = cursor.lastrowid
+
+            cursor.executemany(
+                "INSERT INTO venda_produto (id_venda, id_produto, qtd, valor, obs) VALUES (%s, %s, %s, %s, %s)",
+                [(id_venda, id_produto, qtd, valor, f"Venda de {qtd} unidade(s).") for id_produto, qtd, valor in linhas]
+            )
+
+            cursor.execute(
+                "INSERT INTO transporte (id_transportadora, id_venda, valor) VALUES (%s, %s, %s)",
+                (id_transportadora, id_venda, round(total * Decimal(str(FRETE_PERCENTUAL)), 2))
+            )
+
+            # reserva atômica: só baixa se houver estoque para TODOS os itens
+            casos = ' '.join(['WHEN %s THEN %s'] * len(ids))
+            params = [v for id_produto in ids for v in (id_produto, quantidades[id_produto])]
+            cursor.execute(
+                f"UPDATE produto SET quantidade_estoque = quantidade_estoque - CASE id {casos} END "
+                f"WHERE id IN ({marcadores}) AND quantidade_estoque >= CASE id {casos} END",
+                params + ids + params
+            )
+            if cursor.rowcount < len(ids):
+                cursor.execute(f"SELECT id, quantidade_estoque FROM produto WHERE id IN ({marcadores})", ids)
+                estoques = dict(cursor.fetchall())
+                faltando = next((i for i in ids if estoques.get(i, 0) < quantidades[i]), ids[0])
+                raise ValueError(
+                    f"Estoque insuficiente para o produto {faltando}. Apenas {estoques.get(faltando, 0)} restantes."
+                )
+    finally:
+        cursor.close()
+
+    return id_venda, total
+
+
 def realizar_venda(conn):
-    """FUNCIONARIO: Realiza uma venda com 1 produto e reduz o estoque (Corrigido para evitar duplicação)."""
+    """FUNCIONARIO: Realiza uma venda com um ou mais produtos (carrinho) e reduz o estoque."""
     if not check_permission(['Funcionario', 'Administrador']):
         return
 
@@ -343,116 +637,191 @@ def realizar_venda(conn):
         endereco = input("Endereço de Destino: ")
         id_transporte = input("ID da Transportadora: ")
         id_transporte = int(id_transporte) if id_transporte.strip() else None
-        id_produto = int(input("ID do Produto: "))
-        qtd = int(input("Quantidade: "))
+
+        itens = []
+        print("Adicione os produtos do carrinho (ID do Produto vazio para finalizar).")
+        while True:
+            id_produto = input(f"ID do Produto #{len(itens) + 1}: ").strip()
+            if not id_produto:
+                break
+            qtd = int(input("Quantidade: "))
+            itens.append((int(id_produto), qtd))
     except ValueError:
         print("[ERRO] Entrada inválida. Venda cancelada.")
         return
 
-    produto_info = execute_query(
-        conn,
-        "SELECT valor, quantidade_estoque FROM produto WHERE id = %s",
-        (id_produto,),
-        fetch=True
-    )
-    if not produto_info:
-        print(f"[ERRO] Produto ID {id_produto} não encontrado.")
+    if not itens:
+        print("[INFO] Carrinho vazio. Venda cancelada.")
         return
 
-    if produto_info[0]['quantidade_estoque'] < qtd:
-        print(f"[ERRO] Estoque insuficiente. Apenas {produto_info[0]['quantidade_estoque']} restantes.")
-        return
-
-    valor_unitario = produto_info[0]['valor']
-    total_item = valor_unitario * qtd
-
-    cursor = None
     try:
-        print("[INFO] Tentando registrar venda via Stored Procedure (Venda)...")
-        cursor = conn.cursor()
-        
-        cursor.callproc("Venda", (id_cliente, id_produto, qtd, id_transporte)) 
-        
-        conn.commit()
-        print("[SUCESSO] Venda realizada via Stored Procedure!")
-
-    except Exception:
-        try:
-            conn.rollback()
-            cursor = conn.cursor()
-            query_venda = """
-                INSERT INTO venda (data_venda, hora_venda, valor, endereco, id_cliente, id_transporte)
-                VALUES (CURDATE(), CURTIME(), %s, %s, %s, %s)
-            """
-            cursor.execute(query_venda, (total_item, endereco, id_cliente, id_transporte))
-            id_venda = cursor.lastrowid
-            conn.commit()
-            cursor.close()
-            cursor = None
-            
-            if not id_venda:
-                raise Exception("Falha ao criar registro da venda manual.")
-
-            query_vp = "INSERT INTO venda_produto (id_venda, id_produto, qtd, valor) VALUES (%s, %s, %s, %s)"
-            execute_query(conn, query_vp, (id_venda, id_produto, qtd, total_item))
+        id_venda, total = finalizar_carrinho(conn, id_cliente, endereco, id_transporte, itens)
+        print(f"[SUCESSO] Venda (ID: {id_venda}) realizada com {len(itens)} item(ns)! Total: R$ {total:.2f}")
+    except ValueError as e:
+        print(f"[ERRO] {e} Venda cancelada.")
+    except mysql.connector.Error as err:
+        print(f"[ERRO SQL] {err}")
 
-            execute_query(conn, "UPDATE produto SET quantidade_estoque = quantidade_estoque - %s WHERE id = %s",
-                          (qtd, id_produto))
 
-            print(f"[SUCESSO] Venda (ID: {id_venda}) realizada manualmente! Total: R$ {total_item:.2f}")
+def buscar_vendas(conn, limite=10, data_inicio=None, data_fim=None, id_cliente=None,
+                  antes_de=None, depois_de=None):
+    """Retorna uma página do histórico de vendas, da mais recente para a mais antiga.
 
-        except:
-            pass
+    Primeiro escolhe os ids da página pelo índice (data_venda, hora_venda, id) -- ou
+    (id_cliente, data_venda, hora_venda, id) quando filtrado por cliente -- e só então
+    busca os produtos dessas vendas, então o custo não depende do tamanho da tabela.
+    antes_de/depois_de recebem a chave (data_venda, hora_venda, id) de uma venda já
+    exibida para paginar para vendas mais antigas/mais recentes.
 
+    Erros do banco são propagados (mysql.connector.Error), não impressos: quem chama
+    decide como avisar o usuário.
+    """
+    condicoes = []
+    params = []
+    if data_inicio:
+        condicoes.append("v.data_venda >= %s")
+        params.append(data_inicio)
+    if data_fim:
+        condicoes.append("v.data_venda <= %s")
+        params.append(data_fim)
+    if id_cliente:
+        condicoes.append("v.id_cliente = %s")
+        params.append(id_cliente)
+
+    # a comparação de tupla sozinha nem sempre vira faixa no índice; o limite simples
+    # em data_venda (redundante para o resultado) garante a busca por faixa
+    ordem = 'DESC'
+    if antes_de:
+        condicoes.append("v.data_venda <= %s AND (v.data_venda, v.hora_venda, v.id) < (%s, %s, %s)")
+        params.extend((antes_de[0], *antes_de))
+    elif depois_de:
+        condicoes.append("v.data_venda >= %s AND (v.data_venda, v.hora_venda, v.id) > (%s, %s, %s)")
+        params.extend((depois_de[0], *depois_de))
+        ordem = 'ASC'
+
+    where = ("WHERE " + " AND ".join(condicoes)) if condicoes else ""
+    query = f"""
+    SELECT v.id, v.data_venda, v.hora_venda, v.valor, c.nome AS cliente
+    FROM venda v
+    JOIN cliente c ON v.id_cliente = c.id
+    {where}
+    ORDER BY v.data_venda {ordem}, v.hora_venda {ordem}, v.id {ordem}
+    LIMIT %s
+    """
+    params.append(limite)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(query, params)
+        vendas = cursor.fetchall()
+    finally:
+        cursor.close()
+    if not vendas:
+        return vendas
+    if ordem == 'ASC':
+        vendas.reverse()
 
+    ids = [v['id'] for v in vendas]
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            f"""
+            SELECT vp.id_venda, p.nome, vp.qtd
+            FROM venda_produto vp
+            JOIN produto p ON vp.id_produto = p.id
+            WHERE vp.id_venda IN ({', '.join(['%s'] * len(ids))})
+            ORDER BY vp.id
+            """,
+            ids
+        )
+        itens = cursor.fetchall()
     finally:
-        if cursor:
-            cursor.close()
+        cursor.close()
+
+    produtos = {}
+    for id_venda, nome, qtd in itens:
+        produtos.setdefault(id_venda, []).append(f"{nome} ({qtd}x)")
+    for v in vendas:
+        v['produtos'] = ",".join(produtos.get(v['id'], [])) or '-'
+    return vendas
 
 
 def consultar_vendas(conn):
-    """FUNCIONARIO: Consulta registros de venda (Últimas 10 vendas)."""
+    """FUNCIONARIO: Consulta registros de venda (10 por página, com filtros de data e cliente)."""
     if not check_permission(['Funcionario', 'Administrador']): return
     
-    print("\n--- Consultar Registros de Venda (Últimas 10) ---")
-    query = """
-    SELECT 
-        v.id, 
-        v.data_venda, 
-        v.valor, 
-        c.nome AS cliente, 
-        GROUP_CONCAT(CONCAT(p.nome, ' (', vp.qtd, 'x)')) AS produtos 
-    FROM venda v 
-    JOIN cliente c ON v.id_cliente = c.id 
-    JOIN venda_produto vp ON v.id = vp.id_venda 
-    JOIN produto p ON vp.id_produto = p.id 
-    GROUP BY v.id 
-    ORDER BY v.data_venda DESC 
-    LIMIT 10
-    """
-    vendas = execute_query(conn, query, fetch=True)
-    
-    if vendas:
-        print("\nID | Data | Valor Total | Cliente | Produtos Envolvidos")
-        print("-" * 70)
-        for v in vendas:
-            produtos_display = (v['produtos'][:40] + '...') if len(v['produtos']) > 40 else v['produtos']
-            print(f"{v['id']:<2} | {v['data_venda']} | R$ {v['valor']:<10.2f} | {v['cliente']:<15} | {produtos_display}")
-    else:
-        print("Nenhuma venda encontrada.")
+    print("\n--- Consultar Registros de Venda (10 por página) ---")
+    try:
+        data_inicio = input("Data inicial (AAAA-MM-DD) [Enter = sem filtro]: ").strip() or None
+        data_fim = input("Data final (AAAA-MM-DD) [Enter = sem filtro]: ").strip() or None
+        if data_inicio:
+            datetime.strptime(data_inicio, '%Y-%m-%d')
+        if data_fim:
+            datetime.strptime(data_fim, '%Y-%m-%d')
+        id_cliente = input("ID do Cliente [Enter = todos]: ").strip()
+        id_cliente = int(id_cliente) if id_cliente else None
+    except ValueError:
+        print("[ERRO] Filtro inválido.")
+        return
+
+    filtros = {'data_inicio': data_inicio, 'data_fim': data_fim, 'id_cliente': id_cliente}
+    try:
+        vendas = buscar_vendas(conn, **filtros)
+    except mysql.connector.Error as err:
+        print(f"[ERRO SQL] {err}")
+        return
+
+    while True:
+        if vendas:
+            print("\nID | Data | Valor Total | Cliente | Produtos Envolvidos")
+            print("-" * 70)
+            for v in vendas:
+                produtos_display = (v['produtos'][:40] + '...') if len(v['produtos']) > 40 else v['produtos']
+                print(f"{v['id']:<2} | {v['data_venda']} | R$ {v['valor']:<10.2f} | {v['cliente']:<15} | {produtos_display}")
+        else:
+            print("Nenhuma venda encontrada.")
+            return
+
+        op = input("\n[O = mais antigas, N = mais recentes, Enter = sair]: ").strip().lower()
+        try:
+            if op == 'o':
+                chave = (vendas[-1]['data_venda'], vendas[-1]['hora_venda'], vendas[-1]['id'])
+                pagina = buscar_vendas(conn, antes_de=chave, **filtros)
+            elif op == 'n':
+                chave = (vendas[0]['data_venda'], vendas[0]['hora_venda'], vendas[0]['id'])
+                pagina = buscar_vendas(conn, depois_de=chave, **filtros)
+            else:
+                return
+        except mysql.connector.Error as err:
+            print(f"[ERRO SQL] {err}")
+            return
+
+        if pagina:
+            vendas = pagina
+        else:
+            print("[INFO] Não há mais vendas nessa direção.")
+
+def catalogo(conn):
+    """Catálogo da estrutura do banco, carregado do INFORMATION_SCHEMA no primeiro uso da sessão."""
+    return CATALOGO.garantir(conn)
+
+
+def recarregar_catalogo(conn):
+    """Relê a estrutura do banco (use após CREATE/ALTER/DROP feitos fora do sistema)."""
+    CATALOGO.invalidar()
+    try:
+        catalogo(conn)
+        print(f"[OK] Estrutura recarregada: {len(CATALOGO.nomes())} tabelas/views.")
+    except mysql.connector.Error as err:
+        print(f"[ERRO SQL] {err}")
+
 
 def listar_tabelas(conn):
     """Retorna uma lista de todas as tabelas do banco de dados (Mais robusta)."""
-    cursor = conn.cursor()
     try:
-        cursor.execute("SHOW TABLES;")
-        tabelas = [t[0] for t in cursor.fetchall()]
+        return catalogo(conn).nomes()
     except Exception as e:
         print(f"[ERRO] Falha ao listar tabelas: {e}")
-        tabelas = []
-    finally:
-        cursor.close()
-    return tabelas
+        return []
     
 def consultar_registros(conn):
     """GERENTE: Permite consultar e visualizar registros de todas as tabelas."""
@@ -495,19 +864,20 @@ def editar_registro(conn):
     try:
         cursor = conn.cursor()
 
-        cursor.execute(f"DESCRIBE {tabela}")
-        colunas_info = cursor.fetchall()
-        colunas = [col[0] for col in colunas_info]
+        meta = catalogo(conn).tabela(tabela)
+        colunas = meta.nomes_colunas
+        # colunas calculadas pelo banco (ex.: venda.destino_chave) não podem ser editadas
+        geradas = {col['nome'] for col in meta.colunas if col['gerada']}
         
         if not colunas:
             print(f"[ERRO] A tabela {tabela} não tem colunas.")
             return
 
-        id_coluna = colunas[0]
+        id_coluna = meta.coluna_id
 
         id_editar = input(f"\nDigite o {id_coluna} do registro que deseja editar: ").strip()
 
-        cursor.execute(f"SELECT * FROM {tabela} WHERE {id_coluna} = %s", (id_editar,))
+        cursor.execute(meta.sql_select_id, (id_editar,))
         registro_raw = cursor.fetchone()
         
         if not registro_raw:
@@ -520,7 +890,7 @@ def editar_registro(conn):
         novos_valores = []
         
         for i, col in enumerate(colunas):
-            if col == id_coluna:
+            if col == id_coluna or col in geradas:
                 continue
             
             valor_atual = registro[col]
@@ -528,19 +898,20 @@ def editar_registro(conn):
             novo_valor = input(f"Novo valor para {col} (atual: {valor_atual}) [Enter = manter]: ").strip()
             
             if novo_valor != "":
-                updates.append(f"{col} = %s")
+                updates.append(col)
                 novos_valores.append(novo_valor)
 
         if not updates:
             print("Nenhuma alteração feita.")
             return
 
-        set_clause = ", ".join(updates)
-        sql = f"UPDATE {tabela} SET {set_clause} WHERE {id_coluna} = %s"
+        sql = meta.sql_update(updates)
         novos_valores.append(id_editar)
 
         cursor.execute(sql, novos_valores)
         conn.commit()
+        if tabela == 'produto':
+            CACHE_PRODUTOS.invalidar()
         print("[OK] Registro atualizado com sucesso!")
         
     except mysql.connector.Error as err:
@@ -579,23 +950,16 @@ def apagar_registro(conn):
 
     cursor = None
     try:
-        cursor = conn.cursor()
-        cursor.execute(f"DESCRIBE {tabela}")
-        colunas_info = cursor.fetchall()
-        colunas = [col[0] for col in colunas_info]
+        meta = catalogo(conn).tabela(tabela)
         
-        if not colunas:
+        if not meta.colunas:
             print(f"[ERRO] A tabela {tabela} não tem colunas.")
             return
 
-        id_coluna = colunas[0]
+        id_coluna = meta.coluna_id
     except Exception as e:
         print(f"[ERRO] Falha ao obter colunas da tabela {tabela}: {e}")
         return
-    finally:
-        if cursor:
-            cursor.close()
-        cursor = None
 
     try:
         registro_id = int(input(f"\nDigite o {id_coluna} do registro que deseja APAGAR: "))
@@ -610,8 +974,10 @@ def apagar_registro(conn):
 
     try:
         cursor = conn.cursor()
-        cursor.execute(f"DELETE FROM {tabela} WHERE {id_coluna} = %s", (registro_id,))
+        cursor.execute(meta.sql_delete, (registro_id,))
         conn.commit()
+        if tabela == 'produto':
+            CACHE_PRODUTOS.invalidar()
         
         if cursor.rowcount > 0:
             print(f"[SUCESSO] Registro (ID {registro_id}) da tabela '{tabela}' APAGADO com sucesso!")
@@ -658,12 +1024,91 @@ def executar_reajuste(conn):
         if cursor:
             cursor.close()
 
+VOUCHER_ESPECIAL = Decimal('200.00')
+VOUCHER_COMUM = Decimal('100.00')
+
+
+def sortear_campanha(conn, quantidade, max_rodadas=50):
+    """Sorteia `quantidade` clientes DISTINTOS e grava os vouchers com um único INSERT.
+
+    Sorteia ids na faixa [MIN(id), MAX(id)] e confere quais existem com um
+    SELECT ... WHERE id IN (...) por rodada, então o custo depende da quantidade
+    sorteada e não do número de clientes. Ids já tentados nunca são sorteados de
+    novo, o que impede ganhadores repetidos. Retorna [(id_cliente, valor), ...].
+    """
+    limites = execute_read(conn, "SELECT MIN(id), MAX(id) FROM cliente")
+    menor, maior = limites[0]
+    if menor is None:
+        raise ValueError("Sem clientes para sortear.")
+
+    tentados = set()
+    ganhadores = {}
+    universo = maior - menor + 1
+    for _ in range(max_rodadas):
+        faltam = quantidade - len(ganhadores)
+        livres = universo - len(tentados)
+        if faltam <= 0 or livres <= 0:
+            break
+        candidatos = []
+        for alvo in random.sample(range(menor, maior + 1), min(universo, faltam * 2 + len(tentados))):
+            if alvo not in tentados:
+                tentados.add(alvo)
+                candidatos.append(alvo)
+                if len(candidatos) >= faltam * 2:
+                    break
+        existentes = execute_read(
+            conn,
+            f"""
+            SELECT c.id, ce.id_cliente IS NOT NULL
+            FROM cliente c
+            LEFT JOIN cliente_especial ce ON ce.id_cliente = c.id
+            WHERE c.id IN ({', '.join(['%s'] * len(candidatos))})
+            """,
+            candidatos
+        )
+        for id_cliente, especial in existentes:
+            if len(ganhadores) < quantidade:
+                ganhadores[id_cliente] = VOUCHER_ESPECIAL if especial else VOUCHER_COMUM
+
+    if len(ganhadores) < quantidade:
+        raise ValueError(f"Só foi possível sortear {len(ganhadores)} cliente(s) distintos de {quantidade} pedidos.")
+
+    vouchers = list(ganhadores.items())
+    cursor = conn.cursor()
+    try:
+        with transacao(conn):
+            cursor.executemany("INSERT INTO voucher (id_cliente, valor) VALUES (%s, %s)", vouchers)
+    finally:
+        cursor.close()
+    return vouchers
+
+
 def executar_sorteio(conn):
-    """ADMIN: Executa Stored Procedure Sorteio."""
+    """ADMIN: Executa Stored Procedure Sorteio (1 ganhador) ou uma campanha com vários ganhadores."""
     if not check_permission(['Administrador']): 
         return
 
     print("\n--- Executar Sorteio de Cliente (SP Sorteio) ---")
+    try:
+        quantidade = int(input("Quantidade de ganhadores [1]: ").strip() or 1)
+    except ValueError:
+        print("[ERRO] Quantidade inválida.")
+        return
+
+    if quantidade > 1:
+        try:
+            vouchers = sortear_campanha(conn, quantidade)
+        except ValueError as e:
+            print(f"[ERRO] {e}")
+            return
+        except mysql.connector.Error as err:
+            print(f"[ERRO] Falha ao executar a campanha: {err}")
+            return
+        print(f"\n{len(vouchers)} clientes sorteados:")
+        print(tabulate([[id_cliente, f"R$ {valor:.2f}"] for id_cliente, valor in vouchers],
+                       headers=['ID do Cliente', 'Valor do Voucher'], tablefmt="grid"))
+        return
+
     cursor = None
     try:
 
@@ -697,60 +1142,201 @@ def executar_sorteio(conn):
             cursor.close()
 
 
+def calcular_estatisticas(conn, top_n=1, data_inicio=None, data_fim=None, id_vendedor=None):
+    """Roda a Procedure EstatisticasRanqueadas e devolve o resultado estruturado.
+
+    Retorna {'mais_vendidos': [...], 'menos_vendidos': [...]}, cada item com os
+    dados do produto/vendedor, totais e os dicionários 'melhor_mes' e 'pior_mes'.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.callproc("EstatisticasRanqueadas", (top_n, data_inicio, data_fim, id_vendedor))
+        linhas = []
+        for result_set in cursor.stored_results():
+            colunas = result_set.column_names
+            linhas.extend(dict(zip(colunas, linha)) for linha in result_set.fetchall())
+    finally:
+        cursor.close()
+
+    produtos = {}
+    for linha in linhas:
+        produto = produtos.setdefault(linha['produto_id'], {
+            'rk_mais': linha['rk_mais'],
+            'rk_menos': linha['rk_menos'],
+            'produto_id': linha['produto_id'],
+            'produto_nome': linha['produto_nome'],
+            'vendedor_id': linha['vendedor_id'],
+            'vendedor_nome': linha['vendedor_nome'],
+            'total_qtd_vendida': linha['total_qtd_vendida'],
+            'valor_ganho_total': linha['valor_ganho_total'],
+            'melhor_mes': None,
+            'pior_mes': None,
+        })
+        mes = {
+            'ano': linha['ano'],
+            'mes': linha['mes'],
+            'qtd_vendida_no_mes': linha['qtd_vendida_no_mes'],
+            'ganho_no_mes': linha['ganho_no_mes'],
+        }
+        if linha['melhor_mes']:
+            produto['melhor_mes'] = mes
+        if linha['pior_mes']:
+            produto['pior_mes'] = mes
+
+    def ranking(chave):
+        selecionados = sorted((p for p in produtos.values() if p[chave] <= top_n), key=lambda p: p[chave])
+        return [{'posicao': p[chave], **{k: v for k, v in p.items() if k not in ('rk_mais', 'rk_menos')}}
+                for p in selecionados]
+
+    return {'mais_vendidos': ranking('rk_mais'), 'menos_vendidos': ranking('rk_menos')}
+
+
 def executar_estatisticas(conn):
-    """GERENTE: Executa Stored Procedure Estatísticas (com múltiplos SELECTs)."""
+    """GERENTE: Estatísticas de vendas (Procedure EstatisticasRanqueadas) com top-N, período e vendedor."""
     if not check_permission(['Gerente', 'Administrador']):
         return
 
-    print("\n--- Executar Estatísticas de Vendas (SP Estatísticas) ---")
-    cursor = None
+    print("\n--- Executar Estatísticas de Vendas ---")
+    try:
+        top_n = int(input("Quantos produtos em cada ranking? [1]: ").strip() or 1)
+        data_inicio = input("Data inicial (AAAA-MM-DD) [Enter = sem filtro]: ").strip() or None
+        data_fim = input("Data final (AAAA-MM-DD) [Enter = sem filtro]: ").strip() or None
+        if data_inicio:
+            datetime.strptime(data_inicio, '%Y-%m-%d')
+        if data_fim:
+            datetime.strptime(data_fim, '%Y-%m-%d')
+        id_vendedor = input("ID do Vendedor [Enter = todos]: ").strip()
+        id_vendedor = int(id_vendedor) if id_vendedor else None
+    except ValueError:
+        print("[ERRO] Parâmetro inválido.")
+        return
 
     try:
-        cursor = conn.cursor(dictionary=True)
-        cursor.callproc("EstatisticasCompletas")
+        estatisticas = calcular_estatisticas(conn, top_n, data_inicio, data_fim, id_vendedor)
+    except Exception as e:
+        print(f"[ERRO] Falha ao executar Estatísticas: {e}")
+        print("Detalhes: O usuário pode não ter permissão ou o SP pode estar ausente.")
+        return
 
-        resultado_idx = 1
-        algum_resultado = False
+    def formatar_mes(mes):
+        if not mes:
+            return '-'
+        return f"{mes['mes']:02d}/{mes['ano']} ({mes['qtd_vendida_no_mes']} un, R$ {mes['ganho_no_mes']:.2f})"
 
-        for result_set in cursor.stored_results():
-            dados = result_set.fetchall()
-            if not dados:
-                continue
+    for titulo, chave in (("Produtos MAIS vendidos", 'mais_vendidos'), ("Produtos MENOS vendidos", 'menos_vendidos')):
+        print(f"\n[{titulo}]")
+        itens = estatisticas[chave]
+        if not itens:
+            print("[INFO] Nenhuma venda no período.")
+            continue
+        print(tabulate(
+            [[p['posicao'], p['produto_id'], p['produto_nome'], p['vendedor_nome'] or '-', p['total_qtd_vendida'],
+              f"{p['valor_ganho_total']:.2f}", formatar_mes(p['melhor_mes']), formatar_mes(p['pior_mes'])]
+             for p in itens],
+            headers=['#', 'ID', 'Produto', 'Vendedor', 'Qtd', 'Ganho (R$)', 'Melhor mês', 'Pior mês'],
+            tablefmt="grid"
+        ))
 
-            algum_resultado = True
-            print(f"\n[Conjunto #{resultado_idx}]")
-            print("-" * 70)
+    print("\n[INFO] Todas as estatísticas foram exibidas com sucesso.")
 
-            colunas = list(dados[0].keys())
-            print(" | ".join(colunas))
-            print("-" * 70)
 
-            for linha in dados:
-                valores = [str(v) if v is not None else '-' for v in linha.values()]
-                print(" | ".join(valores))
+def executar_reconciliacao(conn, procedure, titulo):
+    """Executa uma procedure de reconciliação (recalcula um total incremental do zero) e mostra a divergência."""
+    print(f"\n--- {titulo} ---")
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        inicio = time.perf_counter()
+        conn.start_transaction()
+        cursor.callproc(procedure)
 
-            resultado_idx += 1
+        divergencias = []
+        colunas = []
+        for result_set in cursor.stored_results():
+            colunas = result_set.column_names
+            divergencias.extend(result_set.fetchall())
+        conn.commit()
 
-        if not algum_resultado:
-            print("[ERRO] Nenhum dado retornado pela procedure.")
+        if divergencias:
+            print(tabulate([[str(c) for c in linha] for linha in divergencias], headers=colunas, tablefmt="grid"))
+            print(f"[AVISO] {len(divergencias)} registro(s) com divergência foram corrigidos.")
         else:
-            print("\n[INFO] Todas as estatísticas foram exibidas com sucesso.")
+            print("[OK] Nenhuma divergência: os totais incrementais estão corretos.")
+        print(f"[INFO] Reconciliação concluída em {time.perf_counter() - inicio:.2f}s.")
 
-    except Exception as e:
-        print(f"[ERRO] Falha ao executar Estatísticas: {e}")
-        print("Detalhes: O usuário pode não ter permissão ou o SP pode estar ausente.")
+    except mysql.connector.Error as err:
+        try:
+            conn.rollback()
+        except mysql.connector.Error:
+            pass
+        print(f"[ERRO SQL] {err}")
     finally:
         if cursor:
             cursor.close()
 
 
+def reconciliar_totais_vendedores(conn):
+    """ADMIN: Recalcula vendedor_totais do zero (Procedure ReconciliarTotaisVendedores)."""
+    if not check_permission(['Administrador']):
+        return
+    executar_reconciliacao(conn, "ReconciliarTotaisVendedores", "Reconciliar Totais de Vendedores")
+
+
+def reconciliar_totais_clientes(conn):
+    """ADMIN: Backfill/verificação do ledger cliente_totais (Procedure ReconciliarTotaisClientes)."""
+    if not check_permission(['Administrador']):
+        return
+    executar_reconciliacao(conn, "ReconciliarTotaisClientes", "Reconciliar Gasto/Cashback de Clientes")
+
+
+def atualizar_resumos(conn, completo=False):
+    """Atualiza os resumos materializados das views (Procedure AtualizarResumos) e mede o tempo.
+
+    completo=False aplica só as vendas novas desde a última marca d'água. Se algum item
+    já resumido foi editado ou apagado depois disso (por qualquer tela, lote ou terminal),
+    os triggers marcam resumo_refresh.precisa_completo e a procedure reconstrói tudo
+    mesmo assim ('promovida_a_completa' no retorno); completo=True força a reconstrução.
+    Retorna o resumo da execução (modo, faixa de ids, linhas aplicadas, segundos).
+    """
+    cursor = conn.cursor()
+    try:
+        inicio = time.perf_counter()
+        with transacao(conn):
+            cursor.callproc("AtualizarResumos", (completo,))
+            resumo = {}
+            for result_set in cursor.stored_results():
+                linhas = result_set.fetchall()
+                if linhas:
+                    resumo = dict(zip(result_set.column_names, linhas[0]))
+        resumo['segundos'] = round(time.perf_counter() - inicio, 4)
+        return resumo
+    finally:
+        cursor.close()
+
+
+def executar_atualizar_resumos(conn):
+    """ADMIN: Atualiza (incremental ou completo) os resumos das views de relatório."""
+    if not check_permission(['Administrador']):
+        return
+
+    print("\n--- Atualizar Resumos das Views (Procedure AtualizarResumos) ---")
+    completo = input("Reconstrução completa? (s/n) [n]: ").strip().lower() == 's'
+    try:
+        resumo = atualizar_resumos(conn, completo)
+        print(f"[SUCESSO] Atualização {resumo.get('modo')}: {resumo.get('linhas_aplicadas', 0)} linha(s) "
+              f"de venda_produto aplicadas (ids {resumo.get('de_id')}..{resumo.get('ate_id')}) "
+              f"em {resumo['segundos']:.2f}s.")
+        if resumo.get('promovida_a_completa'):
+            print("[INFO] Vendas já resumidas foram editadas/apagadas: a atualização foi feita do zero.")
+    except mysql.connector.Error as err:
+        print(f"[ERRO SQL] {err}")
+
+
 def cadastrar_generico(conn):
     """Permite inserir dados em qualquer tabela do banco."""
     if not check_permission(['Administrador']): return
     
-    cursor = conn.cursor()
-    cursor.execute("SHOW TABLES")
-    tabelas = [t[0] for t in cursor.fetchall()]
+    tabelas = catalogo(conn).nomes(incluir_views=False)
 
     print("\n--- Tabelas disponíveis ---")
     for i, t in enumerate(tabelas, 1):
@@ -759,42 +1345,32 @@ def cadastrar_generico(conn):
     escolha = input("\nEscolha a tabela (ou 0 para voltar): ").strip()
 
     if escolha == "0":
-        cursor.close()
         return
     if not escolha.isdigit() or int(escolha) < 1 or int(escolha) > len(tabelas):
         print("[ERRO] Escolha inválida.")
-        cursor.close()
         return
 
-    tabela = tabelas[int(escolha) - 1]
-
-    cursor.execute(f"DESCRIBE {tabela}")
-    colunas = cursor.fetchall()
+    meta = catalogo(conn).tabela(tabelas[int(escolha) - 1])
 
     valores = []
     colunas_a_inserir = []
     
-    for col in colunas:
-        nome = col[0]
-        tipo = col[1]
-        extra = col[5]
-
-        if "auto_increment" in extra or nome.lower() == "id":
+    for col in meta.colunas_editaveis:
+        nome = col['nome']
+        if nome.lower() == "id":
             continue
             
-        valor = input(f"Digite o valor para {nome} ({tipo}): ")
+        valor = input(f"Digite o valor para {nome} ({col['tipo']}): ")
         valores.append(valor)
         colunas_a_inserir.append(nome)
         
     if not valores:
         print("[INFO] Nenhuma coluna para inserir encontrada (apenas IDs auto-incremento?).")
-        cursor.close()
         return
 
-    placeholders = ', '.join(['%s'] * len(valores))
-    colunas_sql = ', '.join(colunas_a_inserir)
-    sql = f"INSERT INTO {tabela} ({colunas_sql}) VALUES ({placeholders})"
+    sql = meta.sql_insert(colunas_a_inserir)
 
+    cursor = conn.cursor()
     try:
         cursor.execute(sql, valores)
         conn.commit()
@@ -877,7 +1453,7 @@ def deletar_generico(conn):
             cursor = None
             try:
                 cursor = conn.cursor()
-                cursor.execute(f"DELETE FROM {tabela} WHERE id = %s", (id_registro,))
+                cursor.execute(catalogo(conn).tabela(tabela).sql_delete, (id_registro,))
                 conn.commit()
                 print("[OK] Registro deletado com sucesso!")
             except mysql.connector.Error as err:
@@ -894,6 +1470,319 @@ def deletar_generico(conn):
             print("[ERRO] Opção inválida. Tente novamente.")
             time.sleep(1)
 
+TAMANHO_LOTE_EDICAO = 5000
+OPERADORES_FILTRO = ('=', '<>', '<', '<=', '>', '>=', 'LIKE', 'IS NULL', 'IS NOT NULL')
+
+
+def montar_filtro(meta, ids=None, faixa=None, predicado=None):
+    """Monta o WHERE de uma operação em lote a partir de lista de ids, faixa (inicio, fim) e/ou predicado.
+
+    predicado: (coluna, operador, valor), com o operador em OPERADORES_FILTRO e a coluna
+    validada no catálogo. Retorna (sql, params). Levanta ValueError se nada for informado.
+    """
+    chave = meta.chave_simples
+    if not chave:
+        raise ValueError(f"A tabela {meta.nome} não tem chave primária simples.")
+    condicoes = []
+    params = []
+    if ids:
+        condicoes.append(f"{chave} IN ({', '.join(['%s'] * len(ids))})")
+        params.extend(ids)
+    if faixa:
+        condicoes.append(f"{chave} BETWEEN %s AND %s")
+        params.extend(faixa)
+    if predicado:
+        coluna, operador, valor = predicado
+        operador = operador.upper()
+        if not meta.coluna(coluna):
+            raise ValueError(f"Coluna '{coluna}' não existe em {meta.nome}.")
+        if operador not in OPERADORES_FILTRO:
+            raise ValueError(f"Operador inválido: {operador}. Use um de {', '.join(OPERADORES_FILTRO)}.")
+        if operador.startswith('IS'):
+            condicoes.append(f"{coluna} {operador}")
+        else:
+            condicoes.append(f"{coluna} {operador} %s")
+            params.append(valor)
+    if not condicoes:
+        raise ValueError("Informe ids, uma faixa de ids ou um filtro por coluna.")
+    return " AND ".join(condicoes), params
+
+
+def _ids_em_blocos(conn, meta, filtro, tamanho_lote):
+    """Percorre os ids que atendem ao filtro em blocos pela chave primária (keyset), sem carregar tudo."""
+    where, params = filtro
+    chave = meta.chave_simples
+    ultimo = None
+    while True:
+        sql = f"SELECT {chave} FROM {meta.nome} WHERE {where}"
+        args = list(params)
+        if ultimo is not None:
+            sql += f" AND {chave} > %s"
+            args.append(ultimo)
+        sql += f" ORDER BY {chave} LIMIT %s"
+        args.append(tamanho_lote)
+        ids = [row[0] for row in execute_read(conn, sql, args) or []]
+        if not ids:
+            return
+        yield ids
+        ultimo = ids[-1]
+
+
+def _contar_dependentes(conn, cat, tabela, coluna, subconsulta, params, visitadas, contagem):
+    """Conta, recursivamente, as linhas das tabelas filhas que seriam apagadas junto."""
+    for filho in cat.dependentes(tabela):
+        meta_filho = cat.tabela(filho)
+        for fk in meta_filho.fks:
+            if fk['tabela_ref'] != tabela or filho in visitadas:
+                continue
+            sub_filho = (f"SELECT {fk['coluna_ref']} FROM {tabela} WHERE {coluna} IN ({subconsulta})"
+                         if fk['coluna_ref'] != coluna else subconsulta)
+            rows = execute_read(conn, f"SELECT COUNT(*) FROM {filho} WHERE {fk['coluna']} IN ({sub_filho})", params)
+            contagem[filho] = contagem.get(filho, 0) + (rows[0][0] if rows else 0)
+            if meta_filho.chave_simples:
+                _contar_dependentes(conn, cat, filho, meta_filho.chave_simples,
+                                    f"SELECT {meta_filho.chave_simples} FROM {filho} WHERE {fk['coluna']} IN ({sub_filho})",
+                                    params, visitadas | {filho}, contagem)
+
+
+def contar_lote(conn, tabela, filtro, cascata=False):
+    """Dry-run: quantas linhas a operação atinge e, com cascata, quantas filhas vão junto."""
+    cat = catalogo(conn)
+    meta = cat.tabela(tabela)
+    where, params = filtro
+    rows = execute_read(conn, f"SELECT COUNT(*) FROM {tabela} WHERE {where}", params)
+    resultado = {'linhas': rows[0][0] if rows else 0, 'dependentes': {}}
+    if cascata:
+        _contar_dependentes(conn, cat, tabela, meta.chave_simples,
+                            f"SELECT {meta.chave_simples} FROM {tabela} WHERE {where}",
+                            params, {tabela}, resultado['dependentes'])
+    return resultado
+
+
+def _apagar_em_cascata(cursor, cat, tabela, coluna, valores, visitadas):
+    """Apaga as filhas (netas primeiro) que referenciam `tabela`.`coluna` IN valores e depois as próprias linhas."""
+    if not valores:
+        return 0
+    marcadores = ', '.join(['%s'] * len(valores))
+    for filho in cat.dependentes(tabela):
+        if filho in visitadas:
+            continue
+        meta_filho = cat.tabela(filho)
+        for fk in meta_filho.fks:
+            if fk['tabela_ref'] != tabela:
+                continue
+            referenciados = valores
+            if fk['coluna_ref'] != coluna:
+                cursor.execute(f"SELECT {fk['coluna_ref']} FROM {tabela} WHERE {coluna} IN ({marcadores})", valores)
+                referenciados = [row[0] for row in cursor.fetchall()]
+            if not referenciados:
+                continue
+            if meta_filho.chave_simples and cat.dependentes(filho):
+                cursor.execute(
+                    f"SELECT {meta_filho.chave_simples} FROM {filho} "
+                    f"WHERE {fk['coluna']} IN ({', '.join(['%s'] * len(referenciados))})",
+                    referenciados
+                )
+                ids_filho = [row[0] for row in cursor.fetchall()]
+                _apagar_em_cascata(cursor, cat, filho, meta_filho.chave_simples, ids_filho, visitadas | {filho})
+            else:
+                cursor.execute(
+                    f"DELETE FROM {filho} WHERE {fk['coluna']} IN ({', '.join(['%s'] * len(referenciados))})",
+                    referenciados
+                )
+    cursor.execute(f"DELETE FROM {tabela} WHERE {coluna} IN ({marcadores})", valores)
+    return cursor.rowcount
+
+
+def _executar_em_blocos(conn, meta, filtro, tamanho_lote, total, acao, rotulo):
+    """Aplica acao(cursor, ids) a cada bloco de ids em uma transação própria, com progresso em linhas/s."""
+    feitas = 0
+    inicio = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        for ids in _ids_em_blocos(conn, meta, filtro, tamanho_lote):
+            def bloco():
+                with transacao(conn):
+                    return acao(cursor, ids)
+            feitas += com_retentativa(bloco)
+            segundos = time.perf_counter() - inicio
+            print(f"> {feitas:,}/{total:,} linhas {rotulo} ({feitas / max(segundos, 1e-6):,.0f} linhas/s)")
+    finally:
+        cursor.close()
+    segundos = time.perf_counter() - inicio
+    return {'linhas': feitas, 'segundos': round(segundos, 2),
+            'linhas_por_s': round(feitas / segundos, 1) if segundos else 0.0}
+
+
+def atualizar_em_lote(conn, tabela, atribuicoes, filtro, tamanho_lote=TAMANHO_LOTE_EDICAO, simular=False):
+    """UPDATE em blocos de `tamanho_lote` linhas, cada bloco na sua transação.
+
+    atribuicoes: [(coluna, operacao, valor)] com operacao '=' (atribui) ou '*' (multiplica,
+    ex.: reajuste de preço). O filtro é reaplicado no UPDATE de cada bloco, então linhas
+    alteradas por outra sessão no meio do caminho não são atingidas por engano.
+    """
+    cat = catalogo(conn)
+    meta = cat.tabela(tabela)
+    editaveis = {c['nome'] for c in meta.colunas_editaveis}
+    sets = []
+    valores = []
+    for coluna, operacao, valor in atribuicoes:
+        if coluna not in editaveis or coluna == meta.chave_simples:
+            raise ValueError(f"Coluna '{coluna}' não pode ser alterada em {tabela}.")
+        if operacao == '*':
+            sets.append(f"{coluna} = {coluna} * %s")
+        elif operacao == '=':
+            sets.append(f"{coluna} = %s")
+        else:
+            raise ValueError(f"Operação inválida para {coluna}: {operacao}.")
+        valores.append(valor)
+    if not sets:
+        raise ValueError("Informe ao menos uma coluna para alterar.")
+
+    previa = contar_lote(conn, tabela, filtro)
+    if simular or not previa['linhas']:
+        return dict(previa, simulacao=simular)
+
+    where, params = filtro
+    chave = meta.chave_simples
+
+    def acao(cursor, ids):
+        cursor.execute(
+            f"UPDATE {tabela} SET {', '.join(sets)} WHERE {chave} IN ({', '.join(['%s'] * len(ids))}) AND {where}",
+            valores + ids + list(params)
+        )
+        return cursor.rowcount
+
+    resultado = _executar_em_blocos(conn, meta, filtro, tamanho_lote, previa['linhas'], acao, "atualizadas")
+    if tabela == 'produto':
+        CACHE_PRODUTOS.invalidar()
+    return resultado
+
+
+def apagar_em_lote(conn, tabela, filtro, tamanho_lote=TAMANHO_LOTE_EDICAO, cascata=False, simular=False):
+    """DELETE em blocos de `tamanho_lote` linhas, cada bloco na sua transação.
+
+    Com cascata, as linhas das tabelas filhas (pelas FKs do catálogo) são apagadas antes,
+    no mesmo bloco, das netas para as filhas; sem cascata, um bloco com filhas falha pela FK.
+    """
+    cat = catalogo(conn)
+    meta = cat.tabela(tabela)
+    previa = contar_lote(conn, tabela, filtro, cascata)
+    if simular or not previa['linhas']:
+        return dict(previa, simulacao=simular)
+
+    where, params = filtro
+    chave = meta.chave_simples
+
+    def acao(cursor, ids):
+        if cascata:
+            # reaplica o filtro para não apagar (nem as filhas de) linhas que deixaram de atender
+            cursor.execute(
+                f"SELECT {chave} FROM {tabela} WHERE {chave} IN ({', '.join(['%s'] * len(ids))}) AND {where} FOR UPDATE",
+                ids + list(params)
+            )
+            return _apagar_em_cascata(cursor, cat, tabela, chave, [row[0] for row in cursor.fetchall()], {tabela})
+        cursor.execute(
+            f"DELETE FROM {tabela} WHERE {chave} IN ({', '.join(['%s'] * len(ids))}) AND {where}",
+            ids + list(params)
+        )
+        return cursor.rowcount
+
+    resultado = _executar_em_blocos(conn, meta, filtro, tamanho_lote, previa['linhas'], acao, "apagadas")
+    resultado['dependentes'] = previa['dependentes']
+    if tabela == 'produto':
+        CACHE_PRODUTOS.invalidar()
+    return resultado
+
+
+def ler_selecao_lote(meta):
+    """Pergunta ao usuário como selecionar as linhas (ids, faixa ou filtro) e devolve o filtro montado."""
+    print("Como selecionar as linhas?")
+    print("1. Lista de IDs (ex: 1,5,9)")
+    print("2. Faixa de IDs (ex: 100-500)")
+    print("3. Filtro por coluna (ex: id_vendedor = 3)")
+    modo = input("Opção: ").strip()
+    if modo == '1':
+        ids = [int(i) for i in input("IDs separados por vírgula: ").split(',') if i.strip()]
+        return montar_filtro(meta, ids=ids)
+    if modo == '2':
+        inicio, fim = (int(v) for v in input("Faixa (inicio-fim): ").split('-'))
+        return montar_filtro(meta, faixa=(inicio, fim))
+    if modo == '3':
+        print(f"Colunas: {', '.join(meta.nomes_colunas)}")
+        coluna = input("Coluna: ").strip()
+        operador = input(f"Operador ({' '.join(OPERADORES_FILTRO)}): ").strip()
+        valor = None if operador.upper().startswith('IS') else input("Valor: ").strip()
+        return montar_filtro(meta, predicado=(coluna, operador, valor))
+    raise ValueError("Opção inválida.")
+
+
+def operacao_em_lote(conn):
+    """ADMIN: Altera ou apaga várias linhas de uma tabela de uma vez, em blocos, com prévia."""
+    if not check_permission(['Administrador']): return
+
+    tabelas = catalogo(conn).nomes(incluir_views=False)
+    print("\n--- Operação em Lote ---")
+    for i, t in enumerate(tabelas, 1):
+        print(f"{i}. {t}")
+    escolha = input("\nEscolha a tabela (ou 0 para voltar): ").strip()
+    if escolha == '0':
+        return
+    if not escolha.isdigit() or int(escolha) < 1 or int(escolha) > len(tabelas):
+        print("[ERRO] Escolha inválida.")
+        return
+    tabela = tabelas[int(escolha) - 1]
+    meta = catalogo(conn).tabela(tabela)
+
+    try:
+        operacao = input("1. Alterar (UPDATE)  2. Apagar (DELETE): ").strip()
+        if operacao not in ('1', '2'):
+            print("[ERRO] Opção inválida.")
+            return
+        filtro = ler_selecao_lote(meta)
+
+        atribuicoes = []
+        cascata = False
+        if operacao == '1':
+            print("Alterações no formato coluna=valor (atribui) ou coluna*fator (multiplica). Vazio para terminar.")
+            while True:
+                entrada = input("> ").strip()
+                if not entrada:
+                    break
+                operador = '*' if '*' in entrada and '=' not in entrada else '='
+                coluna, valor = entrada.split(operador, 1)
+                atribuicoes.append((coluna.strip(), operador, valor.strip()))
+            previa = contar_lote(conn, tabela, filtro)
+        else:
+            cascata = bool(catalogo(conn).dependentes(tabela)) and \
+                input("Apagar também os registros dependentes (FKs)? (s/n): ").lower() == 's'
+            previa = contar_lote(conn, tabela, filtro, cascata)
+
+        print(f"\n[INFO] {previa['linhas']:,} linha(s) de '{tabela}' serão atingidas.")
+        for dependente, qtd in previa['dependentes'].items():
+            print(f"       + {qtd:,} linha(s) dependentes em '{dependente}'.")
+        if not previa['linhas'] or input("Confirmar? (s/n): ").lower() != 's':
+            print("Operação cancelada.")
+            return
+
+        if operacao == '1':
+            resultado = atualizar_em_lote(conn, tabela, atribuicoes, filtro)
+        else:
+            resultado = apagar_em_lote(conn, tabela, filtro, cascata=cascata)
+        print(f"[SUCESSO] {resultado['linhas']:,} linha(s) em {resultado['segundos']:.2f}s "
+              f"({resultado['linhas_por_s']:,.0f} linhas/s).")
+    except ValueError as e:
+        print(f"[ERRO] {e}")
+    except mysql.connector.IntegrityError as err:
+        if err.errno == 1451:
+            print("[ERRO] Há registros dependentes (FK). Os blocos anteriores já foram gravados; "
+                  "repita com a opção de apagar dependentes.")
+        else:
+            print(f"[ERRO SQL] {err}")
+    except mysql.connector.Error as err:
+        print(f"[ERRO SQL] {err}")
+
+
 def calcular_idade(conn):
     """Executa a function Calcula_Idade(cliente_id)."""
     if not check_permission(['Administrador']): return
@@ -941,22 +1830,397 @@ def calcular_arrecadado(conn):
             cursor.close()
 
 
+def matriz_receita(conn, data_inicio, data_fim, vendedores=None):
+    """Receita por dia x vendedor no período, lida da rollup receita_diaria_vendedor em UMA consulta.
+
+    Retorna (datas, matriz), com matriz = {id_vendedor: {data: total}}. Dias sem
+    venda de um vendedor ficam de fora do dicionário dele (equivalem a 0).
+    """
+    params = [data_inicio, data_fim]
+    filtro = ""
+    if vendedores:
+        filtro = f"AND id_vendedor IN ({', '.join(['%s'] * len(vendedores))})"
+        params.extend(vendedores)
+    linhas = execute_read(
+        conn,
+        f"""
+        SELECT data_venda, id_vendedor, total
+        FROM receita_diaria_vendedor
+        WHERE data_venda BETWEEN %s AND %s {filtro}
+        ORDER BY data_venda, id_vendedor
+        """,
+        params
+    ) or []
+
+    datas = []
+    matriz = {}
+    for data_venda, id_vendedor, total in linhas:
+        if not datas or datas[-1] != data_venda:
+            datas.append(data_venda)
+        matriz.setdefault(id_vendedor, {})[data_venda] = total
+    return datas, matriz
+
+
+def calcular_arrecadado_periodo(conn):
+    """ADMIN: Receita por vendedor em um período (rollup diária), em vez de uma chamada de Arrecadado por dia/vendedor."""
+    if not check_permission(['Administrador']): return
+
+    print("\n--- Receita por Vendedor no Período ---")
+    try:
+        data_inicio = input("Data inicial (AAAA-MM-DD): ").strip()
+        data_fim = input("Data final (AAAA-MM-DD): ").strip()
+        datetime.strptime(data_inicio, '%Y-%m-%d')
+        datetime.strptime(data_fim, '%Y-%m-%d')
+        entrada = input("IDs dos vendedores separados por vírgula [Enter = todos]: ").strip()
+        vendedores = [int(v) for v in entrada.split(',')] if entrada else None
+    except ValueError:
+        print("[ERRO] Entrada de parâmetros inválida.")
+        return
+
+    datas, matriz = matriz_receita(conn, data_inicio, data_fim, vendedores)
+    if not matriz:
+        print("[INFO] Nenhuma venda no período.")
+        return
+
+    ids = sorted(matriz)
+    linhas = []
+    for d in datas:
+        valores = [matriz[v].get(d, 0) for v in ids]
+        linhas.append([str(d)] + [f"{x:.2f}" for x in valores] + [f"{sum(valores):.2f}"])
+    totais = [sum(matriz[v].values()) for v in ids]
+    linhas.append(['TOTAL'] + [f"{x:.2f}" for x in totais] + [f"{sum(totais):.2f}"])
+    print(tabulate(linhas, headers=['Data'] + [f"Vend. {v}" for v in ids] + ['Total'], tablefmt="grid"))
+
+
+def reconciliar_receita_diaria(conn):
+    """ADMIN: Backfill/verificação da rollup receita_diaria_vendedor (Procedure ReconciliarReceitaDiaria)."""
+    if not check_permission(['Administrador']):
+        return
+    executar_reconciliacao(conn, "ReconciliarReceitaDiaria", "Reconciliar Receita Diária por Vendedor")
+
+
+FAIXAS_ETARIAS = [18, 25, 35, 45, 55, 65]
+ROTULOS_FAIXAS = ['<18', '18-24', '25-34', '35-44', '45-54', '55-64', '65+']
+SEXOS = ['m', 'f', 'o']
+LOTE_DEMOGRAFIA = 50000
+
+
+def calcular_demografia(conn, atualizar_idade=False, lote=LOTE_DEMOGRAFIA, hoje=None):
+    """Idades e faixas idade x sexo de TODOS os clientes, calculadas em lote com NumPy.
+
+    Lê data_nascimento, sexo, idade gravada e gasto acumulado (cliente_totais) em
+    uma única consulta, em blocos de `lote` linhas, e calcula tudo vetorizado.
+    Com atualizar_idade=True regrava a coluna idade só dos clientes em que ela
+    ficou desatualizada, com UPDATEs em lote de `lote` linhas.
+    Retorna {'faixas': [...], 'clientes': n, 'sem_data': n, 'idades_atualizadas': n}.
+    """
+    if np is None:
+        raise RuntimeError("NumPy não está instalado (pip install numpy).")
+    hoje = hoje or date.today()
+
+    ids, nascimentos, sexos, idades_gravadas, gastos = [], [], [], [], []
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT c.id, c.data_nascimento, c.sexo, c.idade, COALESCE(ct.total_gasto, 0)
+            FROM cliente c
+            LEFT JOIN cliente_totais ct ON ct.id_cliente = c.id
+        """)
+        while True:
+            bloco = cursor.fetchmany(lote)
+            if not bloco:
+                break
+            colunas = list(zip(*bloco))
+            ids.append(np.array(colunas[0], dtype=np.int64))
+            nascimentos.append(np.array(colunas[1], dtype='datetime64[D]'))
+            sexos.append(np.array([SEXOS.index(x) if x in SEXOS else len(SEXOS) for x in colunas[2]], dtype=np.int8))
+            idades_gravadas.append(np.array([-1 if x is None else x for x in colunas[3]], dtype=np.int64))
+            gastos.append(np.array(colunas[4], dtype=np.float64))
+    finally:
+        cursor.close()
+
+    if not ids:
+        return {'faixas': [], 'clientes': 0, 'sem_data': 0, 'idades_atualizadas': 0}
+
+    ids = np.concatenate(ids)
+    nascimentos = np.concatenate(nascimentos)
+    sexos = np.concatenate(sexos)
+    idades_gravadas = np.concatenate(idades_gravadas)
+    gastos = np.concatenate(gastos)
+
+    com_data = ~np.isnat(nascimentos)
+    nasc = nascimentos[com_data]
+    ano = nasc.astype('datetime64[Y]').astype(np.int64) + 1970
+    mes = nasc.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    dia = (nasc - nasc.astype('datetime64[M]')).astype(np.int64) + 1
+    ainda_nao_fez = (hoje.month < mes) | ((hoje.month == mes) & (hoje.day < dia))
+    idades = hoje.year - ano - ainda_nao_fez.astype(np.int64)
+
+    faixa = np.digitize(idades, FAIXAS_ETARIAS)
+    celula = faixa * (len(SEXOS) + 1) + sexos[com_data]
+    total_celulas = len(ROTULOS_FAIXAS) * (len(SEXOS) + 1)
+    contagem = np.bincount(celula, minlength=total_celulas)
+    gasto = np.bincount(celula, weights=gastos[com_data], minlength=total_celulas)
+
+    faixas = []
+    for i, rotulo in enumerate(ROTULOS_FAIXAS):
+        for j, sexo in enumerate(SEXOS + ['?']):
+            k = i * (len(SEXOS) + 1) + j
+            if contagem[k]:
+                faixas.append({
+                    'faixa': rotulo,
+                    'sexo': sexo,
+                    'clientes': int(contagem[k]),
+                    'gasto_total': round(float(gasto[k]), 2),
+                    'gasto_medio': round(float(gasto[k] / contagem[k]), 2),
+                })
+
+    atualizadas = 0
+    if atualizar_idade:
+        desatualizados = idades != idades_gravadas[com_data]
+        ids_upd = ids[com_data][desatualizados]
+        idades_upd = idades[desatualizados]
+        cursor = conn.cursor()
+        try:
+            for i in range(0, len(ids_upd), lote):
+                bloco_ids = ids_upd[i:i + lote].tolist()
+                bloco_idades = idades_upd[i:i + lote].tolist()
+                casos = ' '.join(['WHEN %s THEN %s'] * len(bloco_ids))
+                params = [v for par in zip(bloco_ids, bloco_idades) for v in par] + bloco_ids
+                with transacao(conn):
+                    cursor.execute(
+                        f"UPDATE cliente SET idade = CASE id {casos} END "
+                        f"WHERE id IN ({', '.join(['%s'] * len(bloco_ids))})",
+                        params
+                    )
+                atualizadas += len(bloco_ids)
+        finally:
+            cursor.close()
+
+    return {
+        'faixas': faixas,
+        'clientes': int(len(ids)),
+        'sem_data': int((~com_data).sum()),
+        'idades_atualizadas': atualizadas,
+    }
+
+
+def executar_demografia(conn):
+    """ADMIN: Demografia dos clientes (faixa etária x sexo x gasto), opcionalmente atualizando a idade gravada."""
+    if not check_permission(['Administrador']):
+        return
+
+    print("\n--- Demografia de Clientes ---")
+    atualizar = input("Atualizar também a coluna idade dos clientes? (s/n) [n]: ").strip().lower() == 's'
+    inicio = time.perf_counter()
+    try:
+        resultado = calcular_demografia(conn, atualizar_idade=atualizar)
+    except RuntimeError as e:
+        print(f"[ERRO] {e}")
+        return
+    except mysql.connector.Error as err:
+        print(f"[ERRO SQL] {err}")
+        return
+
+    if not resultado['faixas']:
+        print("[INFO] Nenhum cliente com data de nascimento cadastrada.")
+    else:
+        print(tabulate(
+            [[f['faixa'], f['sexo'], f['clientes'], f"{f['gasto_total']:.2f}", f"{f['gasto_medio']:.2f}"]
+             for f in resultado['faixas']],
+            headers=['Faixa etária', 'Sexo', 'Clientes', 'Gasto total (R$)', 'Gasto médio (R$)'],
+            tablefmt="grid"
+        ))
+    print(f"[INFO] {resultado['clientes']} clientes processados ({resultado['sem_data']} sem data de nascimento) "
+          f"em {time.perf_counter() - inicio:.2f}s.")
+    if atualizar:
+        print(f"[SUCESSO] Idade atualizada em {resultado['idades_atualizadas']} cliente(s).")
+
+
+TAMANHO_PAGINA = 20
+
+def chave_primaria(conn, tabela):
+    """Retorna a coluna da chave primária (simples) da tabela, ou None para views/PK composta."""
+    meta = catalogo(conn).tabela(tabela)
+    return meta.chave_simples if meta else None
+
+
+def buscar_pagina(conn, tabela, chave, filtros=None, apos=None, antes=None, a_partir_de=None,
+                  offset=0, limite=TAMANHO_PAGINA):
+    """Busca UMA página da tabela com uma única consulta de intervalo na chave primária.
+
+    apos/antes/a_partir_de definem a página seguinte, anterior ou o salto para um id.
+    Sem chave primária (views), cai para LIMIT/OFFSET. filtros: {coluna: valor},
+    com nomes de coluna já validados pelo chamador. Retorna (colunas, registros).
+    """
+    condicoes = []
+    params = []
+    for coluna, valor in (filtros or {}).items():
+        condicoes.append(f"{coluna} = %s")
+        params.append(valor)
+
+    ordem = 'ASC'
+    if chave:
+        if apos is not None:
+            condicoes.append(f"{chave} > %s")
+            params.append(apos)
+        elif antes is not None:
+            condicoes.append(f"{chave} < %s")
+            params.append(antes)
+            ordem = 'DESC'
+        elif a_partir_de is not None:
+            condicoes.append(f"{chave} >= %s")
+            params.append(a_partir_de)
+
+    sql = f"SELECT * FROM {tabela}"
+    if condicoes:
+        sql += " WHERE " + " AND ".join(condicoes)
+    if chave:
+        sql += f" ORDER BY {chave} {ordem} LIMIT %s"
+        params.append(limite)
+    else:
+        sql += " LIMIT %s OFFSET %s"
+        params.extend([limite, offset])
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        registros = cursor.fetchall()
+        colunas = [desc[0] for desc in cursor.description]
+    finally:
+        cursor.close()
+
+    if ordem == 'DESC':
+        registros.reverse()
+    return colunas, registros
+
+
+def navegar_tabela(conn, tabela):
+    """Exibe a tabela página a página (próxima/anterior/ir para ID/filtros por coluna)."""
+    chave = chave_primaria(conn, tabela)
+    filtros = {}
+    offset = 0
+    colunas, registros = buscar_pagina(conn, tabela, chave, filtros)
+    idx_chave = colunas.index(chave) if chave else None
+
+    while True:
+        print(f"\n--- Conteúdo da tabela '{tabela}' ---")
+        if filtros:
+            print("Filtros: " + ", ".join(f"{c} = {v}" for c, v in filtros.items()))
+        if not registros:
+            print("[VAZIO] Nenhum registro encontrado.")
+        else:
+            data_list = [[str(c) if c is not None else 'NULL' for c in linha] for linha in registros]
+            print(tabulate(data_list, headers=colunas, tablefmt="grid"))
+
+        ir_para = f"I = ir para {chave}, " if chave else ""
+        opcoes = f"P = próxima, A = anterior, {ir_para}F = filtrar coluna, L = limpar filtros, Enter = sair"
+        op =input(f"\n[{opcoes}]: ").strip().lower()
+
+        if op == '':
+            return
+        elif op == 'p':
+            if chave:
+                if not registros:
+                    continue
+                nova = buscar_pagina(conn, tabela, chave, filtros, apos=registros[-1][idx_chave])[1]
+            else:
+                nova = buscar_pagina(conn, tabela, None, filtros, offset=offset + TAMANHO_PAGINA)[1]
+                if nova:
+                    offset += TAMANHO_PAGINA
+            if not nova:
+                print("[INFO] Não há mais registros.")
+                continue
+            registros = nova
+        elif op == 'a':
+            if chave:
+                if not registros:
+                    continue
+                nova = buscar_pagina(conn, tabela, chave, filtros, antes=registros[0][idx_chave])[1]
+            else:
+                if offset == 0:
+                    nova = []
+                else:
+                    offset = max(0, offset - TAMANHO_PAGINA)
+                    nova = buscar_pagina(conn, tabela, None, filtros, offset=offset)[1]
+            if not nova:
+                print("[INFO] Você já está na primeira página.")
+                continue
+            registros = nova
+        elif op == 'i' and chave:
+            destino = input(f"Ir para {chave}: ").strip()
+            registros = buscar_pagina(conn, tabela, chave, filtros, a_partir_de=destino)[1]
+        elif op == 'f':
+            coluna = input(f"Coluna ({', '.join(colunas)}): ").strip()
+            if coluna not in colunas:
+                print("[ERRO] Coluna inválida.")
+                continue
+            filtros[coluna] = input(f"Valor para {coluna}: ").strip()
+            offset = 0
+            registros = buscar_pagina(conn, tabela, chave, filtros)[1]
+        elif op == 'l':
+            filtros = {}
+            offset = 0
+            registros = buscar_pagina(conn, tabela, chave, filtros)[1]
+        else:
+            print("[ERRO] Opção inválida.")
+
+
+def relatorio_fretes(conn, destinos=None):
+    """Total de fretes por destino em UMA consulta agrupada (todos os destinos ou só os informados).
+
+    Usa a coluna indexada venda.destino_chave (LOWER(TRIM(endereco))), a mesma
+    normalização de Soma_fretes. Retorna [(destino, qtd_vendas, total_fretes), ...].
+    Destinos em branco são ignorados; se nenhum sobrar (ex.: entrada só com ';'),
+    o relatório cobre todos os destinos.
+    """
+    chaves = sorted({d.strip().lower() for d in destinos or [] if d.strip()})
+    where = f"WHERE v.destino_chave IN ({', '.join(['%s'] * len(chaves))})" if chaves else ""
+    return execute_read(
+        conn,
+        f"""
+        SELECT v.destino_chave AS destino, COUNT(*) AS qtd_vendas, SUM(t.valor) AS total_fretes
+        FROM venda v
+        JOIN transporte t ON t.id_venda = v.id
+        {where}
+        GROUP BY v.destino_chave
+        ORDER BY total_fretes DESC
+        """,
+        chaves
+    )
+
+
+def executar_relatorio_fretes(conn):
+    """ADMIN: Relatório de fretes por destino (equivale a Soma_fretes para vários destinos)."""
+    if not check_permission(['Administrador']):
+        return
+
+    print("\n--- Relatório de Fretes por Destino ---")
+    entrada = input("Destinos separados por ';' [Enter = todos]: ").strip()
+    destinos = entrada.split(';') if entrada else None
+
+    linhas = relatorio_fretes(conn, destinos)
+    if linhas is None:
+        return
+    if not linhas:
+        print("[INFO] Nenhum frete encontrado para os destinos informados.")
+        return
+    print(tabulate([[d, qtd, f"{total:.2f}"] for d, qtd, total in linhas],
+                   headers=['Destino', 'Vendas', 'Total de Fretes (R$)'], tablefmt="grid"))
+
+
 def visualizar_tabela(conn, tabela_selecionada=None):
-    """Permite ao ADMIN/GERENTE visualizar qualquer tabela do banco, ou uma específica."""
+    """Permite ao ADMIN/GERENTE visualizar qualquer tabela do banco, ou uma específica (paginada)."""
     if not conn or not conn.is_connected():
         print("[ERRO] Conexão com o banco está inativa.")
         return []
 
     if not check_permission(['Administrador', 'Gerente', 'Funcionario']): return
     
-    cursor = conn.cursor()
-
-    cursor.execute("SHOW TABLES;")
-    tabelas = [t[0] for t in cursor.fetchall()]
+    tabelas = listar_tabelas(conn)
 
     if not tabelas:
         print("[AVISO] Nenhuma tabela encontrada no banco de dados.")
-        cursor.close()
         return []
     
     if not tabela_selecionada:
@@ -966,45 +2230,27 @@ def visualizar_tabela(conn, tabela_selecionada=None):
 
         escolha = input("\nDigite o número da tabela que deseja visualizar (ou 0 para voltar): ").strip()
         if escolha == '0':
-            cursor.close()
             return tabelas 
 
         try:
             idx = int(escolha) - 1
             if idx < 0 or idx >= len(tabelas):
                 print("[ERRO] Escolha inválida.")
-                cursor.close()
                 return tabelas
             tabela_selecionada = tabelas[idx]
         except ValueError:
             print("[ERRO] Escolha inválida.")
-            cursor.close()
             return tabelas
 
     try:
-        cursor.execute(f"SELECT * FROM {tabela_selecionada};")
-        registros = cursor.fetchall()
-        colunas = [desc[0] for desc in cursor.description]
-
-        print(f"\n--- Conteúdo da tabela '{tabela_selecionada}' ---")
-        if not registros:
-            print("[VAZIO] Nenhum registro encontrado.")
-        else:
-
-            data_list = []
-            for linha in registros:
-                data_list.append([str(c) if c is not None else 'NULL' for c in linha])
-                
-            print(tabulate(data_list, headers=colunas, tablefmt="grid"))
-            
+        navegar_tabela(conn, tabela_selecionada)
     except Exception as e:
         print(f"[ERRO] Não foi possível exibir a tabela: {e}")
 
-    cursor.close()
     return tabelas 
     
 
-def menu_admin(conn):
+def menu_admin():
     """Menu para o Administrador (todas as permissões do sistema)."""
     while True:
         clear_screen()
@@ -1014,6 +2260,8 @@ def menu_admin(conn):
         print("3. Executar Procedures e Funções de Gestão")
         print("--- CONSULTAS LIVRES ---")
         print("4. Visualizar qualquer tabela do banco")
+        print("5. Métricas do Pool de Conexões")
+        print("6. Métricas SQL (latência por comando)")
         print("0. Sair e Fazer Logout")
 
         choice = input("\nEscolha uma opção: ").strip()
@@ -1029,16 +2277,22 @@ def menu_admin(conn):
                 print("2. Editar Registro (Genérico)")
                 print("3. Deletar Registro (TRUNCATE ou DELETE WHERE ID)")
                 print("4. Voltar")
+                print("5. Recarregar estrutura do banco (após ALTER/CREATE/DROP)")
+                print("6. Alterar/Apagar em Lote (IDs, faixa ou filtro)")
                 sub_choice = input("Opção: ").strip()
 
                 if sub_choice == '1':
-                    cadastrar_generico(conn)  
+                    com_conexao(cadastrar_generico)  
                 elif sub_choice == '2':
-                    editar_registro(conn)  
+                    com_conexao(editar_registro)  
                 elif sub_choice == '3':
-                    deletar_generico(conn)  
+                    com_conexao(deletar_generico)  
                 elif sub_choice == '4':
                     break
+                elif sub_choice == '5':
+                    com_conexao(recarregar_catalogo)
+                elif sub_choice == '6':
+                    com_conexao(operacao_em_lote)
                 else:
                     print("[ERRO] Opção inválida."); time.sleep(1)
                 
@@ -1054,23 +2308,44 @@ def menu_admin(conn):
                 print("2. Calcular Idade de um Cliente (Function Calcula_Idade)")
                 print("3. Executar Sorteio de Cliente (SP Sorteio)")
                 print("4. Calcular Valor Arrecadado Total (Function Arrecadado)")
-                print("5. Estatísticas Gerais (Procedure Estatisticas)")
-                print("6. Registrar Venda (Procedure Venda)")
+                print("5. Estatísticas Gerais (Procedure EstatisticasRanqueadas)")
+                print("6. Registrar Venda (Carrinho)")
+                print("7. Reconciliar Totais de Vendedores (Procedure ReconciliarTotaisVendedores)")
+                print("8. Reconciliar Gasto/Cashback de Clientes (Procedure ReconciliarTotaisClientes)")
+                print("9. Atualizar Resumos das Views (Procedure AtualizarResumos)")
+                print("10. Relatório de Fretes por Destino (Function Soma_fretes em lote)")
+                print("11. Receita por Vendedor no Período (Rollup da Function Arrecadado)")
+                print("12. Reconciliar Receita Diária (Procedure ReconciliarReceitaDiaria)")
+                print("13. Demografia de Clientes (Idades em lote)")
                 print("0. Voltar")
                 sub_choice = input("Escolha uma opção: ").strip()
 
                 if sub_choice == '1':
-                    executar_reajuste(conn)
+                    com_conexao(executar_reajuste)
                 elif sub_choice == '2':
-                    calcular_idade(conn) 
+                    com_conexao(calcular_idade) 
                 elif sub_choice == '3':
-                    executar_sorteio(conn)
+                    com_conexao(executar_sorteio)
                 elif sub_choice == '4':
-                    calcular_arrecadado(conn) 
+                    com_conexao(calcular_arrecadado) 
                 elif sub_choice == '5':
-                    executar_estatisticas(conn)
+                    com_conexao(executar_estatisticas)
                 elif sub_choice == '6':
-                    realizar_venda(conn)
+                    com_conexao(realizar_venda)
+                elif sub_choice == '7':
+                    com_conexao(reconciliar_totais_vendedores)
+                elif sub_choice == '8':
+                    com_conexao(reconciliar_totais_clientes)
+                elif sub_choice == '9':
+                    com_conexao(executar_atualizar_resumos)
+                elif sub_choice == '10':
+                    com_conexao(executar_relatorio_fretes)
+                elif sub_choice == '11':
+                    com_conexao(calcular_arrecadado_periodo)
+                elif sub_choice == '12':
+                    com_conexao(reconciliar_receita_diaria)
+                elif sub_choice == '13':
+                    com_conexao(executar_demografia)
                 elif sub_choice == '0':
                     break
                 else:
@@ -1081,7 +2356,15 @@ def menu_admin(conn):
 
 
         elif choice == '4':
-            visualizar_tabela(conn)
+            com_conexao(visualizar_tabela)
+            input("Pressione Enter para continuar...")
+
+        elif choice == '5':
+            exibir_metricas_pool()
+            input("Pressione Enter para continuar...")
+
+        elif choice == '6':
+            exibir_metricas_sql()
             input("Pressione Enter para continuar...")
 
         elif choice == '0':
@@ -1091,7 +2374,7 @@ def menu_admin(conn):
             print("[ERRO] Opção inválida.")
             time.sleep(1)
 
-def menu_gerente(conn):
+def menu_gerente():
     """Menu para o Gerente (Busca, Edição, Apagar por ID, Estatísticas)."""
     if not check_permission(['Gerente', 'Administrador']): return
     while True:
@@ -1107,16 +2390,16 @@ def menu_gerente(conn):
         
         choice = input("\nEscolha uma opção: ").strip()
 
-        if choice == '1': consultar_registros(conn)
-        elif choice == '2': editar_registro(conn)
-        elif choice == '3': apagar_registro(conn)
-        elif choice == '4': executar_estatisticas(conn)
+        if choice == '1': com_conexao(consultar_registros)
+        elif choice == '2': com_conexao(editar_registro)
+        elif choice == '3': com_conexao(apagar_registro)
+        elif choice == '4': com_conexao(executar_estatisticas)
         elif choice == '0': break
         else: print("[ERRO] Opção inválida."); time.sleep(1); continue
             
         input("\nPressione Enter para continuar...")
 
-def menu_funcionario(conn):
+def menu_funcionario():
     """Menu para o Funcionário (Adição de Venda e Consulta de Vendas)."""
     if not check_permission(['Funcionario', 'Administrador']): return
     while True:
@@ -1128,22 +2411,22 @@ def menu_funcionario(conn):
         
         choice = input("\nEscolha uma opção: ").strip()
 
-        if choice == '1': realizar_venda(conn)
-        elif choice == '2': consultar_vendas(conn)
+        if choice == '1': com_conexao(realizar_venda)
+        elif choice == '2': com_conexao(consultar_vendas)
         elif choice == '0': break
         else: print("[ERRO] Opção inválida."); time.sleep(1); continue
             
         input("\nPressione Enter para continuar...")
 
-def menu_principal(conn):
+def menu_principal():
     """Direciona para o menu específico com base no papel do usuário."""
     role = get_user_role()
     if role == 'Administrador':
-        menu_admin(conn)
+        menu_admin()
     elif role == 'Gerente':
-        menu_gerente(conn)
+        menu_gerente()
     elif role == 'Funcionario':
-        menu_funcionario(conn)
+        menu_funcionario()
     else:
         print("Você está logado, mas não tem acesso a nenhum menu.")
         time.sleep(2)
@@ -1161,14 +2444,21 @@ def login():
 
     conn = get_db_connection()
     if conn:
-        print(f"\n[SUCESSO] Conexão estabelecida como {get_user_role()} ({CURRENT_USER}).")
-        menu_principal(conn)
         conn.close()
+        print(f"\n[SUCESSO] Conexão estabelecida como {get_user_role()} ({CURRENT_USER}).")
+        try:
+            menu_principal()
+        finally:
+            fechar_pools()
+            if instrumentacao.ATIVO:
+                instrumentacao.exportar_arquivo()
     else:
+        fechar_pools()
         print("\n[ERRO] Falha na conexão ou credenciais inválidas. Tente novamente.")
         time.sleep(2)
 
 if __name__ == '__main__':
+    instrumentacao.iniciar_servidor_metricas()
     while True:
         login()
         clear_screen()
@@ -1,14 +1,215 @@
+import queue
+import threading
+import time
+
 import mysql.connector
 
+import instrumentacao
+
+
+class PoolEsgotadoError(mysql.connector.Error):
+    """Nenhuma conexão ficou livre dentro do tempo de espera do pool."""
+
+
+class ConexaoDoPool:
+    """Conexão emprestada do pool: close() devolve ao pool em vez de fechar o socket."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, nome):
+        return getattr(self._conn, nome)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._conn.cursor(*args, **kwargs)
+        if instrumentacao.ATIVO:
+            return instrumentacao.CursorInstrumentado(cursor)
+        return cursor
+
+    def commit(self):
+        if not instrumentacao.ATIVO:
+            return self._conn.commit()
+        inicio = time.perf_counter()
+        self._conn.commit()
+        instrumentacao.registrar_commit(time.perf_counter() - inicio)
+
+    def close(self):
+        if self._conn is not None:
+            self._pool.devolver(self._conn)
+            self._conn = None
+
+    def descartar(self):
+        """Fecha a conexão em vez de devolvê-la (ex.: leitura sem buffer interrompida no meio,
+        cujo resto do resultado levaria muito tempo para ser consumido)."""
+        if self._conn is not None:
+            self._pool.descartar(self._conn)
+            self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PoolConexoes:
+    """Pool de conexões MySQL com tamanho fixo, pre-ping no empréstimo e métricas."""
+
+    def __init__(self, config, tamanho=5, timeout=10.0, reconexao_tentativas=2):
+        self.config = dict(config)
+        self.tamanho = tamanho
+        self.timeout = timeout
+        self.reconexao_tentativas = reconexao_tentativas
+        self._livres = queue.LifoQueue()
+        self._criadas = 0
+        self._lock = threading.Lock()
+        self.metricas = {
+            'emprestimos': 0,
+            'devolucoes': 0,
+            'conexoes_criadas': 0,
+            'reconexoes': 0,
+            'descartadas': 0,
+            'timeouts': 0,
+            'espera_total_s': 0.0,
+            'espera_max_s': 0.0,
+        }
+
+    def _nova_conexao(self):
+        conn = mysql.connector.connect(**self.config)
+        with self._lock:
+            self.metricas['conexoes_criadas'] += 1
+        return conn
+
+    def _validar(self, conn):
+        """Pre-ping: reconecta a conexão se o servidor a derrubou enquanto estava ociosa."""
+        try:
+            conn.ping(reconnect=False)
+            return conn
+        except mysql.connector.Error:
+            pass
+        try:
+            conn.reconnect(attempts=self.reconexao_tentativas, delay=0)
+            with self._lock:
+                self.metricas['reconexoes'] += 1
+            return conn
+        except mysql.connector.Error:
+            with self._lock:
+                self.metricas['descartadas'] += 1
+            return self._nova_conexao()
+
+    def emprestar(self):
+        """Retira uma conexão validada do pool, criando ou aguardando se necessário."""
+        inicio = time.perf_counter()
+        conn = None
+        try:
+            conn = self._livres.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                pode_criar = self._criadas < self.tamanho
+                if pode_criar:
+                    self._criadas += 1
+            if pode_criar:
+                try:
+                    conn = self._nova_conexao()
+                except mysql.connector.Error:
+                    with self._lock:
+                        self._criadas -= 1
+                    raise
+            else:
+                try:
+                    conn = self._livres.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.metricas['timeouts'] += 1
+                    raise PoolEsgotadoError(
+                        msg=f"Pool esgotado: {self.tamanho} conexões em uso há mais de {self.timeout}s."
+                    )
+
+        try:
+            conn = self._validar(conn)
+        except mysql.connector.Error:
+            with self._lock:
+                self._criadas -= 1
+            raise
+
+        espera = time.perf_counter() - inicio
+        with self._lock:
+            self.metricas['emprestimos'] += 1
+            self.metricas['espera_total_s'] += espera
+            self.metricas['espera_max_s'] = max(self.metricas['espera_max_s'], espera)
+        return ConexaoDoPool(self, conn)
+
+    def devolver(self, conn):
+        """Limpa o estado da sessão e recoloca a conexão na fila de livres.
+
+        reset_session() (COM_RESET_CONNECTION) desfaz a transação pendente e apaga o
+        que o usuário anterior deixou na sessão: variáveis (FOREIGN_KEY_CHECKS,
+        net_write_timeout...), tabelas temporárias, roles, locks e variáveis @.
+        Depois dele o conector reaplica a configuração do pool (autocommit, charset).
+        Se a limpeza falhar, a conexão é descartada em vez de voltar suja.
+        """
+        try:
+            if conn.unread_result:
+                conn.consume_results()
+            conn.reset_session()
+        except mysql.connector.Error:
+            self.descartar(conn)
+            return
+        with self._lock:
+            self.metricas['devolucoes'] += 1
+        self._livres.put(conn)
+
+    def descartar(self, conn):
+        """Fecha a conexão e libera a vaga dela no pool."""
+        try:
+            conn.close()
+        except mysql.connector.Error:
+            pass
+        with self._lock:
+            self._criadas -= 1
+            self.metricas['descartadas'] += 1
+
+    def fechar(self):
+        """Fecha todas as conexões livres do pool."""
+        while True:
+            try:
+                conn = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.close()
+            except mysql.connector.Error:
+                pass
+            with self._lock:
+                self._criadas -= 1
+
+    def resumo(self):
+        """Retorna uma cópia das métricas com os valores derivados (em uso, espera média)."""
+        with self._lock:
+            dados = dict(self.metricas)
+            dados['tamanho'] = self.tamanho
+            dados['em_uso'] = self._criadas - self._livres.qsize()
+            dados['livres'] = self._livres.qsize()
+        emprestimos = dados['emprestimos']
+        dados['espera_media_ms'] = (dados['espera_total_s'] / emprestimos * 1000) if emprestimos else 0.0
+        return dados
+
+
+_POOL_ROOT = None
+
 def conectar():
+    global _POOL_ROOT
     try:
-        conexao = mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="",  # coloque a senha do root se tiver
-            database="ecommerce",  # nome do seu banco
-            unix_socket="/opt/lampp/var/mysql/mysql.sock"
-        )
+        if _POOL_ROOT is None:
+            _POOL_ROOT = PoolConexoes({
+                'host': "localhost",
+                'user': "root",
+                'password': "",  # coloque a senha do root se tiver
+                'database': "ecommerce",  # nome do seu banco
+                'unix_socket': "/opt/lampp/var/mysql/mysql.sock"
+            })
+        conexao = _POOL_ROOT.emprestar()
         print("✅ Conectado ao MySQL com sucesso!")
         return conexao
     except mysql.connector.Error as err:
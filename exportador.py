@@ -0,0 +1,277 @@
+"""Exportação de tabelas, views e relatórios para CSV, CSV compactado (.csv.gz) ou JSONL.
+
+As linhas vêm do servidor por um cursor sem buffer e são gravadas em blocos de
+tamanho fixo (fetchmany), então a memória não cresce com o tamanho do resultado:
+uma extração de dezenas de milhões de linhas de venda_produto usa o mesmo tanto
+que uma de mil. O arquivo é escrito como <saida>.parcial e só recebe o nome final
+quando a exportação termina, e o progresso (linhas e linhas/s) é impresso a cada
+poucos segundos.
+
+O formato vem da extensão da saída: .csv, .csv.gz, .jsonl ou .jsonl.gz.
+
+Exemplos:
+    python exportador.py tabela venda_produto venda_produto.csv.gz
+    python exportador.py tabela v_produto_vendas_totais totais.csv
+    python exportador.py vendas vendas_2025.jsonl --inicio 2025-01-01 --fim 2025-12-31
+    python exportador.py estatisticas estatisticas.csv
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import time
+
+import mysql.connector
+
+import codigopythonecommerce as app
+
+TAMANHO_BLOCO_EXPORTACAO = 10000
+INTERVALO_PROGRESSO_S = 5.0
+# O servidor espera no máximo isso (s) para o cliente ler o próximo pacote de um resultado sem buffer
+TIMEOUT_ESCRITA_S = 3600
+
+FORMATOS = ('.csv.gz', '.jsonl.gz', '.csv', '.jsonl')
+
+
+def _valor_texto(valor):
+    # Decimal, datas e TIME (timedelta) saem como o texto do MySQL, sem perder precisão
+    if isinstance(valor, (bytes, bytearray)):
+        return valor.decode('utf-8')
+    if isinstance(valor, (set, frozenset)):
+        return ','.join(sorted(valor))
+    return str(valor)
+
+
+class Escritor:
+    """Grava linhas em CSV ou JSONL (compactados ou não) a partir de tuplas na ordem de `colunas`."""
+
+    def __init__(self, caminho, colunas):
+        formato = next((f for f in FORMATOS if caminho.endswith(f)), None)
+        if formato is None:
+            raise ValueError(f"Formato não suportado: '{caminho}' (use {', '.join(FORMATOS)}).")
+        self.caminho = caminho
+        self.parcial = caminho + '.parcial'
+        self.colunas = list(colunas)
+        self.json = formato.startswith('.jsonl')
+        abrir = gzip.open if formato.endswith('.gz') else open
+        self._arquivo = abrir(self.parcial, 'wt', encoding='utf-8', newline='')
+        if not self.json:
+            self._csv = csv.writer(self._arquivo)
+            self._csv.writerow(self.colunas)
+
+    def escrever(self, linhas):
+        if self.json:
+            for linha in linhas:
+                self._arquivo.write(json.dumps(dict(zip(self.colunas, linha)), ensure_ascii=False, default=_valor_texto))
+                self._arquivo.write('\n')
+        else:
+            self._csv.writerows(['' if v is None else _valor_texto(v) for v in linha] for linha in linhas)
+
+    def concluir(self):
+        self._arquivo.close()
+        os.replace(self.parcial, self.caminho)
+
+    def descartar(self):
+        self._arquivo.close()
+        if os.path.exists(self.parcial):
+            os.remove(self.parcial)
+
+
+class Progresso:
+    def __init__(self, descricao, intervalo=INTERVALO_PROGRESSO_S):
+        self.descricao = descricao
+        self.intervalo = intervalo
+        self.linhas = 0
+        self.inicio = time.perf_counter()
+        self._ultimo = self.inicio
+
+    @property
+    def segundos(self):
+        return time.perf_counter() - self.inicio
+
+    def somar(self, linhas):
+        self.linhas += linhas
+        agora = time.perf_counter()
+        if agora - self._ultimo >= self.intervalo:
+            self._ultimo = agora
+            print(f"> {self.descricao}: {self.linhas:,} linhas ({self.linhas / (agora - self.inicio):,.0f} linhas/s)")
+
+
+def exportar_consulta(conn, sql, params, caminho, descricao, tamanho_bloco=TAMANHO_BLOCO_EXPORTACAO):
+    """Executa `sql` e grava o resultado em `caminho` bloco a bloco. Retorna linhas, segundos e bytes."""
+    progresso = Progresso(descricao)
+    escritor = None
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute("SELECT @@SESSION.net_write_timeout")
+        timeout_anterior = int(cursor.fetchone()[0])
+        cursor.execute(f"SET SESSION net_write_timeout = {TIMEOUT_ESCRITA_S}")
+        cursor.execute(sql, params)
+        escritor = Escritor(caminho, cursor.column_names)
+        while True:
+            bloco = cursor.fetchmany(tamanho_bloco)
+            if not bloco:
+                break
+            escritor.escrever(bloco)
+            progresso.somar(len(bloco))
+        escritor.concluir()
+    except BaseException:
+        if escritor is not None:
+            escritor.descartar()
+        # o resto do resultado ainda está no servidor: consumir tudo para reaproveitar a conexão
+        # pode levar mais que a própria exportação, então ela é fechada
+        conn.descartar()
+        raise
+    finally:
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass
+
+    # a conexão volta ao pool: os próximos usuários dela não devem herdar o timeout longo
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SET SESSION net_write_timeout = {timeout_anterior}")
+    except mysql.connector.Error:
+        conn.descartar()
+    finally:
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass
+    return {'arquivo': caminho, 'linhas': progresso.linhas, 'segundos': round(progresso.segundos, 2),
+            'bytes': os.path.getsize(caminho)}
+
+
+def consulta_tabela(conn, nome):
+    """SELECT de todas as colunas de uma tabela ou view existente (nome validado pelo catálogo)."""
+    meta = app.catalogo(conn).tabela(nome)
+    if meta is None:
+        raise ValueError(f"Tabela ou view '{nome}' não encontrada.")
+    return f"SELECT {', '.join(meta.nomes_colunas)} FROM {meta.nome}", ()
+
+
+def consulta_vendas(data_inicio=None, data_fim=None, id_cliente=None):
+    """Histórico de vendas completo, uma linha por item, na ordem do índice (data_venda, hora_venda, id).
+
+    Mesmos filtros de buscar_vendas(), mas sem paginação: o resultado inteiro é lido em streaming.
+    """
+    condicoes = []
+    params = []
+    if data_inicio:
+        condicoes.append("v.data_venda >= %s")
+        params.append(data_inicio)
+    if data_fim:
+        condicoes.append("v.data_venda <= %s")
+        params.append(data_fim)
+    if id_cliente:
+        condicoes.append("v.id_cliente = %s")
+        params.append(id_cliente)
+    where = ("WHERE " + " AND ".join(condicoes)) if condicoes else ""
+    return f"""
+    SELECT v.id AS id_venda, v.data_venda, v.hora_venda, v.valor AS valor_venda, v.endereco,
+           c.id AS id_cliente, c.nome AS cliente,
+           p.id AS id_produto, p.nome AS produto, vp.qtd, vp.valor AS valor_item
+    FROM venda v
+    JOIN cliente c ON c.id = v.id_cliente
+    JOIN venda_produto vp ON vp.id_venda = v.id
+    JOIN produto p ON p.id = vp.id_produto
+    {where}
+    ORDER BY v.data_venda, v.hora_venda, v.id
+    """, params
+
+
+def exportar_procedure(conn, procedure, args, caminho):
+    """Grava todos os result sets de uma procedure de relatório, numerados na coluna 'conjunto'.
+
+    O resultado de procedure chega inteiro no cliente (callproc guarda os result sets),
+    então isto é para relatórios agregados como EstatisticasCompletas, não para extrações.
+    """
+    inicio = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        cursor.callproc(procedure, args)
+        conjuntos = [(result_set.column_names, result_set.fetchall()) for result_set in cursor.stored_results()]
+    finally:
+        cursor.close()
+
+    colunas = ['conjunto']
+    for nomes, _ in conjuntos:
+        colunas.extend(n for n in nomes if n not in colunas)
+    escritor = Escritor(caminho, colunas)
+    linhas = 0
+    try:
+        for numero, (nomes, registros) in enumerate(conjuntos, start=1):
+            posicoes = [nomes.index(c) if c in nomes else None for c in colunas[1:]]
+            escritor.escrever([(numero, *(r[i] if i is not None else None for i in posicoes)) for r in registros])
+            linhas += len(registros)
+        escritor.concluir()
+    except BaseException:
+        escritor.descartar()
+        raise
+    return {'arquivo': caminho, 'linhas': linhas, 'segundos': round(time.perf_counter() - inicio, 2),
+            'bytes': os.path.getsize(caminho)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportação em streaming de tabelas e relatórios")
+    parser.add_argument('--usuario', default=os.environ.get('ECOMMERCE_USER', 'admin'))
+    parser.add_argument('--senha', default=os.environ.get('ECOMMERCE_PASSWORD'),
+                        help="padrão: $ECOMMERCE_PASSWORD; sem ela, a senha é pedida no terminal")
+    parser.add_argument('--bloco', type=int, default=TAMANHO_BLOCO_EXPORTACAO, help="linhas lidas do servidor por vez")
+    sub = parser.add_subparsers(dest='origem', required=True)
+
+    p_tabela = sub.add_parser('tabela', help="qualquer tabela ou view do banco")
+    p_tabela.add_argument('nome')
+    p_tabela.add_argument('saida', help="arquivo .csv, .csv.gz, .jsonl ou .jsonl.gz")
+
+    p_vendas = sub.add_parser('vendas', help="histórico de vendas, uma linha por item")
+    p_vendas.add_argument('saida')
+    p_vendas.add_argument('--inicio', help="AAAA-MM-DD")
+    p_vendas.add_argument('--fim', help="AAAA-MM-DD")
+    p_vendas.add_argument('--cliente', type=int, help="id do cliente")
+
+    p_estat = sub.add_parser('estatisticas', help="result sets da procedure EstatisticasCompletas")
+    p_estat.add_argument('saida')
+    args = parser.parse_args()
+
+    if not any(args.saida.endswith(f) for f in FORMATOS):
+        raise SystemExit(f"[ERRO] Use uma saída {', '.join(FORMATOS)}.")
+
+    app.CURRENT_USER = args.usuario
+    app.CURRENT_PASSWORD = app.senha_linha_de_comando(args.senha)
+    conn = app.get_db_connection()
+    if not conn:
+        raise SystemExit(1)
+    try:
+        if args.origem == 'estatisticas':
+            resultado = exportar_procedure(conn, 'EstatisticasCompletas', (), args.saida)
+        else:
+            if args.origem == 'tabela':
+                sql, params = consulta_tabela(conn, args.nome)
+                descricao = args.nome
+            else:
+                sql, params = consulta_vendas(args.inicio, args.fim, args.cliente)
+                descricao = 'vendas'
+            resultado = exportar_consulta(conn, sql, params, args.saida, descricao, args.bloco)
+    except ValueError as err:
+        print(f"[ERRO] {err}")
+        raise SystemExit(1)
+    except mysql.connector.Error as err:
+        print(f"[ERRO SQL] Exportação interrompida; nenhum arquivo foi gerado: {err}")
+        raise SystemExit(1)
+    except KeyboardInterrupt:
+        print("\n[INFO] Exportação cancelada; nenhum arquivo foi gerado.")
+        raise SystemExit(1)
+    finally:
+        conn.close()
+        app.fechar_pools()
+
+    taxa = resultado['linhas'] / resultado['segundos'] if resultado['segundos'] else 0.0
+    print(f"[SUCESSO] {resultado['linhas']:,} linhas em {resultado['arquivo']} "
+          f"({resultado['bytes'] / 1024 / 1024:.1f} MB, {resultado['segundos']:.2f}s, {taxa:,.0f} linhas/s).")
+
+
+if __name__ == '__main__':
+    main()
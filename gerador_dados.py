@@ -0,0 +1,246 @@
+"""Gerador de dados sintéticos em escala para testes de capacidade.
+
+Gera vendedores, produtos, transportadoras, clientes e um histórico de vendas
+(venda, venda_produto e transporte) proporcional a um fator de escala, com
+sazonalidade (picos em novembro/dezembro e fins de semana) e popularidade de
+produtos enviesada (distribuição de Zipf). Os dados são gerados e gravados em
+lotes (INSERT multi-linha via executemany), com semente fixa: a mesma escala e
+a mesma semente sempre produzem o mesmo banco.
+
+Os ids são atribuídos explicitamente a partir do maior id existente, então o
+gerador pode ser usado sobre um banco vazio (recomendado) ou já populado.
+
+Exemplo:
+    python gerador_dados.py --escala 0.1 --semente 42
+"""
+import argparse
+import math
+import os
+import random
+import time
+from datetime import date, timedelta
+
+import codigopythonecommerce as app
+
+# Tamanhos para escala 1.0
+TAMANHO_BASE = {
+    'vendedor': 50,
+    'transportadora': 20,
+    'produto': 2_000,
+    'cliente': 100_000,
+    'venda': 500_000,
+}
+ITENS_POR_VENDA_MEDIO = 3
+ZIPF_EXPOENTE = 1.1
+ANOS_HISTORICO = 3
+DATA_FINAL = date(2025, 12, 31)
+
+# Peso relativo de cada mês (1..12) e dia da semana (0 = segunda)
+PESO_MES = [0.8, 0.75, 0.9, 0.9, 1.0, 0.95, 1.0, 0.95, 0.9, 1.0, 1.6, 2.0]
+PESO_DIA_SEMANA = [0.9, 0.9, 0.95, 1.0, 1.15, 1.3, 1.1]
+
+CIDADES = [
+    'Recife', 'Olinda', 'São Paulo', 'Rio de Janeiro', 'Belo Horizonte', 'Porto Alegre',
+    'Salvador', 'Fortaleza', 'Curitiba', 'Manaus', 'Brasília', 'Goiânia',
+]
+TIPOS_VENDEDOR = ['vendedor', 'gerente', 'CEO']
+CAUSAS = ["Causa Ambiental", "Causa Social", "Causa Educacional", "Causa Animal", "Causa Tecnológica"]
+
+
+def tamanhos_para_escala(escala):
+    """Quantidade de linhas por tabela para um fator de escala (mínimo de 1 por tabela)."""
+    return {tabela: max(1, int(round(qtd * escala))) for tabela, qtd in TAMANHO_BASE.items()}
+
+
+def proximo_id(conn, tabela):
+    rows = app.execute_read(conn, f"SELECT COALESCE(MAX(id), 0) FROM {tabela}")
+    return rows[0][0] + 1
+
+
+def acumulados(pesos):
+    total = 0.0
+    saida = []
+    for p in pesos:
+        total += p
+        saida.append(total)
+    return saida
+
+
+class Carregador:
+    """Grava linhas em lotes e acumula linhas/segundos por tabela para o relatório."""
+
+    def __init__(self, conn, tamanho_lote):
+        self.conn = conn
+        self.tamanho_lote = tamanho_lote
+        self.estatisticas = {}
+
+    def inserir(self, tabela, colunas, linhas):
+        sql = f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join(['%s'] * len(colunas))})"
+        inicio = time.perf_counter()
+        cursor = self.conn.cursor()
+        try:
+            for i in range(0, len(linhas), self.tamanho_lote):
+                with app.transacao(self.conn):
+                    cursor.executemany(sql, linhas[i:i + self.tamanho_lote])
+        finally:
+            cursor.close()
+        est = self.estatisticas.setdefault(tabela, {'linhas': 0, 'segundos': 0.0})
+        est['linhas'] += len(linhas)
+        est['segundos'] += time.perf_counter() - inicio
+
+    def relatorio(self):
+        print("\n--- Throughput de carga ---")
+        for tabela, est in self.estatisticas.items():
+            taxa = est['linhas'] / est['segundos'] if est['segundos'] else 0.0
+            print(f"> {tabela:<16} {est['linhas']:>12,} linhas em {est['segundos']:8.2f}s  ({taxa:,.0f} linhas/s)")
+
+
+def gerar_cadastros(carregador, rnd, tamanhos):
+    """Gera vendedores, transportadoras, produtos e clientes. Retorna ids e preços gerados."""
+    conn = carregador.conn
+
+    id_ini = proximo_id(conn, 'vendedor')
+    vendedores = []
+    for i in range(id_ini, id_ini + tamanhos['vendedor']):
+        tipo = rnd.choices(TIPOS_VENDEDOR, weights=[85, 13, 2])[0]
+        salario = {
+            'vendedor': rnd.uniform(1800, 3000),
+            'gerente': rnd.uniform(4000, 7000),
+            'CEO': rnd.uniform(12000, 20000),
+        }[tipo]
+        vendedores.append((i, f"Vendedor {i}", round(salario, 2), tipo, rnd.choice(CAUSAS), round(rnd.uniform(3.0, 5.0), 1)))
+    carregador.inserir('vendedor', ['id', 'nome', 'salario', 'tipo', 'causa_social', 'nota_media'], vendedores)
+    ids_vendedor = [v[0] for v in vendedores]
+
+    id_ini = proximo_id(conn, 'transportadora')
+    transportadoras = [(i, f"Transportadora {i}", rnd.choice(CIDADES)) for i in range(id_ini, id_ini + tamanhos['transportadora'])]
+    carregador.inserir('transportadora', ['id', 'nome', 'cidade'], transportadoras)
+    ids_transportadora = [t[0] for t in transportadoras]
+
+    id_ini = proximo_id(conn, 'produto')
+    produtos = []
+    for i in range(id_ini, id_ini + tamanhos['produto']):
+        valor = round(min(5000.0, max(5.0, rnd.lognormvariate(4.5, 1.0))), 2)
+        produtos.append((i, f"Produto {i}", f"Descrição do produto {i}", 1_000_000, valor, rnd.choice(ids_vendedor)))
+    carregador.inserir('produto', ['id', 'nome', 'descricao', 'quantidade_estoque', 'valor', 'id_vendedor'], produtos)
+    # embaralha para que o produto mais popular não seja sempre o de menor id
+    produtos_por_popularidade = [(p[0], p[4]) for p in produtos]
+    rnd.shuffle(produtos_por_popularidade)
+
+    id_ini = proximo_id(conn, 'cliente')
+    ids_cliente = list(range(id_ini, id_ini + tamanhos['cliente']))
+    lote = []
+    for i in ids_cliente:
+        idade = rnd.randint(18, 80)
+        nasc = date(DATA_FINAL.year - idade, rnd.randint(1, 12), rnd.randint(1, 28))
+        lote.append((i, f"Cliente {i}", idade, rnd.choice(['m', 'f', 'o']), nasc))
+        if len(lote) >= carregador.tamanho_lote:
+            carregador.inserir('cliente', ['id', 'nome', 'idade', 'sexo', 'data_nascimento'], lote)
+            lote = []
+    if lote:
+        carregador.inserir('cliente', ['id', 'nome', 'idade', 'sexo', 'data_nascimento'], lote)
+
+    return ids_cliente, ids_transportadora, produtos_por_popularidade
+
+
+def gerar_vendas(carregador, rnd, qtd_vendas, ids_cliente, ids_transportadora, produtos):
+    """Gera o histórico de vendas em lotes: venda, venda_produto e transporte."""
+    conn = carregador.conn
+
+    dias = [DATA_FINAL - timedelta(days=d) for d in range(365 * ANOS_HISTORICO)]
+    dias.reverse()
+    # sazonalidade mensal/semanal + leve crescimento ao longo do histórico
+    pesos_dia = [
+        PESO_MES[d.month - 1] * PESO_DIA_SEMANA[d.weekday()] * (1 + i / len(dias))
+        for i, d in enumerate(dias)
+    ]
+    acum_dias = acumulados(pesos_dia)
+    acum_produtos = acumulados([1 / math.pow(rank, ZIPF_EXPOENTE) for rank in range(1, len(produtos) + 1)])
+    # clientes também têm frequência de compra desigual
+    acum_clientes = acumulados([1 / math.pow(rank, 0.6) for rank in range(1, len(ids_cliente) + 1)])
+    max_itens = min(len(produtos), ITENS_POR_VENDA_MEDIO * 3)
+
+    id_venda = proximo_id(conn, 'venda')
+    id_vp = proximo_id(conn, 'venda_produto')
+    id_transp = proximo_id(conn, 'transporte')
+
+    restantes = qtd_vendas
+    while restantes > 0:
+        n = min(restantes, carregador.tamanho_lote)
+        restantes -= n
+        datas = rnd.choices(dias, cum_weights=acum_dias, k=n)
+        clientes = rnd.choices(ids_cliente, cum_weights=acum_clientes, k=n)
+
+        vendas, linhas, transportes = [], [], []
+        for data_venda, id_cliente in zip(datas, clientes):
+            qtd_itens = min(max_itens, max(1, int(rnd.expovariate(1 / ITENS_POR_VENDA_MEDIO)) + 1))
+            escolhidos = set(rnd.choices(range(len(produtos)), cum_weights=acum_produtos, k=qtd_itens))
+            total = 0.0
+            for idx in escolhidos:
+                id_produto, valor = produtos[idx]
+                qtd = rnd.choices([1, 2, 3, 4, 5], weights=[60, 20, 10, 6, 4])[0]
+                valor_linha = round(valor * qtd, 2)
+                total += valor_linha
+                linhas.append((id_vp, id_venda, id_produto, qtd, valor_linha, f"Venda de {qtd} unidade(s)."))
+                id_vp += 1
+            hora = f"{min(23, max(0, int(rnd.gauss(15, 4)))):02d}:{rnd.randint(0, 59):02d}:{rnd.randint(0, 59):02d}"
+            vendas.append((id_venda, data_venda, hora, round(total, 2), rnd.choice(CIDADES), id_cliente))
+            transportes.append((id_transp, rnd.choice(ids_transportadora), id_venda, round(total * app.FRETE_PERCENTUAL, 2)))
+            id_venda += 1
+            id_transp += 1
+
+        carregador.inserir('venda', ['id', 'data_venda', 'hora_venda', 'valor', 'endereco', 'id_cliente'], vendas)
+        carregador.inserir('venda_produto', ['id', 'id_venda', 'id_produto', 'qtd', 'valor', 'obs'], linhas)
+        carregador.inserir('transporte', ['id', 'id_transportadora', 'id_venda', 'valor'], transportes)
+        print(f"> {qtd_vendas - restantes:,}/{qtd_vendas:,} vendas geradas...")
+
+
+def gerar_dados_escala(conn, escala=0.01, semente=42, tamanho_lote=5000):
+    """Popula o banco para o fator de escala informado e imprime o throughput por tabela."""
+    rnd = random.Random(semente)
+    tamanhos = tamanhos_para_escala(escala)
+    print(f"\nGerando dados sintéticos (escala {escala}, semente {semente}):")
+    for tabela, qtd in tamanhos.items():
+        print(f"  {tabela:<16} {qtd:>12,}")
+
+    carregador = Carregador(conn, tamanho_lote)
+    cursor = conn.cursor()
+    # as linhas geradas já são consistentes entre si: dispensa as checagens por linha
+    cursor.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+    inicio = time.perf_counter()
+    try:
+        ids_cliente, ids_transportadora, produtos = gerar_cadastros(carregador, rnd, tamanhos)
+        gerar_vendas(carregador, rnd, tamanhos['venda'], ids_cliente, ids_transportadora, produtos)
+    finally:
+        cursor.execute("SET SESSION foreign_key_checks = 1, unique_checks = 1")
+        cursor.close()
+
+    carregador.relatorio()
+    print(f"\n[SUCESSO] Dados gerados em {time.perf_counter() - inicio:.2f}s.")
+    return carregador.estatisticas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de dados sintéticos em escala")
+    parser.add_argument('--usuario', default=os.environ.get('ECOMMERCE_USER', 'admin'))
+    parser.add_argument('--senha', default=os.environ.get('ECOMMERCE_PASSWORD'),
+                        help="padrão: $ECOMMERCE_PASSWORD; sem ela, a senha é pedida no terminal")
+    parser.add_argument('--escala', type=float, default=0.01, help="1.0 = 100 mil clientes e 500 mil vendas")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--lote', type=int, default=5000, help="linhas por INSERT/transação")
+    args = parser.parse_args()
+
+    app.CURRENT_USER = args.usuario
+    app.CURRENT_PASSWORD = app.senha_linha_de_comando(args.senha)
+    conn = app.get_db_connection()
+    if not conn:
+        raise SystemExit(1)
+    try:
+        gerar_dados_escala(conn, args.escala, args.semente, args.lote)
+    finally:
+        conn.close()
+        app.fechar_pools()
+
+
+if __name__ == '__main__':
+    main()
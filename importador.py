@@ -0,0 +1,446 @@
+"""Importação em lote de clientes, produtos e pedidos a partir de arquivos CSV ou JSONL.
+
+Os arquivos são lidos em streaming e processados em lotes: cada lote é validado,
+gravado com executemany em UMA transação e descartado, então a memória usada não
+depende do tamanho do arquivo. Linhas inválidas vão para <arquivo>.rejeitados.jsonl
+com o número da linha e o motivo, e o restante do lote segue normalmente.
+
+Formato dos pedidos (tipo "vendas"): uma linha por item, com as colunas
+    pedido, id_cliente, data_venda, hora_venda, endereco, id_transportadora, id_produto, qtd[, valor]
+Linhas seguidas com o mesmo "pedido" formam uma venda. Em JSONL, um pedido também
+pode vir em uma única linha com "itens": [{"id_produto": .., "qtd": ..}, ...].
+Sem "valor", o item é cobrado pelo preço atual do produto. O estoque de cada lote
+é baixado com um único UPDATE (use --sem-estoque para cargas de histórico).
+
+Exemplos:
+    python importador.py clientes clientes.csv
+    python importador.py produtos produtos.jsonl --lote 5000
+    python importador.py vendas pedidos.csv --lote 1000
+"""
+import argparse
+import csv
+import json
+import os
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import groupby, islice
+
+import mysql.connector
+
+import codigopythonecommerce as app
+
+SEXOS_VALIDOS = ('m', 'f', 'o')
+
+
+def ler_registros(caminho):
+    """Gera (numero_linha, registro, erro) de um CSV (com cabeçalho) ou JSONL, sem carregar o arquivo."""
+    if caminho.endswith('.jsonl') or caminho.endswith('.ndjson'):
+        with open(caminho, encoding='utf-8') as f:
+            for numero, linha in enumerate(f, start=1):
+                if not linha.strip():
+                    continue
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError as err:
+                    yield numero, linha.strip(), f"JSON inválido: {err.msg}"
+                    continue
+                if not isinstance(registro, dict):
+                    yield numero, registro, "Cada linha deve ser um objeto JSON."
+                    continue
+                yield numero, registro, None
+    else:
+        with open(caminho, encoding='utf-8-sig', newline='') as f:
+            for numero, registro in enumerate(csv.DictReader(f), start=2):
+                yield numero, {k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in registro.items() if k}, None
+
+
+def em_lotes(iteravel, tamanho):
+    iterador = iter(iteravel)
+    while True:
+        lote = list(islice(iterador, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+class Rejeitados:
+    """Grava as linhas recusadas em JSONL, abrindo o arquivo só quando a primeira aparece."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.quantidade = 0
+        self._arquivo = None
+
+    def registrar(self, numero, registro, motivo):
+        if self._arquivo is None:
+            self._arquivo = open(self.caminho, 'w', encoding='utf-8')
+        self._arquivo.write(json.dumps({'linha': numero, 'motivo': motivo, 'registro': registro},
+                                       ensure_ascii=False, default=str) + '\n')
+        self.quantidade += 1
+
+    def fechar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+
+
+# --- Conversões (levantam ValueError com a mensagem que vai para o arquivo de rejeitados) ---
+
+def _vazio(valor):
+    return valor is None or (isinstance(valor, str) and not valor.strip())
+
+
+def texto(registro, campo, obrigatorio=False, tamanho=None):
+    valor = registro.get(campo)
+    if _vazio(valor):
+        if obrigatorio:
+            raise ValueError(f"Campo '{campo}' é obrigatório.")
+        return None
+    valor = str(valor).strip()
+    if tamanho and len(valor) > tamanho:
+        raise ValueError(f"Campo '{campo}' passa de {tamanho} caracteres.")
+    return valor
+
+
+def inteiro(registro, campo, obrigatorio=False, minimo=None):
+    valor = registro.get(campo)
+    if _vazio(valor):
+        if obrigatorio:
+            raise ValueError(f"Campo '{campo}' é obrigatório.")
+        return None
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"Campo '{campo}' deve ser um número inteiro: {valor!r}.")
+    if minimo is not None and numero < minimo:
+        raise ValueError(f"Campo '{campo}' deve ser no mínimo {minimo}.")
+    return numero
+
+
+def decimal(registro, campo, obrigatorio=False):
+    valor = registro.get(campo)
+    if _vazio(valor):
+        if obrigatorio:
+            raise ValueError(f"Campo '{campo}' é obrigatório.")
+        return None
+    try:
+        numero = Decimal(str(valor).replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(f"Campo '{campo}' deve ser numérico: {valor!r}.")
+    # NaN/Infinity passam pelo construtor (e o json.loads aceita NaN sem aspas)
+    if not numero.is_finite():
+        raise ValueError(f"Campo '{campo}' deve ser um número finito: {valor!r}.")
+    if numero < 0:
+        raise ValueError(f"Campo '{campo}' não pode ser negativo.")
+    try:
+        return numero.quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"Campo '{campo}' grande demais: {valor!r}.")
+
+
+def data(registro, campo):
+    valor = registro.get(campo)
+    if _vazio(valor):
+        return None
+    try:
+        return date.fromisoformat(str(valor)[:10])
+    except ValueError:
+        raise ValueError(f"Campo '{campo}' deve estar no formato AAAA-MM-DD: {valor!r}.")
+
+
+def hora(registro, campo):
+    valor = registro.get(campo)
+    if _vazio(valor):
+        return None
+    try:
+        return datetime.strptime(str(valor), '%H:%M:%S').time()
+    except ValueError:
+        raise ValueError(f"Campo '{campo}' deve estar no formato HH:MM:SS: {valor!r}.")
+
+
+def ids_existentes(cursor, tabela, ids):
+    """Quais dos ids informados existem na tabela (uma consulta IN por lote)."""
+    ids = list(ids)
+    if not ids:
+        return set()
+    cursor.execute(f"SELECT id FROM {tabela} WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+    return {row[0] for row in cursor.fetchall()}
+
+
+# --- Cadastros ---
+
+def validar_cliente(registro):
+    sexo = texto(registro, 'sexo')
+    if sexo is not None:
+        sexo = sexo.lower()
+        if sexo not in SEXOS_VALIDOS:
+            raise ValueError(f"Campo 'sexo' deve ser um de {', '.join(SEXOS_VALIDOS)}.")
+    return (texto(registro, 'nome', obrigatorio=True, tamanho=50), inteiro(registro, 'idade', minimo=0),
+            sexo, data(registro, 'data_nascimento'))
+
+
+def validar_produto(registro):
+    return (texto(registro, 'nome', obrigatorio=True, tamanho=50), texto(registro, 'descricao'),
+            inteiro(registro, 'quantidade_estoque', obrigatorio=True, minimo=0),
+            decimal(registro, 'valor', obrigatorio=True), texto(registro, 'observacoes'),
+            inteiro(registro, 'id_vendedor'))
+
+
+CADASTROS = {
+    'clientes': ('cliente', ['nome', 'idade', 'sexo', 'data_nascimento'], validar_cliente),
+    'produtos': ('produto', ['nome', 'descricao', 'quantidade_estoque', 'valor', 'observacoes', 'id_vendedor'],
+                 validar_produto),
+}
+
+
+def importar_cadastros(conn, tipo, registros, rejeitados, tamanho_lote):
+    """Importa clientes ou produtos em lotes. Retorna o número de linhas gravadas."""
+    tabela, colunas, validar = CADASTROS[tipo]
+    sql = f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join(['%s'] * len(colunas))})"
+    gravadas = 0
+    cursor = conn.cursor()
+    try:
+        for lote in em_lotes(registros, tamanho_lote):
+            validas = []
+            for numero, registro, erro in lote:
+                try:
+                    if erro:
+                        raise ValueError(erro)
+                    validas.append((numero, registro, validar(registro)))
+                except ValueError as err:
+                    rejeitados.registrar(numero, registro, str(err))
+
+            if tabela == 'produto':
+                vendedores = ids_existentes(cursor, 'vendedor', {linha[-1] for _, _, linha in validas if linha[-1]})
+                aceitas = []
+                for numero, registro, linha in validas:
+                    if linha[-1] is not None and linha[-1] not in vendedores:
+                        rejeitados.registrar(numero, registro, f"Vendedor ID {linha[-1]} não encontrado.")
+                    else:
+                        aceitas.append((numero, registro, linha))
+                validas = aceitas
+
+            if validas:
+                with app.transacao(conn):
+                    cursor.executemany(sql, [linha for _, _, linha in validas])
+                gravadas += len(validas)
+            print(f"> {gravadas:,} {tipo} importados, {rejeitados.quantidade:,} rejeitados...")
+    finally:
+        cursor.close()
+    return gravadas
+
+
+# --- Pedidos ---
+
+def agrupar_pedidos(registros):
+    """Junta as linhas consecutivas de um mesmo pedido. Gera (numero, [registros], pedido, erro)."""
+    def chave(item):
+        numero, registro, erro = item
+        if erro or _vazio(registro.get('pedido')):
+            return ('linha', numero)  # linha inválida ou sem pedido: fica sozinha
+        return ('pedido', str(registro['pedido']))
+
+    for _, grupo in groupby(registros, key=chave):
+        grupo = list(grupo)
+        numero = grupo[0][0]
+        brutos = [registro for _, registro, _ in grupo]
+        erro = next((e for _, _, e in grupo if e), None)
+        if erro:
+            yield numero, brutos, None, erro
+            continue
+        try:
+            yield numero, brutos, validar_pedido(brutos), None
+        except ValueError as err:
+            yield numero, brutos, None, str(err)
+
+
+def validar_pedido(linhas):
+    cabecalho = linhas[0]
+    if _vazio(cabecalho.get('pedido')):
+        raise ValueError("Campo 'pedido' é obrigatório.")
+    itens = []
+    for linha in linhas:
+        for item in (linha.get('itens') or [linha]):
+            itens.append((inteiro(item, 'id_produto', obrigatorio=True), inteiro(item, 'qtd', obrigatorio=True, minimo=1),
+                          decimal(item, 'valor')))
+    return {
+        'pedido': str(cabecalho['pedido']),
+        'id_cliente': inteiro(cabecalho, 'id_cliente', obrigatorio=True),
+        'data_venda': data(cabecalho, 'data_venda') or date.today(),
+        'hora_venda': hora(cabecalho, 'hora_venda') or datetime.now().time().replace(microsecond=0),
+        'endereco': texto(cabecalho, 'endereco', tamanho=100),
+        'id_transportadora': inteiro(cabecalho, 'id_transportadora'),
+        'itens': itens,
+    }
+
+
+def gravar_lote_pedidos(conn, cursor, lote, rejeitados, baixar_estoque=True):
+    """Valida um lote de pedidos contra o banco e grava os aceitos em uma transação.
+
+    Produtos são travados com um único SELECT ... FOR UPDATE; o estoque disponível
+    é consumido em memória na ordem do arquivo e o pedido que não couber é
+    rejeitado inteiro. Retorna (pedidos, itens) gravados.
+    """
+    produtos_lote = {id_produto for _, _, pedido in lote for id_produto, _, _ in pedido['itens']}
+    with app.transacao(conn):
+        clientes = ids_existentes(cursor, 'cliente', {p['id_cliente'] for _, _, p in lote})
+        transportadoras = ids_existentes(cursor, 'transportadora',
+                                         {p['id_transportadora'] for _, _, p in lote if p['id_transportadora']})
+        marcadores = ', '.join(['%s'] * len(produtos_lote))
+        cursor.execute(
+            f"SELECT id, valor, quantidade_estoque FROM produto WHERE id IN ({marcadores}) FOR UPDATE",
+            list(produtos_lote)
+        )
+        produtos = {row[0]: [row[1], row[2]] for row in cursor.fetchall()}
+
+        aceitos = []
+        baixas = {}
+        for numero, brutos, pedido in lote:
+            try:
+                if pedido['id_cliente'] not in clientes:
+                    raise ValueError(f"Cliente ID {pedido['id_cliente']} não encontrado.")
+                if pedido['id_transportadora'] and pedido['id_transportadora'] not in transportadoras:
+                    raise ValueError(f"Transportadora ID {pedido['id_transportadora']} não encontrada.")
+                pedidas = {}
+                for id_produto, qtd, _ in pedido['itens']:
+                    if id_produto not in produtos:
+                        raise ValueError(f"Produto ID {id_produto} não encontrado.")
+                    pedidas[id_produto] = pedidas.get(id_produto, 0) + qtd
+                if baixar_estoque:
+                    for id_produto, qtd in pedidas.items():
+                        if produtos[id_produto][1] < qtd:
+                            raise ValueError(f"Estoque insuficiente para o produto {id_produto}. "
+                                             f"Apenas {produtos[id_produto][1]} restantes.")
+            except ValueError as err:
+                rejeitados.registrar(numero, brutos, str(err))
+                continue
+            if baixar_estoque:
+                for id_produto, qtd in pedidas.items():
+                    produtos[id_produto][1] -= qtd
+                    baixas[id_produto] = baixas.get(id_produto, 0) + qtd
+            aceitos.append(pedido)
+
+        if not aceitos:
+            return 0, 0
+
+        # o id de cada venda vem do AUTO_INCREMENT (um INSERT por pedido, lido em lastrowid):
+        # nada é travado em venda, então o checkout e outras importações seguem em paralelo
+        linhas, transportes = [], []
+        for pedido in aceitos:
+            itens = []
+            total = Decimal('0.00')
+            for id_produto, qtd, valor in pedido['itens']:
+                valor_linha = valor if valor is not None else produtos[id_produto][0] * qtd
+                total += valor_linha
+                itens.append((id_produto, qtd, valor_linha, f"Importado do pedido {pedido['pedido']}."[:100]))
+            cursor.execute(
+                "INSERT INTO venda (data_venda, hora_venda, valor, endereco, id_cliente) VALUES (%s, %s, %s, %s, %s)",
+                (pedido['data_venda'], pedido['hora_venda'], total, pedido['endereco'], pedido['id_cliente'])
+            )
+            id_venda = cursor.lastrowid
+            linhas.extend((id_venda, *item) for item in itens)
+            if pedido['id_transportadora']:
+                transportes.append((pedido['id_transportadora'], id_venda,
+                                    round(total * Decimal(str(app.FRETE_PERCENTUAL)), 2)))
+
+        cursor.executemany(
+            "INSERT INTO venda_produto (id_venda, id_produto, qtd, valor, obs) VALUES (%s, %s, %s, %s, %s)",
+            linhas
+        )
+        if transportes:
+            cursor.executemany(
+                "INSERT INTO transporte (id_transportadora, id_venda, valor) VALUES (%s, %s, %s)",
+                transportes
+            )
+        if baixas:
+            ids = list(baixas)
+            casos = ' '.join(['WHEN %s THEN %s'] * len(ids))
+            params = [v for id_produto in ids for v in (id_produto, baixas[id_produto])]
+            cursor.execute(
+                f"UPDATE produto SET quantidade_estoque = quantidade_estoque - CASE id {casos} END "
+                f"WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                params + ids
+            )
+    return len(aceitos), len(linhas)
+
+
+def importar_pedidos(conn, registros, rejeitados, tamanho_lote, baixar_estoque=True):
+    """Importa pedidos com itens em lotes de `tamanho_lote` pedidos. Retorna (pedidos, itens)."""
+    total_pedidos = total_itens = 0
+    cursor = conn.cursor()
+    try:
+        for lote in em_lotes(agrupar_pedidos(registros), tamanho_lote):
+            validos = []
+            for numero, brutos, pedido, erro in lote:
+                if erro:
+                    rejeitados.registrar(numero, brutos, erro)
+                else:
+                    validos.append((numero, brutos, pedido))
+            if validos:
+                pedidos, itens = gravar_lote_pedidos(conn, cursor, validos, rejeitados, baixar_estoque)
+                total_pedidos += pedidos
+                total_itens += itens
+            print(f"> {total_pedidos:,} pedidos ({total_itens:,} itens) importados, "
+                  f"{rejeitados.quantidade:,} rejeitados...")
+    finally:
+        cursor.close()
+    return total_pedidos, total_itens
+
+
+def importar_arquivo(conn, tipo, caminho, tamanho_lote=1000, baixar_estoque=True):
+    """Importa um arquivo CSV/JSONL de `tipo` (clientes, produtos ou vendas) e imprime o throughput."""
+    rejeitados = Rejeitados(caminho + '.rejeitados.jsonl')
+    inicio = time.perf_counter()
+    try:
+        registros = ler_registros(caminho)
+        if tipo == 'vendas':
+            gravadas, itens = importar_pedidos(conn, registros, rejeitados, tamanho_lote, baixar_estoque)
+        else:
+            gravadas, itens = importar_cadastros(conn, tipo, registros, rejeitados, tamanho_lote), None
+    finally:
+        rejeitados.fechar()
+    segundos = time.perf_counter() - inicio
+
+    resultado = {
+        'tipo': tipo,
+        'importados': gravadas,
+        'rejeitados': rejeitados.quantidade,
+        'segundos': round(segundos, 2),
+        'linhas_por_s': round(gravadas / segundos, 1) if segundos else 0.0,
+    }
+    if itens is not None:
+        resultado['itens'] = itens
+    print(f"\n[SUCESSO] {gravadas:,} {tipo} importados em {segundos:.2f}s ({resultado['linhas_por_s']:,.0f}/s).")
+    if rejeitados.quantidade:
+        print(f"[AVISO] {rejeitados.quantidade:,} linha(s) rejeitada(s): veja {rejeitados.caminho}")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importação em lote de arquivos CSV/JSONL")
+    parser.add_argument('--usuario', default=os.environ.get('ECOMMERCE_USER', 'admin'))
+    parser.add_argument('--senha', default=os.environ.get('ECOMMERCE_PASSWORD'),
+                        help="padrão: $ECOMMERCE_PASSWORD; sem ela, a senha é pedida no terminal")
+    parser.add_argument('tipo', choices=['clientes', 'produtos', 'vendas'])
+    parser.add_argument('arquivo', help="arquivo .csv (com cabeçalho) ou .jsonl")
+    parser.add_argument('--lote', type=int, default=1000, help="registros (ou pedidos) por transação")
+    parser.add_argument('--sem-estoque', action='store_true', help="não confere nem baixa estoque (histórico)")
+    args = parser.parse_args()
+
+    app.CURRENT_USER = args.usuario
+    app.CURRENT_PASSWORD = app.senha_linha_de_comando(args.senha)
+    conn = app.get_db_connection()
+    if not conn:
+        raise SystemExit(1)
+    try:
+        importar_arquivo(conn, args.tipo, args.arquivo, args.lote, baixar_estoque=not args.sem_estoque)
+    except mysql.connector.Error as err:
+        print(f"[ERRO SQL] Importação interrompida; o lote em andamento foi desfeito: {err}")
+        raise SystemExit(1)
+    finally:
+        conn.close()
+        app.fechar_pools()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+"""Instrumentação dos comandos SQL: latência por comando normalizado, log de consultas lentas e
+exportação das métricas no formato texto do Prometheus.
+
+Desligada por padrão; com ECOMMERCE_METRICAS=1 (ou ativar()) todo cursor emprestado do pool
+(conexao.ConexaoDoPool) passa a ser medido -- execute, executemany e callproc -- assim como
+os commits. Desligada, o custo é um teste de booleano por cursor criado.
+
+Variáveis de ambiente:
+    ECOMMERCE_METRICAS=1             liga a instrumentação
+    ECOMMERCE_LENTAS_MS=200          limite do log de consultas lentas (ms)
+    ECOMMERCE_LOG_LENTAS=arquivo     log das consultas lentas (padrão consultas_lentas.log)
+    ECOMMERCE_METRICAS_ARQUIVO=arq   arquivo .prom gravado por exportar_arquivo()
+    ECOMMERCE_METRICAS_PORTA=9108    serve /metrics por HTTP (só nos programas que chamam
+                                     iniciar_servidor_metricas(): o menu e o servico_checkout)
+"""
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import mysql.connector
+
+ATIVO = False
+LIMITE_LENTO_MS = float(os.environ.get('ECOMMERCE_LENTAS_MS', '200'))
+ARQUIVO_LENTAS = os.environ.get('ECOMMERCE_LOG_LENTAS', 'consultas_lentas.log')
+ARQUIVO_METRICAS = os.environ.get('ECOMMERCE_METRICAS_ARQUIVO')
+PORTA_METRICAS = os.environ.get('ECOMMERCE_METRICAS_PORTA')
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_comandos = {}   # comando normalizado -> estatísticas
+_commits = None
+_normalizados = {}
+_servidor = None
+
+_RE_LITERAIS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|\b\d+(?:\.\d+)?\b")
+_RE_MARCADORES = re.compile(r"%\(\w+\)s|%s")
+_RE_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_RE_TUPLAS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_RE_ESPACOS = re.compile(r"\s+")
+
+
+def _nova_estatistica():
+    return {'buckets': [0] * len(BUCKETS), 'soma_s': 0.0, 'contagem': 0, 'linhas': 0, 'erros': 0, 'max_s': 0.0}
+
+
+def normalizar(sql):
+    """Troca literais e marcadores por '?' e listas IN/VALUES por '(...)' para agrupar comandos iguais."""
+    if isinstance(sql, (bytes, bytearray)):
+        sql = sql.decode('utf-8', 'replace')
+    normalizado = _normalizados.get(sql)
+    if normalizado is None:
+        texto = _RE_MARCADORES.sub('?', sql)
+        texto = _RE_LITERAIS.sub('?', texto)
+        texto = _RE_LISTAS.sub('(...)', texto)
+        texto = _RE_TUPLAS.sub('(...)', texto)
+        normalizado = _RE_ESPACOS.sub(' ', texto).strip()
+        if len(_normalizados) < 5000:
+            _normalizados[sql] = normalizado
+    return normalizado
+
+
+def _acumular(estatistica, duracao, linhas):
+    for i, limite in enumerate(BUCKETS):
+        if duracao <= limite:
+            estatistica['buckets'][i] += 1
+            break
+    estatistica['soma_s'] += duracao
+    estatistica['contagem'] += 1
+    estatistica['linhas'] += max(linhas, 0)
+    estatistica['max_s'] = max(estatistica['max_s'], duracao)
+
+
+def registrar(sql, duracao, linhas=0, params=None, erro=None):
+    """Contabiliza uma execução e, se passou do limite, grava no log de consultas lentas."""
+    comando = normalizar(sql)
+    with _lock:
+        estatistica = _comandos.get(comando)
+        if estatistica is None:
+            estatistica = _comandos[comando] = _nova_estatistica()
+        if erro is not None:
+            estatistica['erros'] += 1
+        _acumular(estatistica, duracao, linhas)
+
+    if duracao * 1000 >= LIMITE_LENTO_MS:
+        _registrar_lenta(sql, duracao, linhas, params)
+
+
+def somar_linhas(sql, linhas):
+    """Soma linhas lidas depois do execute (fetch de cursores sem buffer)."""
+    if linhas <= 0:
+        return
+    comando = normalizar(sql)
+    with _lock:
+        estatistica = _comandos.get(comando)
+        if estatistica is not None:
+            estatistica['linhas'] += linhas
+
+
+def registrar_commit(duracao):
+    global _commits
+    with _lock:
+        if _commits is None:
+            _commits = _nova_estatistica()
+        _acumular(_commits, duracao, 0)
+
+
+def _registrar_lenta(sql, duracao, linhas, params):
+    if isinstance(sql, (bytes, bytearray)):
+        sql = sql.decode('utf-8', 'replace')
+    parametros = repr(params)
+    if len(parametros) > 500:
+        parametros = parametros[:500] + '...'
+    linha = (f"{datetime.now().isoformat(timespec='seconds')}\t{duracao * 1000:.1f} ms\tlinhas={linhas}\t"
+             f"{_RE_ESPACOS.sub(' ', sql).strip()}\tparams={parametros}\n")
+    try:
+        with _lock, open(ARQUIVO_LENTAS, 'a', encoding='utf-8') as f:
+            f.write(linha)
+    except OSError as err:
+        print(f"[AVISO] Não foi possível gravar o log de consultas lentas: {err}")
+
+
+class CursorInstrumentado:
+    """Cursor que mede execute/executemany/callproc e conta as linhas lidas."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._sql = None
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+    def __iter__(self):
+        linhas = 0
+        for row in self._cursor:
+            linhas += 1
+            yield row
+        if self._sql is not None:
+            somar_linhas(self._sql, linhas)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+    def _medir(self, sql, params, chamada, *args, **kwargs):
+        self._sql = sql
+        inicio = time.perf_counter()
+        try:
+            resultado = chamada(*args, **kwargs)
+        except mysql.connector.Error as err:
+            registrar(sql, time.perf_counter() - inicio, 0, params, erro=err)
+            raise
+        duracao = time.perf_counter() - inicio
+        # SELECT sem buffer só conhece as linhas no fetch (ver fetch*/__iter__)
+        linhas = 0 if getattr(self._cursor, 'with_rows', False) else self._cursor.rowcount
+        registrar(sql, duracao, linhas, params)
+        return resultado
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._medir(operation, params, self._cursor.execute, operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        # o conector aceita geradores; materializa uma vez para poder contar sem consumi-los
+        seq_params = list(seq_params)
+        return self._medir(operation, f"<{len(seq_params)} linhas>", self._cursor.executemany,
+                           operation, seq_params, *args, **kwargs)
+
+    def callproc(self, procname, args=(), *resto, **kwargs):
+        return self._medir(f"CALL {procname}", args, self._cursor.callproc, procname, args, *resto, **kwargs)
+
+    def fetchall(self):
+        registros = self._cursor.fetchall()
+        if self._sql is not None:
+            somar_linhas(self._sql, len(registros))
+        return registros
+
+    def fetchmany(self, *args, **kwargs):
+        registros = self._cursor.fetchmany(*args, **kwargs)
+        if self._sql is not None:
+            somar_linhas(self._sql, len(registros))
+        return registros
+
+    def fetchone(self):
+        registro = self._cursor.fetchone()
+        if registro is not None and self._sql is not None:
+            somar_linhas(self._sql, 1)
+        return registro
+
+
+def ativar(limite_lento_ms=None, arquivo_lentas=None):
+    """Liga a instrumentação (cursores criados a partir de agora passam a ser medidos)."""
+    global ATIVO, LIMITE_LENTO_MS, ARQUIVO_LENTAS
+    if limite_lento_ms is not None:
+        LIMITE_LENTO_MS = float(limite_lento_ms)
+    if arquivo_lentas is not None:
+        ARQUIVO_LENTAS = arquivo_lentas
+    ATIVO = True
+
+
+def desativar():
+    global ATIVO
+    ATIVO = False
+
+
+def zerar():
+    global _commits
+    with _lock:
+        _comandos.clear()
+        _commits = None
+
+
+def resumo(limite=None):
+    """Lista os comandos do mais caro (tempo total) para o mais barato, com média e p95 aproximado."""
+    with _lock:
+        itens = [(comando, dict(e, buckets=list(e['buckets']))) for comando, e in _comandos.items()]
+    itens.sort(key=lambda item: item[1]['soma_s'], reverse=True)
+    linhas = []
+    for comando, e in itens[:limite]:
+        linhas.append({
+            'comando': comando,
+            'execucoes': e['contagem'],
+            'erros': e['erros'],
+            'linhas': e['linhas'],
+            'total_ms': round(e['soma_s'] * 1000, 3),
+            'media_ms': round(e['soma_s'] / e['contagem'] * 1000, 3) if e['contagem'] else 0.0,
+            'p95_ms': _percentil_buckets(e, 95),
+            'max_ms': round(e['max_s'] * 1000, 3),
+        })
+    return linhas
+
+
+def _percentil_buckets(estatistica, p):
+    """Limite superior (ms) do bucket onde cai o percentil p; acima do último bucket usa o máximo."""
+    alvo = estatistica['contagem'] * p / 100
+    acumulado = 0
+    for limite, qtd in zip(BUCKETS, estatistica['buckets']):
+        acumulado += qtd
+        if acumulado >= alvo:
+            return round(min(limite, estatistica['max_s']) * 1000, 3)
+    return round(estatistica['max_s'] * 1000, 3)
+
+
+def _rotulo(valor):
+    valor = valor[:200]
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def _linhas_histograma(nome, rotulos, estatistica):
+    linhas = []
+    acumulado = 0
+    for limite, qtd in zip(BUCKETS, estatistica['buckets']):
+        acumulado += qtd
+        linhas.append(f'{nome}_bucket{{{rotulos}le="{limite}"}} {acumulado}')
+    linhas.append(f'{nome}_bucket{{{rotulos}le="+Inf"}} {estatistica["contagem"]}')
+    sufixo = f'{{{rotulos.rstrip(",")}}}' if rotulos else ''
+    linhas.append(f'{nome}_sum{sufixo} {estatistica["soma_s"]:.6f}')
+    linhas.append(f'{nome}_count{sufixo} {estatistica["contagem"]}')
+    return linhas
+
+
+def exportar_prometheus():
+    """Retorna as métricas no formato texto de exposição do Prometheus."""
+    with _lock:
+        comandos = [(c, dict(e, buckets=list(e['buckets']))) for c, e in _comandos.items()]
+        commits = dict(_commits, buckets=list(_commits['buckets'])) if _commits else None
+
+    saida = [
+        '# HELP ecommerce_sql_duracao_segundos Latência dos comandos SQL por comando normalizado.',
+        '# TYPE ecommerce_sql_duracao_segundos histogram',
+    ]
+    for comando, e in comandos:
+        saida.extend(_linhas_histograma('ecommerce_sql_duracao_segundos', f'comando="{_rotulo(comando)}",', e))
+
+    saida.append('# HELP ecommerce_sql_linhas_total Linhas lidas ou afetadas por comando normalizado.')
+    saida.append('# TYPE ecommerce_sql_linhas_total counter')
+    for comando, e in comandos:
+        saida.append(f'ecommerce_sql_linhas_total{{comando="{_rotulo(comando)}"}} {e["linhas"]}')
+
+    saida.append('# HELP ecommerce_sql_erros_total Execuções que terminaram em erro do MySQL.')
+    saida.append('# TYPE ecommerce_sql_erros_total counter')
+    for comando, e in comandos:
+        saida.append(f'ecommerce_sql_erros_total{{comando="{_rotulo(comando)}"}} {e["erros"]}')
+
+    if commits:
+        saida.append('# HELP ecommerce_commit_duracao_segundos Latência dos COMMITs.')
+        saida.append('# TYPE ecommerce_commit_duracao_segundos histogram')
+        saida.extend(_linhas_histograma('ecommerce_commit_duracao_segundos', '', commits))
+    return '\n'.join(saida) + '\n'
+
+
+def exportar_arquivo(caminho=None):
+    """Grava as métricas em um arquivo .prom (ex.: textfile collector do node_exporter).
+
+    Escreve em um temporário e renomeia, para o coletor nunca ler um arquivo pela metade.
+    """
+    caminho = caminho or ARQUIVO_METRICAS
+    if not caminho:
+        return None
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write(exportar_prometheus())
+    os.replace(temporario, caminho)
+    return caminho
+
+
+class _HandlerMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        corpo = exportar_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def servir_metricas(porta, host='127.0.0.1'):
+    """Expõe GET /metrics em uma thread daemon. Retorna o servidor (shutdown() para parar)."""
+    servidor = ThreadingHTTPServer((host, porta), _HandlerMetricas)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def iniciar_servidor_metricas():
+    """Sobe o /metrics na ECOMMERCE_METRICAS_PORTA, uma vez por processo, se a instrumentação estiver ligada.
+
+    Chamado pelos pontos de entrada de longa duração, e não no import: cada script que importa o
+    sistema tentaria ocupar a mesma porta.
+    """
+    global _servidor
+    if _servidor is not None or not ATIVO or not PORTA_METRICAS:
+        return _servidor
+    try:
+        _servidor = servir_metricas(int(PORTA_METRICAS))
+    except OSError as err:
+        print(f"[AVISO] Não foi possível servir /metrics na porta {PORTA_METRICAS}: {err}")
+    return _servidor
+
+
+if os.environ.get('ECOMMERCE_METRICAS', '').lower() in ('1', 'true', 'sim'):
+    ativar()
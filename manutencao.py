@@ -0,0 +1,185 @@
+"""Tarefas de manutenção do banco para rodar fora dos menus (ex.: agendadas no cron).
+
+Exemplos:
+    python manutencao.py resumos              # atualização incremental das views
+    python manutencao.py resumos --completo   # reconstrução completa
+    python manutencao.py receita --inicio 2025-01-01 --fim 2025-01-31
+    python manutencao.py demografia --atualizar-idade
+    python manutencao.py migrar               # aplica as migrações pendentes de migracoes/
+    python manutencao.py indices              # EXPLAIN das consultas quentes (varreduras/filesort)
+    python manutencao.py lote produto --onde "id_vendedor = 3" --multiplicar valor=1.10 --simular
+    python manutencao.py lote venda --faixa 1-50000 --apagar --cascata
+    python manutencao.py snapshot salvar demo          # retrato de todas as tabelas em snapshots/demo/
+    python manutencao.py snapshot restaurar demo       # volta o banco a esse retrato
+    python manutencao.py snapshot restaurar demo --conferir   # e compara o banco com o arquivo depois
+"""
+import argparse
+import json
+import os
+
+import codigopythonecommerce as app
+import migrador
+import snapshots
+
+
+def cmd_resumos(conn, args):
+    return app.atualizar_resumos(conn, completo=args.completo)
+
+
+def cmd_receita(conn, args):
+    vendedores = [int(v) for v in args.vendedores.split(',')] if args.vendedores else None
+    datas, matriz = app.matriz_receita(conn, args.inicio, args.fim, vendedores)
+    return {
+        'datas': [str(d) for d in datas],
+        'vendedores': {str(v): {str(d): float(t) for d, t in dias.items()} for v, dias in matriz.items()},
+    }
+
+
+def cmd_demografia(conn, args):
+    return app.calcular_demografia(conn, atualizar_idade=args.atualizar_idade)
+
+
+def cmd_migrar(conn, args):
+    aplicadas = migrador.aplicar_migracoes(conn, ate=args.ate)
+    if aplicadas:
+        app.CATALOGO.invalidar()
+    return {'aplicadas': aplicadas}
+
+
+def cmd_indices(conn, args):
+    relatorio = migrador.analisar_indices(conn, linhas_minimas=args.linhas_minimas)
+    alertas = [r for r in relatorio if r['alertas']]
+    for r in alertas:
+        print(f"[AVISO] {r['consulta']}: {r['tabela']} ({', '.join(r['alertas'])}; ~{r['linhas']} linhas)")
+    if not alertas:
+        print("[OK] Nenhuma varredura completa ou filesort nas consultas quentes.")
+    return relatorio if args.detalhes else None
+
+
+def cmd_lote(conn, args):
+    app.catalogo(conn)
+    meta = app.CATALOGO.tabela(args.tabela)
+    if meta is None or meta.view:
+        raise SystemExit(f"[ERRO] Tabela '{args.tabela}' não encontrada.")
+
+    predicado = None
+    if args.onde:
+        partes = args.onde.split(None, 2)
+        if len(partes) >= 2 and partes[1].upper() == 'IS':
+            predicado = (partes[0], ' '.join(args.onde.split()[1:]), None)
+        elif len(partes) == 3:
+            predicado = (partes[0], partes[1], partes[2])
+        else:
+            raise SystemExit("[ERRO] Use --onde \"coluna operador valor\".")
+    ids = [int(i) for i in args.ids.split(',')] if args.ids else None
+    faixa = tuple(int(v) for v in args.faixa.split('-')) if args.faixa else None
+    filtro = app.montar_filtro(meta, ids=ids, faixa=faixa, predicado=predicado)
+
+    if args.apagar:
+        return app.apagar_em_lote(conn, args.tabela, filtro, args.lote, cascata=args.cascata, simular=args.simular)
+    atribuicoes = [(c, '=', v) for c, v in (a.split('=', 1) for a in args.set)]
+    atribuicoes += [(c, '*', v) for c, v in (a.split('=', 1) for a in args.multiplicar)]
+    return app.atualizar_em_lote(conn, args.tabela, atribuicoes, filtro, args.lote, simular=args.simular)
+
+
+def cmd_snapshot(conn, args):
+    if args.acao == 'listar':
+        return snapshots.listar_snapshots(args.pasta)
+    if not args.nome:
+        raise SystemExit(f"[ERRO] Informe o nome do snapshot a {args.acao}.")
+    try:
+        if args.acao == 'apagar':
+            snapshots.apagar_snapshot(args.nome, args.pasta)
+            print(f"[OK] Snapshot '{args.nome}' apagado.")
+            return None
+        if args.acao == 'salvar':
+            manifesto = snapshots.salvar_snapshot(conn, app.catalogo(conn), args.nome, args.pasta,
+                                                  sobrescrever=args.sobrescrever, tamanho_lote=args.lote)
+            return {'segundos': manifesto['segundos'],
+                    'tabelas': {t['nome']: {'linhas': t['linhas'], 'bytes': t['bytes']} for t in manifesto['tabelas']}}
+        if args.acao == 'restaurar':
+            relatorio = snapshots.restaurar_snapshot(conn, app.catalogo(conn), args.nome, args.pasta, tamanho_lote=args.lote)
+            if not args.conferir:
+                return relatorio
+        divergencias = snapshots.conferir_snapshot(conn, app.catalogo(conn), args.nome, args.pasta, tamanho_lote=args.lote)
+        for tabela, d in divergencias.items():
+            print(f"[AVISO] {tabela}: {d['linhas_divergentes']} linha(s) diferente(s), banco {d['linhas_banco']} x "
+                  f"snapshot {d['linhas_snapshot']}; colunas: {', '.join(d['colunas'] + d['colunas_fora_do_snapshot']) or '-'}")
+        if not divergencias:
+            print(f"[OK] O banco é idêntico ao snapshot '{args.nome}' (inclusive datas e horas).")
+        return divergencias or None
+    except ValueError as err:
+        raise SystemExit(f"[ERRO] {err}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tarefas de manutenção do e-commerce")
+    parser.add_argument('--usuario', default=os.environ.get('ECOMMERCE_USER', 'admin'))
+    parser.add_argument('--senha', default=os.environ.get('ECOMMERCE_PASSWORD'),
+                        help="padrão: $ECOMMERCE_PASSWORD; sem ela, a senha é pedida no terminal")
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_resumos = sub.add_parser('resumos', help="atualiza os resumos materializados das views de relatório")
+    p_resumos.add_argument('--completo', action='store_true', help="reconstrói do zero em vez de aplicar só as vendas novas")
+    p_resumos.set_defaults(func=cmd_resumos)
+
+    p_receita = sub.add_parser('receita', help="matriz de receita dia x vendedor (rollup receita_diaria_vendedor)")
+    p_receita.add_argument('--inicio', required=True, help="AAAA-MM-DD")
+    p_receita.add_argument('--fim', required=True, help="AAAA-MM-DD")
+    p_receita.add_argument('--vendedores', help="ids separados por vírgula (padrão: todos)")
+    p_receita.set_defaults(func=cmd_receita)
+
+    p_demo = sub.add_parser('demografia', help="faixa etária x sexo x gasto de todos os clientes (NumPy)")
+    p_demo.add_argument('--atualizar-idade', action='store_true', help="regrava a coluna idade desatualizada")
+    p_demo.set_defaults(func=cmd_demografia)
+
+    p_migrar = sub.add_parser('migrar', help="aplica as migrações de esquema pendentes (migracoes/NNNN_*.sql)")
+    p_migrar.add_argument('--ate', type=int, help="para na versão indicada")
+    p_migrar.set_defaults(func=cmd_migrar)
+
+    p_indices = sub.add_parser('indices', help="roda EXPLAIN nas consultas quentes e aponta varreduras completas e filesorts")
+    p_indices.add_argument('--linhas-minimas', type=int, default=1000, help="só aponta varredura completa acima disso")
+    p_indices.add_argument('--detalhes', action='store_true', help="imprime o plano completo em JSON")
+    p_indices.set_defaults(func=cmd_indices)
+
+    p_lote = sub.add_parser('lote', help="UPDATE/DELETE em blocos por lista de ids, faixa ou filtro")
+    p_lote.add_argument('tabela')
+    p_lote.add_argument('--ids', help="ids separados por vírgula")
+    p_lote.add_argument('--faixa', help="inicio-fim")
+    p_lote.add_argument('--onde', help='filtro "coluna operador valor" (=, <>, <, <=, >, >=, LIKE, IS NULL)')
+    p_lote.add_argument('--set', action='append', default=[], help="coluna=valor (repetível)")
+    p_lote.add_argument('--multiplicar', action='append', default=[], help="coluna=fator (repetível)")
+    p_lote.add_argument('--apagar', action='store_true', help="DELETE em vez de UPDATE")
+    p_lote.add_argument('--cascata', action='store_true', help="apaga antes as linhas dependentes (FKs)")
+    p_lote.add_argument('--simular', action='store_true', help="só conta as linhas atingidas")
+    p_lote.add_argument('--lote', type=int, default=app.TAMANHO_LOTE_EDICAO, help="linhas por transação")
+    p_lote.set_defaults(func=cmd_lote)
+
+    p_snap = sub.add_parser('snapshot', help="salva/restaura um retrato nomeado de todas as tabelas (testes e demos)")
+    p_snap.add_argument('acao', choices=['salvar', 'restaurar', 'conferir', 'listar', 'apagar'])
+    p_snap.add_argument('nome', nargs='?')
+    p_snap.add_argument('--pasta', default=snapshots.PASTA_SNAPSHOTS)
+    p_snap.add_argument('--sobrescrever', action='store_true', help="substitui um snapshot existente com o mesmo nome")
+    p_snap.add_argument('--conferir', action='store_true', help="após restaurar, compara linha a linha banco x snapshot")
+    p_snap.add_argument('--lote', type=int, default=snapshots.TAMANHO_LOTE_SNAPSHOT, help="linhas por bloco de leitura/carga")
+    p_snap.set_defaults(func=cmd_snapshot)
+
+    args = parser.parse_args()
+    app.CURRENT_USER = args.usuario
+    app.CURRENT_PASSWORD = app.senha_linha_de_comando(args.senha)
+
+    conn = app.get_db_connection()
+    if not conn:
+        raise SystemExit(1)
+    try:
+        resultado = args.func(conn, args)
+    finally:
+        conn.close()
+        app.fechar_pools()
+
+    if resultado is not None:
+        print(json.dumps(resultado, indent=2, ensure_ascii=False, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+-- 0001: pacote de índices para as consultas quentes do módulo Python e das rotinas armazenadas.
+-- Índices que já existirem (ER_DUP_KEYNAME) são ignorados pelo migrador.
+
+-- consultar_vendas / buscar_vendas: top-N por data e filtro por cliente;
+-- trg_cliente_especial e ReconciliarTotaisClientes (venda por id_cliente)
+CREATE INDEX idx_venda_data_hora ON venda (data_venda, hora_venda, id);
+CREATE INDEX idx_venda_cliente_data ON venda (id_cliente, data_venda, hora_venda, id);
+
+-- Soma_fretes / relatorio_fretes
+CREATE INDEX idx_venda_destino ON venda (destino_chave);
+CREATE INDEX idx_transporte_venda ON transporte (id_venda);
+
+-- Reajuste (UPDATE vendedor ... WHERE tipo = ?)
+CREATE INDEX idx_vendedor_tipo ON vendedor (tipo);
+
+-- consultas de estoque baixo / reposição
+CREATE INDEX idx_produto_estoque ON produto (quantidade_estoque);
+
+-- v_*/AtualizarResumos, EstatisticasCompletas, EstatisticasRanqueadas e Arrecadado:
+-- agregações de venda_produto por produto lidas só do índice
+CREATE INDEX idx_vp_produto_cobertura ON venda_produto (id_produto, id_venda, qtd, valor);
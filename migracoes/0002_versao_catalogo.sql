@@ -0,0 +1,41 @@
+-- 0002: contador de versão por tabela para invalidar caches de catálogo na aplicação.
+-- Os triggers só incrementam quando muda algo que o cache guarda (nome, valor, vendedor);
+-- a baixa de estoque de cada venda não mexe na versão.
+
+CREATE TABLE tabela_versao (
+    tabela VARCHAR(64) PRIMARY KEY,
+    versao BIGINT NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT IGNORE INTO tabela_versao (tabela, versao) VALUES ('produto', 0);
+
+DELIMITER $$
+
+CREATE TRIGGER trg_produto_versao_ins
+AFTER INSERT ON produto
+FOR EACH ROW
+BEGIN
+    UPDATE tabela_versao SET versao = versao + 1 WHERE tabela = 'produto';
+END$$
+
+CREATE TRIGGER trg_produto_versao_upd
+AFTER UPDATE ON produto
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.nome <=> NEW.nome AND OLD.valor <=> NEW.valor AND OLD.id_vendedor <=> NEW.id_vendedor) THEN
+        UPDATE tabela_versao SET versao = versao + 1 WHERE tabela = 'produto';
+    END IF;
+END$$
+
+CREATE TRIGGER trg_produto_versao_del
+AFTER DELETE ON produto
+FOR EACH ROW
+BEGIN
+    UPDATE tabela_versao SET versao = versao + 1 WHERE tabela = 'produto';
+END$$
+
+DELIMITER ;
+
+GRANT SELECT ON ecommerce.tabela_versao TO 'role_gerente';
+GRANT SELECT ON ecommerce.tabela_versao TO 'role_funcionario';
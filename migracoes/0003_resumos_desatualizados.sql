@@ -0,0 +1,109 @@
+-- 0003: resumos materializados (mv_*) marcados como desatualizados quando itens já
+-- resumidos são editados ou apagados. AtualizarResumos passa a gravar a marca d'água com
+-- INSERT ... ON DUPLICATE KEY UPDATE, recusa o modo incremental sem marca d'água e vira
+-- reconstrução completa quando resumo_refresh.precisa_completo estiver marcado.
+
+ALTER TABLE resumo_refresh ADD COLUMN precisa_completo BOOLEAN NOT NULL DEFAULT FALSE AFTER modo;
+
+-- linhas de marca d'água perdidas (ex.: TRUNCATE antigo do menu de limpeza) voltam pedindo reconstrução
+INSERT IGNORE INTO resumo_refresh (resumo, precisa_completo)
+VALUES ('mv_produto_vendas_totais', TRUE), ('mv_vendas_mensais_produto', TRUE);
+
+DROP PROCEDURE IF EXISTS AtualizarResumos;
+
+DELIMITER $$
+
+CREATE PROCEDURE AtualizarResumos(IN p_completo BOOLEAN)
+BEGIN
+    DECLARE v_de INT DEFAULT NULL;
+    DECLARE v_ate INT;
+    DECLARE v_linhas BIGINT DEFAULT 0;
+    DECLARE v_precisa_completo BOOLEAN DEFAULT FALSE;
+    DECLARE v_completo BOOLEAN DEFAULT p_completo;
+
+    SELECT IFNULL(MAX(id), 0) INTO v_ate FROM venda_produto;
+
+    IF NOT v_completo THEN
+        -- FOR UPDATE: duas atualizações incrementais simultâneas não aplicam a mesma faixa duas vezes
+        SELECT ultimo_id, precisa_completo INTO v_de, v_precisa_completo
+        FROM resumo_refresh WHERE resumo = 'mv_produto_vendas_totais' FOR UPDATE;
+        IF v_de IS NULL THEN
+            -- sem marca d'água não há como saber o que já foi somado: somar tudo de novo duplicaria os totais
+            SIGNAL SQLSTATE '45000'
+                SET MESSAGE_TEXT = 'resumo_refresh sem marca d''agua: rode AtualizarResumos(TRUE)';
+        END IF;
+        -- itens já resumidos foram editados/apagados: o incremental não enxerga isso
+        SET v_completo = v_precisa_completo;
+    END IF;
+
+    IF v_completo THEN
+        SET v_de = 0;
+        DELETE FROM mv_produto_vendas_totais;
+        DELETE FROM mv_vendas_mensais_produto;
+    END IF;
+
+    IF v_ate > v_de THEN
+        INSERT INTO mv_produto_vendas_totais (produto_id, total_qtd_vendida, total_ganho)
+        SELECT vp.id_produto, SUM(vp.qtd), SUM(vp.valor)
+        FROM venda_produto vp
+        WHERE vp.id > v_de AND vp.id <= v_ate AND vp.id_produto IS NOT NULL
+        GROUP BY vp.id_produto
+        ON DUPLICATE KEY UPDATE
+            total_qtd_vendida = total_qtd_vendida + VALUES(total_qtd_vendida),
+            total_ganho = total_ganho + VALUES(total_ganho);
+
+        INSERT INTO mv_vendas_mensais_produto (produto_id, ano, mes, qtd_vendida_no_mes, ganho_no_mes)
+        SELECT vp.id_produto, IFNULL(YEAR(v.data_venda), 0), IFNULL(MONTH(v.data_venda), 0), SUM(vp.qtd), SUM(vp.valor)
+        FROM venda_produto vp
+        JOIN venda v ON v.id = vp.id_venda
+        WHERE vp.id > v_de AND vp.id <= v_ate AND vp.id_produto IS NOT NULL
+        GROUP BY vp.id_produto, IFNULL(YEAR(v.data_venda), 0), IFNULL(MONTH(v.data_venda), 0)
+        ON DUPLICATE KEY UPDATE
+            qtd_vendida_no_mes = qtd_vendida_no_mes + VALUES(qtd_vendida_no_mes),
+            ganho_no_mes = ganho_no_mes + VALUES(ganho_no_mes);
+
+        SELECT COUNT(*) INTO v_linhas FROM venda_produto WHERE id > v_de AND id <= v_ate;
+    END IF;
+
+    -- a linha da marca d'água é criada se faltar (ex.: após TRUNCATE), nunca ignorada em silêncio
+    INSERT INTO resumo_refresh (resumo, ultimo_id, linhas_aplicadas, modo, precisa_completo)
+    VALUES ('mv_produto_vendas_totais', GREATEST(v_de, v_ate), v_linhas, IF(v_completo, 'completo', 'incremental'), FALSE),
+           ('mv_vendas_mensais_produto', GREATEST(v_de, v_ate), v_linhas, IF(v_completo, 'completo', 'incremental'), FALSE)
+    ON DUPLICATE KEY UPDATE
+        ultimo_id = VALUES(ultimo_id),
+        linhas_aplicadas = VALUES(linhas_aplicadas),
+        modo = VALUES(modo),
+        precisa_completo = FALSE;
+
+    SELECT IF(v_completo, 'completo', 'incremental') AS modo,
+           v_de AS de_id, v_ate AS ate_id, v_linhas AS linhas_aplicadas,
+           v_completo AND NOT p_completo AS promovida_a_completa;
+END$$
+
+CREATE TRIGGER trg_vp_resumos_upd
+AFTER UPDATE ON venda_produto
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.id <=> NEW.id AND OLD.id_venda <=> NEW.id_venda AND OLD.id_produto <=> NEW.id_produto
+            AND OLD.qtd <=> NEW.qtd AND OLD.valor <=> NEW.valor) THEN
+        UPDATE resumo_refresh SET precisa_completo = TRUE WHERE OLD.id <= ultimo_id AND NOT precisa_completo;
+    END IF;
+END$$
+
+CREATE TRIGGER trg_vp_resumos_del
+AFTER DELETE ON venda_produto
+FOR EACH ROW
+BEGIN
+    UPDATE resumo_refresh SET precisa_completo = TRUE WHERE OLD.id <= ultimo_id AND NOT precisa_completo;
+END$$
+
+CREATE TRIGGER trg_venda_resumos_upd
+AFTER UPDATE ON venda
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.id <=> NEW.id AND OLD.data_venda <=> NEW.data_venda) THEN
+        UPDATE resumo_refresh SET precisa_completo = TRUE WHERE NOT precisa_completo;
+    END IF;
+END$$
+
+DELIMITER ;
@@ -0,0 +1,226 @@
+"""Migrações de esquema versionadas e o assistente de índices (EXPLAIN das consultas quentes).
+
+As migrações são arquivos numerados em migracoes/ (ex.: 0001_indices_desempenho.sql).
+Cada versão aplicada fica registrada em schema_migracoes e não roda de novo;
+dentro de um arquivo, tabelas, colunas, índices, triggers, procedures e funções que já existem são ignorados,
+então reaplicar sobre um banco criado pelo Codigoecommerce.sql atual é seguro.
+Triggers e procedures usam DELIMITER como no Codigoecommerce.sql.
+"""
+import os
+import re
+import time
+
+import mysql.connector
+
+PASTA_MIGRACOES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migracoes')
+
+# Erros tratados como "já aplicado" dentro de uma migração
+ERROS_IDEMPOTENTES = {
+    1050,  # ER_TABLE_EXISTS_ERROR: tabela já existe
+    1060,  # ER_DUP_FIELDNAME: coluna já existe
+    1061,  # ER_DUP_KEYNAME: índice já existe
+    1304,  # ER_SP_ALREADY_EXISTS: procedure/função já existe
+    1359,  # ER_TRG_ALREADY_EXISTS: trigger já existe
+}
+
+
+def listar_migracoes(pasta=PASTA_MIGRACOES):
+    """Retorna [(versao, nome, caminho), ...] ordenado pela versão do prefixo numérico."""
+    migracoes = []
+    for arquivo in os.listdir(pasta):
+        m = re.match(r'^(\d+)_(.+)\.sql$', arquivo)
+        if m:
+            migracoes.append((int(m.group(1)), m.group(2), os.path.join(pasta, arquivo)))
+    return sorted(migracoes)
+
+
+def separar_comandos(texto):
+    """Divide um arquivo .sql em comandos, respeitando DELIMITER (triggers/procedures) e ignorando comentários '--'."""
+    comandos = []
+    delimitador = ';'
+    atual = []
+    for linha in texto.splitlines():
+        limpa = linha.strip()
+        if not atual and (not limpa or limpa.startswith('--')):
+            continue
+        if limpa.upper().startswith('DELIMITER '):
+            delimitador = limpa.split(None, 1)[1]
+            continue
+        atual.append(linha)
+        if limpa.endswith(delimitador):
+            comando = '\n'.join(atual).strip()[:-len(delimitador)].strip()
+            if comando:
+                comandos.append(comando)
+            atual = []
+    if '\n'.join(atual).strip():
+        comandos.append('\n'.join(atual).strip())
+    return comandos
+
+
+def versoes_aplicadas(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migracoes (
+                versao INT PRIMARY KEY,
+                nome VARCHAR(100) NOT NULL,
+                aplicada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                duracao_s DECIMAL(10,3)
+            )
+        """)
+        cursor.execute("SELECT versao FROM schema_migracoes")
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def aplicar_migracoes(conn, pasta=PASTA_MIGRACOES, ate=None):
+    """Aplica, em ordem, as migrações ainda não registradas. Retorna as versões aplicadas.
+
+    DDL faz commit implícito no MySQL, então cada comando vale por si; a versão
+    só é registrada quando todos os comandos do arquivo deram certo.
+    """
+    aplicadas = versoes_aplicadas(conn)
+    novas = []
+    cursor = conn.cursor()
+    try:
+        for versao, nome, caminho in listar_migracoes(pasta):
+            if versao in aplicadas or (ate is not None and versao > ate):
+                continue
+            with open(caminho, encoding='utf-8') as f:
+                comandos = separar_comandos(f.read())
+
+            print(f"> Aplicando migração {versao:04d}_{nome} ({len(comandos)} comando(s))...")
+            inicio = time.perf_counter()
+            for comando in comandos:
+                try:
+                    cursor.execute(comando)
+                except mysql.connector.Error as err:
+                    if err.errno not in ERROS_IDEMPOTENTES:
+                        raise
+                    print(f"  [INFO] Já existia, ignorado: {err.msg}")
+            duracao = time.perf_counter() - inicio
+
+            cursor.execute(
+                "INSERT INTO schema_migracoes (versao, nome, duracao_s) VALUES (%s, %s, %s)",
+                (versao, nome, round(duracao, 3))
+            )
+            conn.commit()
+            novas.append(versao)
+            print(f"  [OK] {duracao:.2f}s")
+    finally:
+        cursor.close()
+
+    if not novas:
+        print("[INFO] O esquema já está na versão mais recente.")
+    return novas
+
+
+# Consultas emitidas pelo módulo Python e equivalentes dos SELECTs das rotinas
+# armazenadas, com parâmetros de exemplo, para o EXPLAIN do assistente de índices.
+CONSULTAS_QUENTES = [
+    ("buscar_vendas (últimas N)",
+     "SELECT v.id, v.data_venda, v.hora_venda, v.valor, c.nome FROM venda v JOIN cliente c ON v.id_cliente = c.id "
+     "ORDER BY v.data_venda DESC, v.hora_venda DESC, v.id DESC LIMIT 10", ()),
+    ("buscar_vendas (por cliente)",
+     "SELECT v.id, v.data_venda, v.hora_venda, v.valor FROM venda v WHERE v.id_cliente = %s "
+     "ORDER BY v.data_venda DESC, v.hora_venda DESC, v.id DESC LIMIT 10", (1,)),
+    ("buscar_vendas (página mais antiga, antes_de)",
+     "SELECT v.id, v.data_venda, v.hora_venda, v.valor, c.nome FROM venda v JOIN cliente c ON v.id_cliente = c.id "
+     "WHERE v.data_venda <= %s AND (v.data_venda, v.hora_venda, v.id) < (%s, %s, %s) "
+     "ORDER BY v.data_venda DESC, v.hora_venda DESC, v.id DESC LIMIT 10",
+     ('2025-01-31', '2025-01-31', '12:00:00', 1000)),
+    ("buscar_vendas (página mais recente, depois_de)",
+     "SELECT v.id, v.data_venda, v.hora_venda, v.valor, c.nome FROM venda v JOIN cliente c ON v.id_cliente = c.id "
+     "WHERE v.data_venda >= %s AND (v.data_venda, v.hora_venda, v.id) > (%s, %s, %s) "
+     "ORDER BY v.data_venda, v.hora_venda, v.id LIMIT 10",
+     ('2025-01-01', '2025-01-01', '12:00:00', 1)),
+    ("buscar_vendas (por cliente, antes_de)",
+     "SELECT v.id, v.data_venda, v.hora_venda, v.valor FROM venda v "
+     "WHERE v.id_cliente = %s AND v.data_venda <= %s AND (v.data_venda, v.hora_venda, v.id) < (%s, %s, %s) "
+     "ORDER BY v.data_venda DESC, v.hora_venda DESC, v.id DESC LIMIT 10",
+     (1, '2025-01-31', '2025-01-31', '12:00:00', 1000)),
+    ("buscar_vendas (itens da página)",
+     "SELECT vp.id_venda, p.nome, vp.qtd FROM venda_produto vp JOIN produto p ON vp.id_produto = p.id "
+     "WHERE vp.id_venda IN (%s, %s, %s) ORDER BY vp.id", (1, 2, 3)),
+    ("CacheProdutos (faltas no cache)",
+     "SELECT id, nome, valor, id_vendedor FROM produto WHERE id IN (%s, %s)", (1, 2)),
+    ("finalizar_carrinho (baixa condicional de estoque)",
+     "UPDATE produto SET quantidade_estoque = quantidade_estoque - CASE id WHEN %s THEN %s WHEN %s THEN %s END "
+     "WHERE id IN (%s, %s) AND quantidade_estoque >= CASE id WHEN %s THEN %s WHEN %s THEN %s END",
+     (1, 1, 2, 1, 1, 2, 1, 1, 2, 1)),
+    ("buscar_pagina (keyset)",
+     "SELECT * FROM venda_produto WHERE id > %s ORDER BY id LIMIT 20", (0,)),
+    ("Soma_fretes / relatorio_fretes",
+     "SELECT SUM(t.valor) FROM transporte t JOIN venda v ON v.id = t.id_venda WHERE v.destino_chave = %s",
+     ('recife',)),
+    ("Arrecadado",
+     "SELECT SUM(r.total) FROM receita_diaria_vendedor r WHERE r.data_venda = %s AND r.id_vendedor = %s",
+     ('2025-01-01', 1)),
+    ("matriz_receita",
+     "SELECT data_venda, id_vendedor, total FROM receita_diaria_vendedor "
+     "WHERE data_venda BETWEEN %s AND %s ORDER BY data_venda, id_vendedor", ('2025-01-01', '2025-01-31')),
+    ("Reajuste",
+     "SELECT id FROM vendedor WHERE tipo = %s", ('vendedor',)),
+    ("Sorteio (sorteio por id)",
+     "SELECT id FROM cliente WHERE id = %s", (1,)),
+    ("trg_cliente_especial / cliente_totais",
+     "SELECT total_gasto FROM cliente_totais WHERE id_cliente = %s", (1,)),
+    ("EstatisticasCompletas (mês do produto)",
+     "SELECT YEAR(venda.data_venda), MONTH(venda.data_venda), SUM(vp.qtd), SUM(vp.valor) "
+     "FROM venda_produto vp JOIN venda ON venda.id = vp.id_venda WHERE vp.id_produto = %s "
+     "GROUP BY YEAR(venda.data_venda), MONTH(venda.data_venda)", (1,)),
+    ("AtualizarResumos (incremental)",
+     "SELECT vp.id_produto, SUM(vp.qtd), SUM(vp.valor) FROM venda_produto vp "
+     "WHERE vp.id > %s AND vp.id <= %s GROUP BY vp.id_produto", (0, 1000)),
+    ("v_produto_vendas_totais",
+     "SELECT * FROM v_produto_vendas_totais", ()),
+    ("v_cliente_compras_e_status",
+     "SELECT * FROM v_cliente_compras_e_status WHERE is_cliente_especial = 1", ()),
+    ("v_vendas_mensais_produto",
+     "SELECT * FROM v_vendas_mensais_produto WHERE produto_id = %s", (1,)),
+    ("estoque baixo",
+     "SELECT id, nome, quantidade_estoque FROM produto WHERE quantidade_estoque < %s", (10,)),
+]
+
+
+def analisar_indices(conn, consultas=CONSULTAS_QUENTES, linhas_minimas=1000):
+    """Roda EXPLAIN em cada consulta quente e aponta varreduras completas e filesorts.
+
+    Varredura completa (type = ALL) só é apontada acima de `linhas_minimas`
+    linhas estimadas, para não acusar tabelas pequenas. Retorna uma lista de
+    {'consulta', 'tabela', 'tipo', 'indice', 'linhas', 'extra', 'alertas'}.
+    """
+    relatorio = []
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for nome, sql, params in consultas:
+            try:
+                cursor.execute("EXPLAIN " + sql, params)
+                plano = cursor.fetchall()
+            except mysql.connector.Error as err:
+                relatorio.append({'consulta': nome, 'tabela': '-', 'tipo': '-', 'indice': '-',
+                                  'linhas': 0, 'extra': '', 'alertas': [f"erro: {err.msg}"]})
+                continue
+            for passo in plano:
+                extra = passo.get('Extra') or ''
+                linhas = int(passo.get('rows') or 0)
+                alertas = []
+                if passo.get('type') == 'ALL' and linhas >= linhas_minimas:
+                    alertas.append('varredura completa')
+                if 'filesort' in extra:
+                    alertas.append('filesort')
+                if 'temporary' in extra:
+                    alertas.append('tabela temporária')
+                relatorio.append({
+                    'consulta': nome,
+                    'tabela': passo.get('table'),
+                    'tipo': passo.get('type'),
+                    'indice': passo.get('key'),
+                    'linhas': linhas,
+                    'extra': extra,
+                    'alertas': alertas,
+                })
+    finally:
+        cursor.close()
+    return relatorio
@@ -0,0 +1,291 @@
+"""Serviço HTTP assíncrono de checkout para vários terminais de venda ao mesmo tempo.
+
+Um único processo asyncio aceita as requisições e repassa o trabalho de banco para
+um executor com o mesmo número de threads que o pool de conexões, então nenhuma
+requisição espera por conexão dentro de uma thread: o excesso fica na fila do
+asyncio. As regras de negócio são as do sistema: finalizar_carrinho() para a
+venda, buscar_vendas() para o histórico.
+
+Rotas (JSON):
+    POST /checkout     {"id_cliente": 1, "endereco": "Recife", "id_transportadora": 2,
+                        "itens": [{"id_produto": 3, "qtd": 2}, ...]}
+    GET  /estoque?ids=1,2,3
+    GET  /vendas?limite=10&id_cliente=1&antes_de=2025-01-31,12:00:00,42
+    GET  /metricas     latência por rota (p50/p95/p99), estado do pool e do cache de produtos
+    GET  /metrics      métricas SQL no formato do Prometheus (com ECOMMERCE_METRICAS=1)
+
+Exemplo:
+    python servico_checkout.py --porta 8080 --conexoes 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+
+import mysql.connector
+
+import codigopythonecommerce as app
+import instrumentacao
+
+MAX_CORPO = 1024 * 1024
+LIMITE_VENDAS = 100
+AMOSTRAS_POR_ROTA = 10000
+
+STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+          409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class ErroRequisicao(Exception):
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+# --- Operações (rodam nas threads do executor, cada uma com sua conexão do pool) ---
+
+def com_conexao_do_pool(acao, *args):
+    conn = app.get_db_connection()
+    if not conn:
+        raise ErroRequisicao(503, "Sem conexão com o banco.")
+    try:
+        return acao(conn, *args)
+    finally:
+        conn.close()
+
+
+def checkout(conn, pedido):
+    try:
+        itens = [(int(item['id_produto']), int(item['qtd'])) for item in pedido.get('itens') or []]
+        id_cliente = int(pedido['id_cliente'])
+        id_transportadora = int(pedido['id_transportadora']) if pedido.get('id_transportadora') else None
+    except (KeyError, TypeError, ValueError):
+        raise ErroRequisicao(400, "Informe id_cliente e itens [{id_produto, qtd}] válidos.")
+    try:
+        id_venda, total = app.finalizar_carrinho(conn, id_cliente, pedido.get('endereco'), id_transportadora, itens)
+    except ValueError as err:
+        raise ErroRequisicao(409, str(err))
+    return {'id_venda': id_venda, 'total': total}
+
+
+def consultar_estoque(conn, ids):
+    if not ids:
+        raise ErroRequisicao(400, "Informe ?ids=1,2,3.")
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            f"SELECT id, nome, valor, quantidade_estoque FROM produto WHERE id IN ({', '.join(['%s'] * len(ids))})",
+            ids
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def filtros_vendas(consulta):
+    """Valida a query string de /vendas e monta os argumentos de buscar_vendas().
+
+    Datas e horas são conferidas aqui (AAAA-MM-DD e HH:MM:SS) para que um valor
+    inválido volte como 400 em vez de chegar ao banco.
+    """
+    filtros = {}
+    try:
+        if 'limite' in consulta:
+            filtros['limite'] = int(consulta['limite'][0])
+            if filtros['limite'] < 1:
+                raise ValueError
+            filtros['limite'] = min(filtros['limite'], LIMITE_VENDAS)
+        if 'id_cliente' in consulta:
+            filtros['id_cliente'] = int(consulta['id_cliente'][0])
+        for campo in ('data_inicio', 'data_fim'):
+            if campo in consulta:
+                filtros[campo] = datetime.strptime(consulta[campo][0], '%Y-%m-%d').date()
+        for campo in ('antes_de', 'depois_de'):
+            if campo in consulta:
+                data_venda, hora_venda, id_venda = consulta[campo][0].split(',')
+                filtros[campo] = (datetime.strptime(data_venda, '%Y-%m-%d').date(),
+                                  datetime.strptime(hora_venda, '%H:%M:%S').time(), int(id_venda))
+    except ValueError:
+        raise ErroRequisicao(400, f"Filtros inválidos: limite 1..{LIMITE_VENDAS}, datas AAAA-MM-DD, "
+                                  f"antes_de/depois_de AAAA-MM-DD,HH:MM:SS,id.")
+    return filtros
+
+
+def historico_vendas(conn, filtros):
+    return app.buscar_vendas(conn, **filtros)
+
+
+# --- HTTP ---
+
+class ServicoCheckout:
+    def __init__(self, conexoes):
+        self.executor = ThreadPoolExecutor(max_workers=conexoes, thread_name_prefix='checkout')
+        self.latencias = {}
+        self.contagens = {}
+        self.em_andamento = 0
+
+    async def executar(self, acao, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, com_conexao_do_pool, acao, *args)
+
+    def registrar_latencia(self, rota, status, segundos):
+        self.latencias.setdefault(rota, deque(maxlen=AMOSTRAS_POR_ROTA)).append(segundos)
+        chave = f"{rota} {status}"
+        self.contagens[chave] = self.contagens.get(chave, 0) + 1
+
+    def metricas(self):
+        rotas = {}
+        for rota, amostras in self.latencias.items():
+            ordenadas = sorted(amostras)
+
+            def p(percentual):
+                return round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * percentual / 100))] * 1000, 3)
+
+            rotas[rota] = {'amostras': len(ordenadas), 'p50_ms': p(50), 'p95_ms': p(95), 'p99_ms': p(99),
+                           'max_ms': round(ordenadas[-1] * 1000, 3)}
+        pools = {f"{usuario}": pool.resumo() for (usuario, _), pool in app.POOLS.items()}
+        return {'rotas': rotas, 'respostas': self.contagens, 'em_andamento': self.em_andamento, 'pools': pools,
+                'cache_produtos': app.CACHE_PRODUTOS.resumo()}
+
+    async def rotear(self, metodo, caminho, consulta, corpo):
+        if caminho == '/checkout':
+            if metodo != 'POST':
+                raise ErroRequisicao(405, "Use POST.")
+            try:
+                pedido = json.loads(corpo or b'{}')
+            except json.JSONDecodeError:
+                raise ErroRequisicao(400, "Corpo JSON inválido.")
+            if not isinstance(pedido, dict):
+                raise ErroRequisicao(400, "O pedido deve ser um objeto JSON.")
+            return await self.executar(checkout, pedido)
+
+        if metodo != 'GET':
+            raise ErroRequisicao(405, "Use GET.")
+        if caminho == '/estoque':
+            try:
+                ids = [int(i) for i in ','.join(consulta.get('ids', [])).split(',') if i.strip()]
+            except ValueError:
+                raise ErroRequisicao(400, "ids deve ser uma lista de números.")
+            return await self.executar(consultar_estoque, ids)
+        if caminho == '/vendas':
+            return await self.executar(historico_vendas, filtros_vendas(consulta))
+        if caminho == '/metricas':
+            return self.metricas()
+        raise ErroRequisicao(404, f"Rota {caminho} não existe.")
+
+    async def atender(self, reader, writer):
+        """Atende uma conexão de terminal (HTTP/1.1 com keep-alive)."""
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+                try:
+                    metodo, alvo, _ = linha.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    break
+                cabecalhos = {}
+                while True:
+                    cabecalho = await reader.readline()
+                    if cabecalho in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = cabecalho.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+
+                manter = cabecalhos.get('connection', '').lower() != 'close'
+                url = urlsplit(alvo)
+                inicio = time.perf_counter()
+                self.em_andamento += 1
+                corpo = None
+                try:
+                    try:
+                        tamanho = int(cabecalhos.get('content-length') or 0)
+                    except ValueError:
+                        raise ErroRequisicao(400, "Content-Length inválido.")
+                    if tamanho < 0:
+                        raise ErroRequisicao(400, "Content-Length inválido.")
+                    if tamanho > MAX_CORPO:
+                        raise ErroRequisicao(413, "Corpo grande demais.")
+                    corpo = await reader.readexactly(tamanho) if tamanho else b''
+                    if url.path == '/metrics':
+                        status, conteudo, tipo = 200, instrumentacao.exportar_prometheus().encode('utf-8'), 'text/plain; version=0.0.4'
+                    else:
+                        resultado = await self.rotear(metodo, url.path, parse_qs(url.query), corpo)
+                        status, conteudo, tipo = 200, json.dumps(resultado, ensure_ascii=False, default=str).encode('utf-8'), 'application/json'
+                except ErroRequisicao as err:
+                    status, conteudo, tipo = err.status, json.dumps({'erro': str(err)}, ensure_ascii=False).encode('utf-8'), 'application/json'
+                except mysql.connector.Error as err:
+                    status, conteudo, tipo = 503, json.dumps({'erro': f"Erro no banco: {err.msg}"}, ensure_ascii=False).encode('utf-8'), 'application/json'
+                except Exception as err:
+                    status, conteudo, tipo = 500, json.dumps({'erro': str(err)}, ensure_ascii=False).encode('utf-8'), 'application/json'
+                finally:
+                    self.em_andamento -= 1
+                    if corpo is None:
+                        # o corpo não foi lido: não há como achar o início da próxima requisição
+                        manter = False
+                segundos = time.perf_counter() - inicio
+                self.registrar_latencia(url.path, status, segundos)
+
+                writer.write(
+                    f"HTTP/1.1 {status} {STATUS.get(status, '')}\r\n"
+                    f"Content-Type: {tipo}; charset=utf-8\r\n"
+                    f"Content-Length: {len(conteudo)}\r\n"
+                    f"X-Tempo-Ms: {segundos * 1000:.3f}\r\n"
+                    f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n".encode('latin-1') + conteudo
+                )
+                await writer.drain()
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def fechar(self):
+        self.executor.shutdown(wait=True)
+
+
+async def servir(host, porta, conexoes):
+    servico = ServicoCheckout(conexoes)
+    servidor = await asyncio.start_server(servico.atender, host, porta, backlog=1024)
+    print(f"[INFO] Checkout em http://{host}:{porta} ({conexoes} conexões com o banco). Ctrl+C para parar.")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        servico.fechar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço HTTP assíncrono de checkout")
+    parser.add_argument('--usuario', default=os.environ.get('ECOMMERCE_USER', 'funcionario'))
+    parser.add_argument('--senha', default=os.environ.get('ECOMMERCE_PASSWORD'),
+                        help="padrão: $ECOMMERCE_PASSWORD; sem ela, a senha é pedida no terminal")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8080)
+    parser.add_argument('--conexoes', type=int, default=app.DB_POOL_SIZE, help="tamanho do pool e do executor")
+    args = parser.parse_args()
+
+    app.CURRENT_USER = args.usuario
+    app.CURRENT_PASSWORD = app.senha_linha_de_comando(args.senha)
+    app.DB_POOL_SIZE = args.conexoes
+
+    conn = app.get_db_connection()
+    if not conn:
+        raise SystemExit(1)
+    conn.close()
+    instrumentacao.iniciar_servidor_metricas()
+    try:
+        asyncio.run(servir(args.host, args.porta, args.conexoes))
+    except KeyboardInterrupt:
+        print("\n[INFO] Serviço encerrado.")
+    finally:
+        app.fechar_pools()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,374 @@
+"""Snapshots nomeados do banco para voltar a um estado conhecido (testes e demonstrações).
+
+Salvar: todas as tabelas são lidas dentro de uma única transação com
+CONSISTENT SNAPSHOT (o retrato é coerente mesmo com vendas acontecendo) e gravadas
+em snapshots/<nome>/<tabela>.jsonl.gz, uma linha JSON por registro, junto com um
+manifesto.json (colunas, linhas e bytes de cada tabela). Colunas geradas (ex.:
+venda.destino_chave) ficam de fora: o banco as recalcula na carga.
+
+Restaurar: TRUNCATE em todas as tabelas do snapshot e carga em blocos (INSERT
+multi-linha via executemany) com FOREIGN_KEY_CHECKS e UNIQUE_CHECKS desligados.
+Os índices secundários que não sustentam FK são removidos antes da carga e
+recriados depois, num único ALTER TABLE por tabela. As tabelas alimentadas por
+triggers (vendedor_totais, cliente_especial, log_bonus, ...) são carregadas por
+último, depois de zeradas de novo, para que o conteúdo delas seja o do snapshot
+e não o recalculado pelos triggers durante a carga de venda/venda_produto.
+"""
+import gzip
+import json
+import os
+import re
+import shutil
+import time
+from datetime import datetime
+
+import mysql.connector
+
+PASTA_SNAPSHOTS = os.environ.get('ECOMMERCE_SNAPSHOTS', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots'))
+MANIFESTO = 'manifesto.json'
+TAMANHO_LOTE_SNAPSHOT = 5000
+
+# Controle de migrações e contador de versão do cache não voltam no tempo com o snapshot
+TABELAS_IGNORADAS = {'schema_migracoes', 'tabela_versao'}
+
+_ESCRITA_EM_TRIGGER = re.compile(r"\b(?:INSERT\s+(?:IGNORE\s+)?INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)`?", re.IGNORECASE)
+
+
+def _texto(valor):
+    return valor.decode() if isinstance(valor, (bytes, bytearray)) else valor
+
+
+def _valor_json(valor):
+    # Decimal, date, datetime e TIME (timedelta) viram texto, que o MySQL converte de volta na carga
+    if isinstance(valor, (bytes, bytearray)):
+        return valor.decode('utf-8')
+    if isinstance(valor, (set, frozenset)):
+        return ','.join(sorted(valor))
+    return str(valor)
+
+
+def tabelas_do_banco(catalogo):
+    """Tabelas (sem views) que entram em snapshot e limpeza, pais antes de filhas."""
+    return catalogo.ordem_dependencias([n for n in catalogo.nomes(incluir_views=False) if n not in TABELAS_IGNORADAS])
+
+
+def limpar_tabelas(conn, nomes):
+    """TRUNCATE em todas as tabelas informadas, com as FKs desligadas durante a limpeza."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        for nome in nomes:
+            cursor.execute(f"TRUNCATE TABLE {nome}")
+    finally:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        cursor.close()
+
+
+def _sql_leitura(meta, colunas):
+    ordem = f" ORDER BY {', '.join(meta.chave)}" if meta.chave else ''
+    return f"SELECT {', '.join(colunas)} FROM {meta.nome}{ordem}"
+
+
+def _linha_json(row):
+    return json.dumps(row, ensure_ascii=False, separators=(',', ':'), default=_valor_json)
+
+
+def _pasta(nome, pasta):
+    if not re.fullmatch(r"[\w.-]+", nome) or nome.startswith('.'):
+        raise ValueError(f"Nome de snapshot inválido: '{nome}' (use letras, números, '.', '-' e '_').")
+    return os.path.join(pasta, nome)
+
+
+def ler_manifesto(nome, pasta=PASTA_SNAPSHOTS):
+    caminho = os.path.join(_pasta(nome, pasta), MANIFESTO)
+    if not os.path.exists(caminho):
+        raise ValueError(f"Snapshot '{nome}' não encontrado em {pasta}.")
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def listar_snapshots(pasta=PASTA_SNAPSHOTS):
+    snapshots = []
+    if not os.path.isdir(pasta):
+        return snapshots
+    for nome in sorted(os.listdir(pasta)):
+        if nome.startswith('.') or not os.path.exists(os.path.join(pasta, nome, MANIFESTO)):
+            continue
+        manifesto = ler_manifesto(nome, pasta)
+        snapshots.append({
+            'nome': nome,
+            'criado_em': manifesto['criado_em'],
+            'tabelas': len(manifesto['tabelas']),
+            'linhas': sum(t['linhas'] for t in manifesto['tabelas']),
+            'bytes': sum(t['bytes'] for t in manifesto['tabelas']),
+        })
+    return snapshots
+
+
+def apagar_snapshot(nome, pasta=PASTA_SNAPSHOTS):
+    ler_manifesto(nome, pasta)
+    shutil.rmtree(_pasta(nome, pasta))
+
+
+def salvar_snapshot(conn, catalogo, nome, pasta=PASTA_SNAPSHOTS, sobrescrever=False, tamanho_lote=TAMANHO_LOTE_SNAPSHOT):
+    """Grava o estado atual de todas as tabelas em snapshots/<nome>/. Retorna o manifesto."""
+    destino = _pasta(nome, pasta)
+    if os.path.exists(destino) and not sobrescrever:
+        raise ValueError(f"Snapshot '{nome}' já existe (use sobrescrever).")
+    temporaria = os.path.join(pasta, f".{nome}.tmp")
+    shutil.rmtree(temporaria, ignore_errors=True)
+    os.makedirs(temporaria)
+
+    inicio = time.perf_counter()
+    manifesto = {'nome': nome, 'criado_em': datetime.now().isoformat(timespec='seconds'), 'tabelas': []}
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT DATABASE()")
+        manifesto['banco'] = _texto(cursor.fetchone()[0])
+        conn.start_transaction(consistent_snapshot=True, isolation_level='REPEATABLE READ', readonly=True)
+        try:
+            for tabela in tabelas_do_banco(catalogo):
+                meta = catalogo.tabela(tabela)
+                colunas = [c['nome'] for c in meta.colunas if not c['gerada']]
+                arquivo = os.path.join(temporaria, f"{tabela}.jsonl.gz")
+                linhas = 0
+                # cursor sem buffer: a tabela vem do servidor em blocos, sem ficar inteira na memória
+                cursor.execute(_sql_leitura(meta, colunas))
+                with gzip.open(arquivo, 'wt', encoding='utf-8', compresslevel=6) as f:
+                    while True:
+                        bloco = cursor.fetchmany(tamanho_lote)
+                        if not bloco:
+                            break
+                        for row in bloco:
+                            f.write(_linha_json(row))
+                            f.write('\n')
+                        linhas += len(bloco)
+                manifesto['tabelas'].append({'nome': tabela, 'colunas': colunas, 'linhas': linhas,
+                                             'bytes': os.path.getsize(arquivo)})
+                print(f"> {tabela:<26} {linhas:>12,} linhas")
+        finally:
+            conn.rollback()
+
+        manifesto['segundos'] = round(time.perf_counter() - inicio, 3)
+        with open(os.path.join(temporaria, MANIFESTO), 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, indent=2, ensure_ascii=False)
+    except Exception:
+        shutil.rmtree(temporaria, ignore_errors=True)
+        raise
+    finally:
+        cursor.close()
+
+    # troca a pasta inteira de uma vez: um snapshot pela metade nunca fica com o nome final
+    if os.path.exists(destino):
+        shutil.rmtree(destino)
+    os.replace(temporaria, destino)
+    return manifesto
+
+
+def _tabelas_escritas_por_triggers(conn):
+    """{tabela do evento: tabelas que os triggers de INSERT dela escrevem} e o conjunto de todas as escritas."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT EVENT_OBJECT_TABLE, EVENT_MANIPULATION, ACTION_STATEMENT
+            FROM INFORMATION_SCHEMA.TRIGGERS WHERE TRIGGER_SCHEMA = DATABASE()
+        """)
+        triggers = [tuple(_texto(v) for v in row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+    por_insert = {}
+    alvos = set()
+    for tabela, evento, corpo in triggers:
+        escritas = {m.lower() for m in _ESCRITA_EM_TRIGGER.findall(corpo or '')}
+        alvos |= escritas
+        if evento == 'INSERT':
+            por_insert.setdefault(tabela, set()).update(escritas - {tabela})
+    return por_insert, alvos
+
+
+def _ordem_de_carga(catalogo, nomes, conn):
+    """Tabelas comuns na ordem das FKs; depois as alimentadas por triggers, cada uma antes das que ela alimenta."""
+    por_insert, alvos = _tabelas_escritas_por_triggers(conn)
+    comuns = [n for n in catalogo.ordem_dependencias(nomes) if n not in alvos]
+    restantes = [n for n in catalogo.ordem_dependencias(nomes) if n in alvos]
+    derivadas = []
+    while restantes:
+        prontas = [n for n in restantes
+                   if not any(n in por_insert.get(outra, ()) for outra in restantes if outra != n)] or restantes[:1]
+        for n in prontas:
+            derivadas.append(n)
+            restantes.remove(n)
+    return comuns, derivadas
+
+
+def _indices_adiaveis(conn, catalogo, tabela):
+    """Índices secundários (não únicos, B-tree) que não começam por coluna de FK: {nome: [colunas]}."""
+    colunas_fk = {fk['coluna'] for fk in catalogo.tabela(tabela).fks}
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT INDEX_NAME, NON_UNIQUE, INDEX_TYPE, SEQ_IN_INDEX, COLUMN_NAME, SUB_PART
+            FROM INFORMATION_SCHEMA.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME <> 'PRIMARY'
+            ORDER BY INDEX_NAME, SEQ_IN_INDEX
+        """, (tabela,))
+        linhas = [tuple(_texto(v) for v in row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+    indices = {}
+    descartados = set()
+    for nome, nao_unico, tipo, seq, coluna, sub_part in linhas:
+        if int(nao_unico) != 1 or tipo != 'BTREE' or coluna is None or (int(seq) == 1 and coluna in colunas_fk):
+            descartados.add(nome)
+            continue
+        indices.setdefault(nome, []).append(f"{coluna}({sub_part})" if sub_part else coluna)
+    return {nome: colunas for nome, colunas in indices.items() if nome not in descartados}
+
+
+def _carregar_tabela(conn, tabela, colunas, arquivo, tamanho_lote):
+    sql = f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join(['%s'] * len(colunas))})"
+    linhas = 0
+    cursor = conn.cursor()
+    try:
+        with gzip.open(arquivo, 'rt', encoding='utf-8') as f:
+            bloco = []
+            for linha in f:
+                bloco.append(json.loads(linha))
+                if len(bloco) >= tamanho_lote:
+                    conn.start_transaction()
+                    cursor.executemany(sql, bloco)
+                    conn.commit()
+                    linhas += len(bloco)
+                    bloco = []
+            if bloco:
+                conn.start_transaction()
+                cursor.executemany(sql, bloco)
+                conn.commit()
+                linhas += len(bloco)
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return linhas
+
+
+def restaurar_snapshot(conn, catalogo, nome, pasta=PASTA_SNAPSHOTS, tamanho_lote=TAMANHO_LOTE_SNAPSHOT):
+    """Substitui o conteúdo de todas as tabelas do snapshot pelo conteúdo salvo. Retorna os tempos da carga."""
+    manifesto = ler_manifesto(nome, pasta)
+    origem = _pasta(nome, pasta)
+    tabelas = {t['nome']: t for t in manifesto['tabelas']}
+    for tabela, dados in tabelas.items():
+        meta = catalogo.tabela(tabela)
+        if meta is None or meta.view:
+            raise ValueError(f"Tabela '{tabela}' do snapshot não existe mais no banco.")
+        faltando = [c for c in dados['colunas'] if meta.coluna(c) is None]
+        if faltando:
+            raise ValueError(f"Colunas do snapshot ausentes em '{tabela}': {', '.join(faltando)}.")
+        fora = [c['nome'] for c in meta.colunas if not c['gerada'] and c['nome'] not in dados['colunas']]
+        if fora:
+            print(f"[AVISO] {tabela}: {', '.join(fora)} não está(ão) no snapshot e receberá(ão) o valor padrão da coluna.")
+    for tabela in tabelas_do_banco(catalogo):
+        if tabela not in tabelas:
+            print(f"[AVISO] A tabela '{tabela}' não está no snapshot e foi mantida como está.")
+
+    inicio = time.perf_counter()
+    comuns, derivadas = _ordem_de_carga(catalogo, list(tabelas), conn)
+    relatorio = {'snapshot': nome, 'tabelas': {}, 'indices_s': 0.0}
+    adiados = {}
+    cursor = conn.cursor()
+    try:
+        limpar_tabelas(conn, comuns + derivadas)
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        cursor.execute("SET UNIQUE_CHECKS = 0")
+
+        for tabela in comuns + derivadas:
+            t0 = time.perf_counter()
+            if tabela in derivadas:
+                # descarta o que os triggers gravaram durante a carga das tabelas comuns
+                cursor.execute(f"TRUNCATE TABLE {tabela}")
+            indices = _indices_adiaveis(conn, catalogo, tabela)
+            if indices:
+                cursor.execute(f"ALTER TABLE {tabela} " + ', '.join(f"DROP INDEX {i}" for i in indices))
+                adiados[tabela] = indices
+            dados = tabelas[tabela]
+            linhas = _carregar_tabela(conn, tabela, dados['colunas'], os.path.join(origem, f"{tabela}.jsonl.gz"), tamanho_lote)
+            carga_s = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            if indices:
+                cursor.execute(f"ALTER TABLE {tabela} " + ', '.join(f"ADD INDEX {i} ({', '.join(c)})" for i, c in indices.items()))
+                del adiados[tabela]
+            indices_s = time.perf_counter() - t0
+            relatorio['indices_s'] += indices_s
+            relatorio['tabelas'][tabela] = {'linhas': linhas, 'carga_s': round(carga_s, 3), 'indices_s': round(indices_s, 3)}
+            if linhas != dados['linhas']:
+                print(f"[AVISO] {tabela}: {linhas} linhas carregadas, o manifesto indica {dados['linhas']}.")
+            taxa = linhas / carga_s if carga_s else 0.0
+            print(f"> {tabela:<26} {linhas:>12,} linhas em {carga_s:8.2f}s  ({taxa:,.0f} linhas/s)")
+    finally:
+        # nunca deixa uma tabela sem os índices, mesmo se a carga falhar no meio
+        for tabela, indices in adiados.items():
+            try:
+                cursor.execute(f"ALTER TABLE {tabela} " + ', '.join(f"ADD INDEX {i} ({', '.join(c)})" for i, c in indices.items()))
+            except mysql.connector.Error as err:
+                print(f"[ERRO SQL] Não foi possível recriar os índices de {tabela}: {err}")
+        cursor.execute("SET UNIQUE_CHECKS = 1")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+        cursor.close()
+
+    relatorio['indices_s'] = round(relatorio['indices_s'], 3)
+    relatorio['total_s'] = round(time.perf_counter() - inicio, 3)
+    return relatorio
+
+
+def conferir_snapshot(conn, catalogo, nome, pasta=PASTA_SNAPSHOTS, tamanho_lote=TAMANHO_LOTE_SNAPSHOT):
+    """Compara o banco atual com o snapshot, linha a linha na ordem da PK (use logo após restaurar).
+
+    Retorna {tabela: {...}} só das tabelas com diferença, indicando as colunas divergentes e,
+    em separado, as de data/hora (criado_em, atualizado_em, ...), que são as primeiras a sair
+    erradas quando uma coluna fica fora do dump e o banco preenche o DEFAULT na carga.
+    """
+    manifesto = ler_manifesto(nome, pasta)
+    origem = _pasta(nome, pasta)
+    divergencias = {}
+    cursor = conn.cursor()
+    try:
+        for dados in manifesto['tabelas']:
+            tabela, colunas = dados['nome'], dados['colunas']
+            meta = catalogo.tabela(tabela)
+            fora = [c['nome'] for c in meta.colunas if not c['gerada'] and c['nome'] not in colunas]
+            temporais = {c for c in colunas if meta.coluna(c) and meta.coluna(c)['tipo'].split('(')[0] in ('timestamp', 'datetime', 'date', 'time')}
+            diferentes = set()
+            linhas_banco = linhas_snapshot = linhas_divergentes = 0
+            cursor.execute(_sql_leitura(meta, colunas))
+            with gzip.open(os.path.join(origem, f"{tabela}.jsonl.gz"), 'rt', encoding='utf-8') as f:
+                while True:
+                    bloco = cursor.fetchmany(tamanho_lote)
+                    for row in bloco:
+                        linhas_banco += 1
+                        salva = f.readline()
+                        if not salva:
+                            continue
+                        linhas_snapshot += 1
+                        atual = json.loads(_linha_json(row))
+                        salva = json.loads(salva)
+                        if atual != salva:
+                            linhas_divergentes += 1
+                            diferentes.update(c for c, a, b in zip(colunas, atual, salva) if a != b)
+                    if not bloco:
+                        break
+                linhas_snapshot += sum(1 for _ in f)
+            if linhas_banco != linhas_snapshot or linhas_divergentes or fora:
+                divergencias[tabela] = {
+                    'linhas_banco': linhas_banco,
+                    'linhas_snapshot': linhas_snapshot,
+                    'linhas_divergentes': linhas_divergentes,
+                    'colunas': sorted(diferentes),
+                    'colunas_data_hora': sorted(diferentes & temporais),
+                    'colunas_fora_do_snapshot': fora,
+                }
+    finally:
+        cursor.close()
+    return divergencias
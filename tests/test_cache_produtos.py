@@ -0,0 +1,99 @@
+"""CacheProdutos: acertos, e esvaziamento quando o contador tabela_versao('produto') muda."""
+import mysql.connector
+
+from cache_produtos import ER_NO_SUCH_TABLE, CacheProdutos
+
+
+class CursorFalso:
+    def __init__(self, banco, dictionary=False):
+        self.banco = banco
+        self.dictionary = dictionary
+        self._linhas = []
+
+    def execute(self, sql, params=None):
+        self.banco.consultas.append(sql)
+        if 'tabela_versao' in sql:
+            if self.banco.versao is None:
+                raise mysql.connector.Error(msg="Table 'tabela_versao' doesn't exist", errno=ER_NO_SUCH_TABLE)
+            self._linhas = [(self.banco.versao,)]
+        else:
+            self._linhas = [dict(self.banco.produtos[i]) for i in params if i in self.banco.produtos]
+
+    def fetchone(self):
+        return self._linhas[0] if self._linhas else None
+
+    def fetchall(self):
+        return self._linhas
+
+    def close(self):
+        pass
+
+
+class BancoFalso:
+    def __init__(self, versao=1):
+        self.versao = versao
+        self.produtos = {1: {'id': 1, 'nome': 'Caneta', 'valor': 2, 'id_vendedor': 1},
+                         2: {'id': 2, 'nome': 'Caderno', 'valor': 15, 'id_vendedor': 1}}
+        self.consultas = []
+
+    def cursor(self, dictionary=False):
+        return CursorFalso(self, dictionary)
+
+    def consultas_produto(self):
+        return sum('FROM produto' in sql for sql in self.consultas)
+
+
+def test_segunda_leitura_vem_do_cache():
+    banco = BancoFalso()
+    cache = CacheProdutos(intervalo_versao=0)
+    assert cache.obter_varios(banco, [1, 2, 3]).keys() == {1, 2}
+    assert cache.obter(banco, 1)['nome'] == 'Caneta'
+    assert banco.consultas_produto() == 1
+    assert cache.resumo()['acertos'] == 1
+
+
+def test_mudanca_de_versao_esvazia_o_cache():
+    banco = BancoFalso(versao=1)
+    cache = CacheProdutos(intervalo_versao=0)
+    cache.obter(banco, 1)
+
+    banco.produtos[1]['valor'] = 3
+    banco.versao = 2
+    assert cache.obter(banco, 1)['valor'] == 3
+    assert banco.consultas_produto() == 2
+    assert cache.resumo()['invalidacoes'] == 1
+    assert cache.resumo()['versao'] == 2
+
+    # mesma versão: volta a acertar
+    cache.obter(banco, 1)
+    assert banco.consultas_produto() == 2
+
+
+def test_versao_so_e_conferida_a_cada_intervalo():
+    banco = BancoFalso(versao=1)
+    cache = CacheProdutos(intervalo_versao=3600)
+    cache.obter(banco, 1)
+    banco.versao = 2
+    cache.obter(banco, 1)
+    assert sum('tabela_versao' in sql for sql in banco.consultas) == 1
+    assert banco.consultas_produto() == 1
+
+
+def test_sem_tabela_de_versao_vale_so_o_ttl(capsys):
+    banco = BancoFalso(versao=None)
+    cache = CacheProdutos(intervalo_versao=0)
+    cache.obter(banco, 1)
+    cache.obter(banco, 1)
+    assert '[AVISO]' in capsys.readouterr().out
+    # a ausência é lembrada: a tabela não é consultada de novo
+    assert sum('tabela_versao' in sql for sql in banco.consultas) == 1
+    assert banco.consultas_produto() == 1
+
+
+def test_ttl_expirado_busca_de_novo():
+    banco = BancoFalso()
+    cache = CacheProdutos(ttl=0, intervalo_versao=0)
+    cache.obter(banco, 1)
+    cache.obter(banco, 1)
+    assert banco.consultas_produto() == 2
+    assert cache.resumo()['expirados'] == 1
@@ -0,0 +1,63 @@
+"""migrador.separar_comandos: divisão dos arquivos .sql em comandos, com DELIMITER."""
+import os
+
+import pytest
+
+import migrador
+from migrador import separar_comandos
+
+
+def test_comandos_simples_e_comentarios():
+    texto = """
+-- comentário antes do primeiro comando
+CREATE INDEX idx_a ON venda (data_venda);
+
+   -- outro comentário
+ALTER TABLE venda
+    ADD COLUMN x INT;
+"""
+    assert separar_comandos(texto) == [
+        "CREATE INDEX idx_a ON venda (data_venda)",
+        "ALTER TABLE venda\n    ADD COLUMN x INT",
+    ]
+
+
+def test_delimiter_mantem_ponto_e_virgula_do_corpo():
+    texto = """DROP TRIGGER IF EXISTS trg_a;
+DELIMITER $$
+CREATE TRIGGER trg_a AFTER INSERT ON venda FOR EACH ROW
+BEGIN
+    -- comentário dentro do corpo fica
+    UPDATE tabela_versao SET versao = versao + 1;
+    SET @x = 1;
+END$$
+DELIMITER ;
+SELECT 1;
+"""
+    comandos = separar_comandos(texto)
+    assert len(comandos) == 3
+    assert comandos[0] == "DROP TRIGGER IF EXISTS trg_a"
+    assert comandos[1].startswith("CREATE TRIGGER trg_a")
+    assert comandos[1].endswith("END")
+    assert "versao = versao + 1;" in comandos[1]
+    assert "-- comentário dentro do corpo fica" in comandos[1]
+    assert comandos[2] == "SELECT 1"
+
+
+def test_ultimo_comando_sem_delimitador():
+    assert separar_comandos("SELECT 1;\nSELECT 2") == ["SELECT 1", "SELECT 2"]
+
+
+def test_arquivo_vazio_ou_so_comentarios():
+    assert separar_comandos("") == []
+    assert separar_comandos("-- nada\n\n-- aqui\n") == []
+
+
+@pytest.mark.parametrize('arquivo', sorted(f for f in os.listdir(migrador.PASTA_MIGRACOES) if f.endswith('.sql')))
+def test_migracoes_do_repositorio(arquivo):
+    with open(os.path.join(migrador.PASTA_MIGRACOES, arquivo), encoding='utf-8') as f:
+        comandos = separar_comandos(f.read())
+    assert comandos
+    for comando in comandos:
+        assert not comando.upper().startswith('DELIMITER')
+        assert not comando.endswith(('$$', ';'))
@@ -0,0 +1,47 @@
+"""montar_filtro (edição/exclusão em lote): só colunas do catálogo e operadores da lista."""
+import pytest
+
+from catalogo import Tabela
+from codigopythonecommerce import montar_filtro
+
+
+def tabela(nome='venda', chave=('id',)):
+    meta = Tabela(nome, 'BASE TABLE')
+    for coluna in ('id', 'data_venda', 'valor', 'endereco', 'id_cliente'):
+        meta.colunas.append({'nome': coluna, 'tipo': 'varchar(100)', 'nulo': True, 'padrao': None,
+                             'auto_incremento': coluna == 'id', 'gerada': False})
+    meta.chave.extend(chave)
+    return meta
+
+
+def test_ids_faixa_e_predicado_combinados():
+    sql, params = montar_filtro(tabela(), ids=[1, 2], faixa=(10, 20), predicado=('valor', '>=', 100))
+    assert sql == "id IN (%s, %s) AND id BETWEEN %s AND %s AND valor >= %s"
+    assert params == [1, 2, 10, 20, 100]
+
+
+def test_operador_em_minusculas_e_is_null_sem_parametro():
+    assert montar_filtro(tabela(), predicado=('endereco', 'like', 'Rec%')) == ("endereco LIKE %s", ['Rec%'])
+    assert montar_filtro(tabela(), predicado=('endereco', 'is not null', None)) == ("endereco IS NOT NULL", [])
+
+
+@pytest.mark.parametrize('operador', ['IN', '= 1 OR 1 =', ';', 'BETWEEN', ''])
+def test_operador_fora_da_lista(operador):
+    with pytest.raises(ValueError, match="Operador inválido"):
+        montar_filtro(tabela(), predicado=('valor', operador, 1))
+
+
+@pytest.mark.parametrize('coluna', ['senha', 'valor; DROP TABLE venda', '1=1 OR valor'])
+def test_coluna_fora_do_catalogo(coluna):
+    with pytest.raises(ValueError, match="não existe em venda"):
+        montar_filtro(tabela(), predicado=(coluna, '=', 1))
+
+
+def test_sem_condicao():
+    with pytest.raises(ValueError, match="Informe ids"):
+        montar_filtro(tabela(), ids=[], faixa=None, predicado=None)
+
+
+def test_tabela_sem_chave_simples():
+    with pytest.raises(ValueError, match="chave primária simples"):
+        montar_filtro(tabela('venda_produto', chave=('id', 'id_cliente')), ids=[1])
@@ -0,0 +1,131 @@
+"""Parser HTTP e validação de filtros do servico_checkout, sem banco.
+
+As requisições aqui falham (ou são atendidas) antes de qualquer acesso ao pool.
+"""
+import asyncio
+import json
+
+import pytest
+
+import servico_checkout
+from servico_checkout import ErroRequisicao, ServicoCheckout, filtros_vendas
+
+
+class EscritorFalso:
+    def __init__(self):
+        self.dados = b''
+        self.fechado = False
+
+    def write(self, dados):
+        self.dados += dados
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.fechado = True
+
+
+def atender(bruto):
+    """Passa `bruto` inteiro ao serviço e retorna (respostas, escritor)."""
+    async def rodar():
+        reader = asyncio.StreamReader()
+        reader.feed_data(bruto)
+        reader.feed_eof()
+        escritor = EscritorFalso()
+        servico = ServicoCheckout(conexoes=1)
+        try:
+            await servico.atender(reader, escritor)
+        finally:
+            servico.fechar()
+        return escritor
+
+    escritor = asyncio.run(rodar())
+    respostas = []
+    resto = escritor.dados
+    while resto:
+        cabecalho, _, resto = resto.partition(b'\r\n\r\n')
+        linhas = cabecalho.decode('latin-1').split('\r\n')
+        cabecalhos = dict(linha.split(': ', 1) for linha in linhas[1:])
+        tamanho = int(cabecalhos['Content-Length'])
+        corpo, resto = resto[:tamanho], resto[tamanho:]
+        respostas.append((int(linhas[0].split(' ')[1]), cabecalhos, json.loads(corpo)))
+    return respostas, escritor
+
+
+def test_linha_de_requisicao_invalida_fecha_sem_resposta():
+    respostas, escritor = atender(b'lixo\r\n\r\n')
+    assert respostas == []
+    assert escritor.fechado
+
+
+@pytest.mark.parametrize('valor', [b'abc', b'-1', b'1.5'])
+def test_content_length_invalido_responde_400_e_fecha(valor):
+    respostas, escritor = atender(b'POST /checkout HTTP/1.1\r\nContent-Length: ' + valor + b'\r\n\r\n{}')
+    assert len(respostas) == 1
+    status, cabecalhos, corpo = respostas[0]
+    assert status == 400
+    assert 'Content-Length' in corpo['erro']
+    # o corpo não foi lido: a conexão não pode ser reaproveitada
+    assert cabecalhos['Connection'] == 'close'
+    assert escritor.fechado
+
+
+def test_corpo_grande_demais_responde_413():
+    tamanho = servico_checkout.MAX_CORPO + 1
+    respostas, _ = atender(f'POST /checkout HTTP/1.1\r\nContent-Length: {tamanho}\r\n\r\n'.encode())
+    assert [r[0] for r in respostas] == [413]
+    assert respostas[0][1]['Connection'] == 'close'
+
+
+def test_json_invalido_responde_400():
+    respostas, _ = atender(b'POST /checkout HTTP/1.1\r\nContent-Length: 5\r\nConnection: close\r\n\r\n{nao}')
+    assert respostas[0][0] == 400
+    assert respostas[0][2]['erro'] == "Corpo JSON inválido."
+
+
+def test_metodo_e_rota_invalidos():
+    respostas, _ = atender(b'GET /checkout HTTP/1.1\r\n\r\n'
+                           b'DELETE /estoque HTTP/1.1\r\n\r\n'
+                           b'GET /nada HTTP/1.1\r\nConnection: close\r\n\r\n')
+    assert [r[0] for r in respostas] == [405, 405, 404]
+
+
+def test_keep_alive_atende_requisicoes_em_sequencia():
+    respostas, escritor = atender(b'GET /nada HTTP/1.1\r\n\r\n'
+                                  b'GET /metricas HTTP/1.1\r\n\r\n')
+    assert [r[0] for r in respostas] == [404, 200]
+    assert respostas[0][1]['Connection'] == 'keep-alive'
+    assert respostas[1][2]['rotas']['/nada']['amostras'] == 1
+    assert escritor.fechado
+
+
+def test_vendas_com_filtro_invalido_responde_400_sem_banco():
+    respostas, _ = atender(b'GET /vendas?limite=0 HTTP/1.1\r\n\r\n'
+                           b'GET /vendas?data_inicio=2025-02-30 HTTP/1.1\r\n\r\n'
+                           b'GET /vendas?antes_de=2025-01-31,12:00,1 HTTP/1.1\r\nConnection: close\r\n\r\n')
+    assert [r[0] for r in respostas] == [400, 400, 400]
+
+
+def test_filtros_vendas_converte_datas_e_limita():
+    filtros = filtros_vendas({'limite': ['500'], 'id_cliente': ['7'], 'data_fim': ['2025-01-31'],
+                              'depois_de': ['2025-01-01,08:30:00,42']})
+    assert filtros['limite'] == servico_checkout.LIMITE_VENDAS
+    assert filtros['id_cliente'] == 7
+    assert str(filtros['data_fim']) == '2025-01-31'
+    data_venda, hora_venda, id_venda = filtros['depois_de']
+    assert (str(data_venda), str(hora_venda), id_venda) == ('2025-01-01', '08:30:00', 42)
+
+
+@pytest.mark.parametrize('consulta', [
+    {'limite': ['-3']},
+    {'limite': ['dez']},
+    {'id_cliente': ['x']},
+    {'data_fim': ['31/01/2025']},
+    {'antes_de': ['2025-01-31,12:00:00']},
+    {'depois_de': ['2025-01-31,25:00:00,1']},
+])
+def test_filtros_vendas_invalidos(consulta):
+    with pytest.raises(ErroRequisicao) as erro:
+        filtros_vendas(consulta)
+    assert erro.value.status == 400